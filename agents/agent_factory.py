@@ -1,8 +1,10 @@
 import autogen
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
 import os
 from dotenv import load_dotenv
+from agents.llm_governor import LLMGovernor
 
 # Load environment variables
 load_dotenv()
@@ -13,8 +15,13 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
 logger = logging.getLogger(__name__)
 
-def create_agent_system():
-    """Creates and configures the multi-agent system for alert processing"""
+def create_agent_system(governor: Optional[LLMGovernor] = None):
+    """
+    Creates and configures the multi-agent system for alert processing
+    
+    Args:
+        governor: Bounds concurrent LLM conversations; defaults to one conversation at a time
+    """
     
     # Configuration for the LLM
     llm_config = {
@@ -23,6 +30,22 @@ def create_agent_system():
         "model": OPENAI_MODEL
     }
     
+    return AgentSystem(llm_config=llm_config, governor=governor or LLMGovernor())
+
+def create_conversation(llm_config: Dict[str, Any]):
+    """
+    Creates the agents, group chat and manager of one conversation
+    
+    Agents and group chats keep the message history of their conversation, so
+    conversations running at the same time each get their own.
+    
+    Args:
+        llm_config: Configuration for the LLM
+        
+    Returns:
+        Tuple of the human agent starting the conversation and the group chat manager
+    """
+    
     # Create the market compliance agent
     market_validator_agent = autogen.AssistantAgent(
         name="MarketValidatorAgent",
@@ -78,26 +101,14 @@ def create_agent_system():
     # Create the manager to orchestrate the conversation
     manager = autogen.GroupChatManager(groupchat=groupchat, llm_config=llm_config)
     
-    return AgentSystem(
-        market_validator=market_validator_agent,
-        shares_validator=shares_validator_agent,
-        evidence_collector=evidence_collector_agent,
-        decision_maker=decision_agent,
-        human_agent=human_agent,
-        manager=manager
-    )
+    return human_agent, manager
 
 class AgentSystem:
     """Main class that orchestrates the multi-agent system"""
     
-    def __init__(self, market_validator, shares_validator, 
-                 evidence_collector, decision_maker, human_agent, manager):
-        self.market_validator = market_validator
-        self.shares_validator = shares_validator
-        self.evidence_collector = evidence_collector
-        self.decision_maker = decision_maker
-        self.human_agent = human_agent
-        self.manager = manager
+    def __init__(self, llm_config: Dict[str, Any], governor: LLMGovernor):
+        self.llm_config = llm_config
+        self.governor = governor
     
     async def process_alert(self, alert):
         from models.alert_models import AlertProcessingResult
@@ -127,9 +138,13 @@ class AgentSystem:
             """
             
             # Option 1: Send message via human agent
-            self.human_agent.initiate_chat(self.manager, message=message)
-            # Get chat history
-            result = self.human_agent.chat_messages[self.manager]
+            # Conversations are admitted by the governor and run in a worker thread to keep
+            # the event loop responsive; each has its own agents and group chat
+            async with self.governor.slot():
+                human_agent, manager = create_conversation(self.llm_config)
+                await asyncio.to_thread(human_agent.initiate_chat, manager, message=message)
+                # Get chat history
+                result = human_agent.chat_messages[manager]
             
             # Extract the final decision from the chat
             decision_message = self._extract_decision(result)
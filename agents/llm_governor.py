@@ -0,0 +1,37 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from utils.priority_scheduler import PriorityScheduler
+
+logger = logging.getLogger(__name__)
+
+class LLMGovernor:
+    """
+    Bounds the number of LLM conversations running at the same time
+
+    Waiting conversations are admitted by priority class, so an analyst's
+    single alert is not stuck behind a batch that holds the LLM quota.
+    """
+
+    def __init__(self, max_concurrent: int = 1, priority_weights: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            max_concurrent: Maximum number of conversations in flight
+            priority_weights: Share of conversation slots per priority class under contention
+        """
+        self.max_concurrent = max_concurrent
+        self._slots = PriorityScheduler(max_concurrent, priority_weights)
+
+    @asynccontextmanager
+    async def slot(self, priority_class: Optional[str] = None):
+        """Holds a conversation slot; the class defaults to the priority of the current task"""
+        async with self._slots.slot(priority_class):
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns conversation slot usage and queue wait times per priority class"""
+        return {
+            "chats_running": self._slots.in_use,
+            "max_concurrent": self.max_concurrent,
+            "wait": self._slots.stats(),
+        }
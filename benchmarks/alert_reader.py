@@ -0,0 +1,92 @@
+"""
+Benchmarks alert CSV ingestion: the row-by-row pandas loader against the columnar reader
+
+Each loader runs in a fresh process, so peak memory is measured in isolation.
+
+    uv run python -m benchmarks.alert_reader --rows 1000000
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+def write_alerts(path: str, rows: int):
+    """Writes a synthetic alert export; identifiers are not numeric and every row has a share count"""
+    prefixes = ["DE", "FR", "CH", "IT"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["alert_id", "isin", "security_name", "outstanding_shares_system", "status"])
+        for n in range(rows):
+            writer.writerow([f"ALERT-{n:08d}", f"{prefixes[n % 4]}{n:010d}", f"Security {n % 5000} AG",
+                             1_000_000 + n, "PENDING"])
+
+def legacy_load(file_path: str):
+    """The loader before the columnar reader: pd.read_csv, then one validated Alert per iterrows row"""
+    import pandas as pd
+    from models.alert_models import Alert
+
+    df = pd.read_csv(file_path)
+    return [
+        Alert(alert_id=row['alert_id'], isin=row['isin'], security_name=row['security_name'],
+              outstanding_shares_system=row.get('outstanding_shares_system'))
+        for _, row in df.iterrows()
+    ]
+
+def columnar_load(file_path: str):
+    from data_access.alert_reader import load_alerts_from_csv
+
+    return load_alerts_from_csv(file_path)
+
+def columnar_stream(file_path: str):
+    """Consumes the batches without keeping them, as a streaming caller would"""
+    from data_access.alert_reader import iter_alert_batches
+
+    return [None] * sum(len(batch) for batch in iter_alert_batches(file_path))
+
+LOADERS = {
+    "legacy": legacy_load,
+    "columnar": columnar_load,
+    "columnar-stream": columnar_stream,
+}
+
+def _measure(name: str, file_path: str, results):
+    import pandas  # noqa: F401  imported before the baseline so only the load itself is measured
+    import pydantic  # noqa: F401
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    alerts = LOADERS[name](file_path)
+    seconds = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((name, len(alerts), seconds, (peak_kb - baseline_kb) / 1024))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark alert CSV ingestion")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--csv", default=None, help="Existing alert CSV to load instead of a generated one")
+    parser.add_argument("--loaders", nargs="+", default=list(LOADERS), choices=list(LOADERS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = args.csv
+        if file_path is None:
+            file_path = os.path.join(tmp, "alerts.csv")
+            write_alerts(file_path, args.rows)
+        size_mb = os.path.getsize(file_path) / 1024 / 1024
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        print(f"{file_path}: {size_mb:.1f} MB")
+        print(f"{'loader':<16} {'alerts':>10} {'seconds':>9} {'rows/s':>11} {'peak MB':>9}")
+        for name in args.loaders:
+            process = context.Process(target=_measure, args=(name, file_path, results))
+            process.start()
+            loader, count, seconds, peak_mb = results.get()
+            process.join()
+            print(f"{loader:<16} {count:>10} {seconds:>9.2f} {count / seconds:>11.0f} {peak_mb:>9.1f}")
+
+if __name__ == "__main__":
+    main()
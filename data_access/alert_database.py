@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import queue
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from data_access.alert_reader import REQUIRED_COLUMNS, SHARES_COLUMN, _alerts_from_frame
+from models.alert_models import Alert
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY = f"""
+SELECT {", ".join(REQUIRED_COLUMNS + [SHARES_COLUMN])}
+FROM alerts
+WHERE status = 'PENDING'
+"""
+
+def pyodbc_connect(connection_string: str) -> Callable[[], Any]:
+    """Connection factory for an ODBC database"""
+    def connect():
+        import pyodbc
+        return pyodbc.connect(connection_string)
+    return connect
+
+def sqlite_connect(database: str) -> Callable[[], Any]:
+    """Connection factory for a SQLite database, e.g. a local stand-in for the alert database"""
+    def connect():
+        import sqlite3
+        return sqlite3.connect(database, check_same_thread=False)
+    return connect
+
+class ConnectionPool:
+    """
+    A fixed number of DB-API connections shared by coroutines
+
+    Connections are opened on first use and reused afterwards. Every blocking
+    call (connect, execute, fetch) runs in a worker thread, so the event loop
+    is never blocked by the database driver.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 4):
+        """
+        Args:
+            connect: Opens a new DB-API connection (see pyodbc_connect, sqlite_connect)
+            size: Maximum number of open connections
+        """
+        self._connect = connect
+        self.size = size
+        # None marks a slot whose connection has not been opened yet
+        self._slots: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put(None)
+
+    def _checkout(self):
+        conn = self._slots.get()
+        if conn is None:
+            try:
+                conn = self._connect()
+            except BaseException:
+                self._slots.put(None)
+                raise
+        return conn
+
+    def _checkin(self, conn, broken: bool):
+        if broken:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._slots.put(None)
+            return
+        try:
+            # Ends the read transaction, so the next query sees newly committed rows
+            conn.rollback()
+            self._slots.put(conn)
+        except Exception:
+            self._checkin(conn, broken=True)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrows a connection; waits while all connections are in use"""
+        conn = await asyncio.to_thread(self._checkout)
+        broken = False
+        try:
+            yield conn
+        except (Exception, asyncio.CancelledError):
+            # The connection may be in an unknown state; a fresh one replaces it
+            broken = True
+            raise
+        finally:
+            await asyncio.to_thread(self._checkin, conn, broken)
+
+    def close(self):
+        """Closes the idle connections"""
+        for _ in range(self.size):
+            try:
+                conn = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                conn.close()
+
+class AlertDatabase:
+    """
+    Streams alerts from a database in batches
+
+    Rows are fetched with fetchmany from an open cursor, so the driver streams
+    the result set and at most one batch is held in memory. Each batch is
+    validated into Alert objects in one call while the caller consumes it.
+    """
+
+    def __init__(self, pool: ConnectionPool, query: Optional[str] = None, batch_size: int = 5000,
+                 watermark_column: Optional[str] = None, table: str = "alerts"):
+        """
+        Args:
+            pool: Connection pool to query through
+            query: Query returning the alert columns (defaults to the pending alerts).
+                Ignored when watermark_column is set.
+            batch_size: Alerts per batch
+            watermark_column: Increasing column (e.g. a modification timestamp or row
+                version) used to read only the alerts added since the previous read
+            table: Table read when watermark_column is set
+        """
+        self.pool = pool
+        self.query = query or DEFAULT_QUERY
+        self.batch_size = batch_size
+        self.watermark_column = watermark_column
+        self.table = table
+        self.watermark: Any = None
+
+    def _watermark_query(self, since: Any) -> str:
+        columns = ", ".join(REQUIRED_COLUMNS + [SHARES_COLUMN, self.watermark_column])
+        condition = f" AND {self.watermark_column} > ?" if since is not None else ""
+        return (f"SELECT {columns} FROM {self.table} WHERE status = 'PENDING'{condition} "
+                f"ORDER BY {self.watermark_column}")
+
+    async def iter_alert_batches(self, since: Any = None,
+                                 params: Optional[List[Any]] = None) -> AsyncIterator[List[Alert]]:
+        """
+        Reads alerts in batches
+
+        Args:
+            since: With a watermark column, only alerts with a higher watermark are
+                read; defaults to the highest watermark read so far
+            params: Parameters of a custom query
+
+        Yields:
+            Lists of Alert objects
+        """
+        if self.watermark_column:
+            since = since if since is not None else self.watermark
+            query = self._watermark_query(since)
+            params = [since] if since is not None else []
+        else:
+            query = self.query
+            params = params or []
+
+        async with self.pool.connection() as conn:
+            cursor = await asyncio.to_thread(conn.cursor)
+            try:
+                await asyncio.to_thread(cursor.execute, query, params)
+                columns = [column[0] for column in cursor.description]
+                while True:
+                    rows = await asyncio.to_thread(cursor.fetchmany, self.batch_size)
+                    if not rows:
+                        break
+                    if self.watermark_column:
+                        # The driver's own value, so it binds as a parameter of the next read
+                        self.watermark = rows[-1][columns.index(self.watermark_column)]
+                    yield _alerts_from_frame(pd.DataFrame.from_records(rows, columns=columns))
+            finally:
+                await asyncio.to_thread(cursor.close)
+
+    async def poll(self, interval: float = 30.0, since: Any = None) -> AsyncIterator[List[Alert]]:
+        """
+        Yields batches of new alerts as they appear, checking every `interval` seconds
+
+        Requires a watermark column. The watermark moves past a batch when it is
+        yielded. Rows sharing the last watermark value but committed after a
+        read are not seen, so the column should be strictly increasing per row.
+        """
+        if not self.watermark_column:
+            raise ValueError("Polling requires a watermark column")
+        if since is not None:
+            self.watermark = since
+        while True:
+            found = 0
+            async with aclosing(self.iter_alert_batches()) as batches:
+                async for batch in batches:
+                    found += len(batch)
+                    yield batch
+            if found:
+                logger.info(f"Read {found} new alerts up to watermark {self.watermark}")
+            await asyncio.sleep(interval)
+
+_pools: Dict[str, ConnectionPool] = {}
+
+def get_pool(connection_string: str, size: int = 4) -> ConnectionPool:
+    """Process-wide ODBC connection pool for a connection string"""
+    if connection_string not in _pools:
+        _pools[connection_string] = ConnectionPool(pyodbc_connect(connection_string), size)
+    return _pools[connection_string]
@@ -1,11 +1,136 @@
+import csv
 import pandas as pd
 import logging
-from typing import List, Dict, Any
+from typing import BinaryIO, Iterator, List, Dict, Any, Optional
 import os
+from pydantic import TypeAdapter
 from models.alert_models import Alert
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_COLUMNS = ['alert_id', 'isin', 'security_name']
+SHARES_COLUMN = 'outstanding_shares_system'
+_ALERT_LIST = TypeAdapter(List[Alert])
+
+class AlertFileError(ValueError):
+    """Raised when an alert file lacks a required column or holds values of the wrong type"""
+
+def _read_header(file_path: str) -> List[str]:
+    with open(file_path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+def _alerts_from_frame(df: pd.DataFrame) -> List[Alert]:
+    """
+    Builds Alerts from a batch of rows, checking each column once instead of each row
+
+    Rows missing a required value are skipped. The share count must be a whole
+    number; anything else fails the whole file, as a row-by-row loader would.
+    """
+    complete = df[REQUIRED_COLUMNS].notna().all(axis=1)
+    if not complete.all():
+        logger.warning(f"Skipping {int((~complete).sum())} alerts with a missing alert_id, isin or security_name")
+        df = df[complete]
+
+    shares = [None] * len(df)
+    if SHARES_COLUMN in df.columns:
+        raw = df[SHARES_COLUMN]
+        numbers = pd.to_numeric(raw, errors='coerce')
+        invalid = (raw.notna() & numbers.isna()) | (numbers.notna() & (numbers % 1 != 0))
+        if invalid.any():
+            raise AlertFileError(f"Column '{SHARES_COLUMN}' holds {int(invalid.sum())} values that are not "
+                                 f"whole numbers, e.g. {raw[invalid].iloc[0]!r}")
+        shares = numbers.astype('Int64').astype(object).where(numbers.notna(), None).tolist()
+
+    # One validation call per batch, run in pydantic-core rather than per row in Python
+    return _ALERT_LIST.validate_python([
+        {'alert_id': alert_id, 'isin': isin, 'security_name': security_name,
+         'outstanding_shares_system': shares_value}
+        for alert_id, isin, security_name, shares_value in zip(
+            df['alert_id'].tolist(), df['isin'].tolist(), df['security_name'].tolist(), shares
+        )
+    ])
+
+def iter_alert_batches(file_path: str, batch_size: int = 65536) -> Iterator[List[Alert]]:
+    """
+    Reads alerts from a CSV file in batches
+
+    The file is parsed by Arrow's multi-threaded CSV reader into columns (only
+    the alert columns are kept), and Alert objects are built one batch at a
+    time while the caller consumes them. Without pyarrow, pandas reads the
+    file in chunks instead.
+
+    Args:
+        file_path: Path to the CSV file
+        batch_size: Alerts per batch
+
+    Yields:
+        Lists of Alert objects
+
+    Raises:
+        AlertFileError: A required column is missing or a column holds values of the wrong type
+    """
+    header = _read_header(file_path)
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise AlertFileError(f"Required column '{missing[0]}' not found in CSV file")
+    columns = REQUIRED_COLUMNS + ([SHARES_COLUMN] if SHARES_COLUMN in header else [])
+
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        chunks = pd.read_csv(file_path, usecols=columns, dtype={col: str for col in columns}, chunksize=batch_size)
+        for chunk in chunks:
+            yield _alerts_from_frame(chunk)
+        return
+
+    table = pa_csv.read_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={col: pa.string() for col in columns},
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in table.to_batches(max_chunksize=batch_size):
+        yield _alerts_from_frame(batch.to_pandas())
+
+def iter_alert_batches_from_stream(stream: BinaryIO, batch_size: int = 1000) -> Iterator[List[Alert]]:
+    """
+    Reads alerts in batches from a CSV file object, such as an upload
+
+    The stream is parsed by pandas one chunk at a time, so only the current
+    batch is held in memory however large the file is.
+
+    Args:
+        stream: Binary file object positioned at the header row
+        batch_size: Alerts per batch
+
+    Yields:
+        Lists of Alert objects
+
+    Raises:
+        AlertFileError: A required column is missing or a column holds values of the wrong type
+    """
+    columns = REQUIRED_COLUMNS + [SHARES_COLUMN]
+    try:
+        chunks = pd.read_csv(stream, encoding='utf-8-sig', usecols=lambda col: col in columns,
+                             dtype=str, chunksize=batch_size)
+    except pd.errors.EmptyDataError:
+        raise AlertFileError("CSV file is empty")
+    with chunks:
+        for chunk in chunks:
+            missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing:
+                raise AlertFileError(f"Required column '{missing[0]}' not found in CSV file")
+            yield _alerts_from_frame(chunk)
+
+def iter_alerts(file_path: str, batch_size: int = 65536) -> Iterator[Alert]:
+    """Reads alerts from a CSV file one at a time; see iter_alert_batches"""
+    for batch in iter_alert_batches(file_path, batch_size):
+        yield from batch
+
 def load_alerts_from_csv(file_path: str) -> List[Alert]:
     """
     Loads alerts from a CSV file
@@ -21,29 +146,14 @@ def load_alerts_from_csv(file_path: str) -> List[Alert]:
             logger.error(f"CSV file not found: {file_path}")
             return []
         
-        df = pd.read_csv(file_path)
-        
-        # Check required columns
-        required_columns = ['alert_id', 'isin', 'security_name']
-        for col in required_columns:
-            if col not in df.columns:
-                logger.error(f"Required column '{col}' not found in CSV file")
-                return []
-        
-        # Convert DataFrame to Alert objects
-        alerts = []
-        for _, row in df.iterrows():
-            alert = Alert(
-                alert_id=row['alert_id'],
-                isin=row['isin'],
-                security_name=row['security_name'],
-                outstanding_shares_system=row.get('outstanding_shares_system')
-            )
-            alerts.append(alert)
+        alerts = list(iter_alerts(file_path))
         
         logger.info(f"Loaded {len(alerts)} alerts from CSV file")
         return alerts
     
+    except AlertFileError as e:
+        logger.error(str(e))
+        return []
     except Exception as e:
         logger.error(f"Error loading alerts from CSV: {e}", exc_info=True)
         return []
@@ -52,6 +162,10 @@ async def load_alerts_from_database(connection_string: str, query: str = None) -
     """
     Loads alerts from a database
     
+    Connections come from a process-wide pool and rows are streamed in
+    batches off the event loop; see data_access.alert_database for batch-wise
+    and incremental reads.
+    
     Args:
         connection_string: Database connection string
         query: Optional custom query to use
@@ -60,44 +174,16 @@ async def load_alerts_from_database(connection_string: str, query: str = None) -
         List of Alert objects
     """
     try:
-        import pyodbc
+        from data_access.alert_database import AlertDatabase, get_pool
         
-        # Connect to the database
-        # In a real implementation, we would use an async database library
-        conn = pyodbc.connect(connection_string)
-        
-        # Use default query if none provided
-        if query is None:
-            query = """
-            SELECT 
-                alert_id, 
-                isin, 
-                security_name, 
-                outstanding_shares_system 
-            FROM alerts 
-            WHERE status = 'PENDING'
-            """
-        
-        # Execute the query
-        df = pd.read_sql(query, conn)
-        
-        # Close the connection
-        conn.close()
-        
-        # Convert DataFrame to Alert objects
+        database = AlertDatabase(get_pool(connection_string), query=query)
         alerts = []
-        for _, row in df.iterrows():
-            alert = Alert(
-                alert_id=row['alert_id'],
-                isin=row['isin'],
-                security_name=row['security_name'],
-                outstanding_shares_system=row.get('outstanding_shares_system')
-            )
-            alerts.append(alert)
+        async for batch in database.iter_alert_batches():
+            alerts.extend(batch)
         
         logger.info(f"Loaded {len(alerts)} alerts from database")
         return alerts
     
     except Exception as e:
         logger.error(f"Error loading alerts from database: {e}", exc_info=True)
-        return []
\ No newline at end of file
+        return []
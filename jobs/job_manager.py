@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from jobs import work_queue
+from jobs.work_queue import WorkQueue
+from models.job_models import JobState, JobStatus
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = (JobState.COMPLETED, JobState.CANCELLED, JobState.FAILED)
+
+# Job states as persisted by the work queue
+_QUEUE_STATES = {
+    work_queue.PENDING: JobState.PENDING,
+    work_queue.IN_PROGRESS: JobState.RUNNING,
+    work_queue.DONE: JobState.COMPLETED,
+    work_queue.CANCELLED: JobState.CANCELLED,
+    work_queue.FAILED: JobState.FAILED,
+}
+_JOB_STATES = {state: queue_state for queue_state, state in _QUEUE_STATES.items()}
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if value is not None else None
+
+class Job:
+    """A batch of items processed in the background; results live in the work queue, not in memory"""
+
+    def __init__(self, job_id: str, total: int, created_timestamp: datetime):
+        self.job_id = job_id
+        self.total = total
+        self.state = JobState.PENDING
+        self.completed = 0
+        self.failed = 0
+        self.error: Optional[str] = None
+        self.created_timestamp = created_timestamp
+        self.started_timestamp: Optional[datetime] = None
+        self.finished_timestamp: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+        self.held_items = set()
+        self._version = 0
+        self._changed = asyncio.Condition()
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], counts: Dict[str, int]) -> "Job":
+        job = cls(record["job_id"], record["total"], _timestamp(record["created_at"]))
+        job.state = _QUEUE_STATES[record["state"]]
+        job.completed = counts[work_queue.DONE]
+        job.failed = counts[work_queue.FAILED]
+        job.error = record["error"]
+        job.started_timestamp = _timestamp(record["started_at"])
+        job.finished_timestamp = _timestamp(record["finished_at"])
+        return job
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def status(self) -> JobStatus:
+        return JobStatus(
+            job_id=self.job_id,
+            state=self.state,
+            total=self.total,
+            completed=self.completed,
+            failed=self.failed,
+            created_timestamp=self.created_timestamp,
+            started_timestamp=self.started_timestamp,
+            finished_timestamp=self.finished_timestamp,
+            error=self.error,
+        )
+
+    async def _notify(self):
+        async with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+class JobManager:
+    """
+    Runs batches of alerts as background jobs that can be polled, streamed and cancelled
+
+    Every job is persisted in a WorkQueue. Worker coroutines claim items with leases
+    that are renewed while an item is processed, so when the process restarts,
+    unfinished jobs resume where they stopped and only items whose lease went
+    stale are executed again.
+    """
+
+    def __init__(self,
+                 processor: Callable[[Any], Awaitable[Dict[str, Any]]],
+                 queue: WorkQueue,
+                 retention_seconds: int = 3600,
+                 concurrency: int = 1,
+                 lease_seconds: float = 300.0):
+        """
+        Args:
+            processor: Coroutine function processing one payload and returning a JSON-ready dict
+            queue: Work queue persisting jobs, item states and results
+            retention_seconds: How long finished jobs stay available before being purged
+            concurrency: Number of worker coroutines processing a single job
+            lease_seconds: Lease duration of a claimed item; renewed while it is processed
+        """
+        self.processor = processor
+        self.queue = queue
+        self.retention = timedelta(seconds=retention_seconds)
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, Job] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Resumes unfinished jobs and starts the periodic purge of expired ones"""
+        for record in await asyncio.to_thread(self.queue.unfinished_jobs):
+            counts = await asyncio.to_thread(self.queue.counts, record["job_id"])
+            job = Job.from_record(record, counts)
+            self.jobs[job.job_id] = job
+            job.task = asyncio.create_task(self._run(job))
+            logger.info(f"Resuming job {job.job_id}: {job.completed + job.failed}/{job.total} items already finished")
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def shutdown(self):
+        """
+        Stops the purge loop and the workers of running jobs
+
+        Running jobs are left unfinished in the queue so they resume on the next start.
+        """
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
+        for job in list(self.jobs.values()):
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    async def submit(self, items: List[Any]) -> Job:
+        """
+        Persists a new job and starts processing it in the background
+
+        Args:
+            items: JSON-serializable payloads to hand to the processor, one call per item
+
+        Returns:
+            The created Job
+        """
+        job = Job(uuid.uuid4().hex, len(items), datetime.now())
+        await asyncio.to_thread(self.queue.create_job, job.job_id, list(items))
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"Submitted job {job.job_id} with {job.total} items")
+        return job
+
+    async def backlog(self) -> int:
+        """Returns the number of items waiting or in progress across all jobs"""
+        return await asyncio.to_thread(self.queue.outstanding)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Returns a job, loading it from the queue if it was created by an earlier process"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            record = await asyncio.to_thread(self.queue.get_job, job_id)
+            if record is None:
+                return None
+            counts = await asyncio.to_thread(self.queue.counts, job_id)
+            job = Job.from_record(record, counts)
+            self.jobs[job_id] = job
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a job; results recorded before cancellation are kept
+
+        Returns:
+            False if the job does not exist or has already finished
+        """
+        job = await self.get(job_id)
+        if job is None or job.is_finished:
+            return False
+        if job.task is not None:
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.to_thread(self.queue.cancel_pending, job_id)
+        await self._finish(job, JobState.CANCELLED)
+        logger.info(f"Cancelled job {job_id}")
+        return True
+
+    async def stream(self, job: Job) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields every finished item of a job in completion order, then waits for new ones until it finishes
+
+        Subscribers joining late first receive the results recorded so far, so
+        any number of clients can follow the same job independently.
+        """
+        position = 0
+        while True:
+            seen_version = job._version
+            finished = job.is_finished
+            page = await asyncio.to_thread(self.queue.finished_items, job.job_id, position)
+            for item in page:
+                position = item["completion_order"]
+                if item["state"] == work_queue.DONE:
+                    yield {"index": item["seq"], "result": item["result"]}
+                else:
+                    yield {"index": item["seq"], "error": item["error"]}
+            if page:
+                continue
+            if finished:
+                return
+            async with job._changed:
+                await job._changed.wait_for(lambda: job._version != seen_version)
+
+    async def purge_expired(self) -> int:
+        """Drops finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention.total_seconds()
+        expired = await asyncio.to_thread(self.queue.finished_before, cutoff)
+        for job_id in expired:
+            await asyncio.to_thread(self.queue.delete_job, job_id)
+            self.jobs.pop(job_id, None)
+        if expired:
+            logger.info(f"Purged {len(expired)} expired jobs")
+        return len(expired)
+
+    async def _cleanup_loop(self):
+        interval = min(60.0, max(1.0, self.retention.total_seconds()))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.purge_expired()
+            except Exception as e:
+                logger.error(f"Error purging expired jobs: {e}", exc_info=True)
+
+    async def _finish(self, job: Job, state: JobState, error: Optional[str] = None):
+        await asyncio.to_thread(self.queue.set_job_state, job.job_id, _JOB_STATES[state], error)
+        job.state = state
+        job.error = error
+        job.finished_timestamp = datetime.now()
+        await job._notify()
+
+    async def _run(self, job: Job):
+        await asyncio.to_thread(self.queue.set_job_state, job.job_id, work_queue.IN_PROGRESS)
+        job.state = JobState.RUNNING
+        job.started_timestamp = job.started_timestamp or datetime.now()
+        await job._notify()
+
+        try:
+            await asyncio.gather(*(self._worker(job, f"{self.instance_id}-{n}") for n in range(self.concurrency)))
+            await self._finish(job, JobState.COMPLETED)
+            logger.info(f"Job {job.job_id} completed: {job.completed} succeeded, {job.failed} failed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
+            await self._finish(job, JobState.FAILED, str(e))
+
+    async def _worker(self, job: Job, worker_id: str):
+        while True:
+            item = await asyncio.to_thread(self.queue.claim, job.job_id, worker_id, self.lease_seconds)
+            if item is None:
+                counts = await asyncio.to_thread(self.queue.counts, job.job_id)
+                if counts[work_queue.IN_PROGRESS] <= len(job.held_items):
+                    return
+                # Items leased by a previous (crashed) process become claimable once their lease expires
+                expiry = await asyncio.to_thread(self.queue.next_lease_expiry, job.job_id)
+                delay = (expiry - time.time()) if expiry else 0
+                await asyncio.sleep(min(max(delay, 0.05), 5.0))
+                continue
+
+            job.held_items.add(item["item_id"])
+            heartbeat = asyncio.create_task(self._renew_lease(item["item_id"], worker_id))
+            try:
+                result = await self.processor(item["payload"])
+                if await asyncio.to_thread(self.queue.complete, item["item_id"], worker_id, result):
+                    job.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.job_id} item {item['seq']} failed (attempt {item['attempts']}): {e}", exc_info=True)
+                if await asyncio.to_thread(self.queue.fail, item["item_id"], worker_id, str(e)):
+                    job.failed += 1
+            finally:
+                heartbeat.cancel()
+                job.held_items.discard(item["item_id"])
+            await job._notify()
+
+    async def _renew_lease(self, item_id: int, worker_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.renew, item_id, worker_id, self.lease_seconds):
+                logger.warning(f"Lost lease on work item {item_id}")
+                return
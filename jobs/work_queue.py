@@ -0,0 +1,332 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    source TEXT,
+    state TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE INDEX IF NOT EXISTS jobs_source ON jobs (source);
+CREATE TABLE IF NOT EXISTS work_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    result TEXT,
+    error TEXT,
+    finished_at REAL,
+    completion_order INTEGER,
+    UNIQUE (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS work_items_claim ON work_items (job_id, state, seq);
+CREATE INDEX IF NOT EXISTS work_items_completion ON work_items (job_id, completion_order);
+CREATE INDEX IF NOT EXISTS work_items_state ON work_items (state);
+"""
+
+class WorkQueue:
+    """
+    SQLite-backed work queue recording the state and result of every item of a job
+
+    Items move from pending to in_progress when a worker claims them with a lease,
+    then to done or failed. An in_progress item whose lease has expired (because its
+    worker crashed or hung) becomes claimable again, so after a restart only stale
+    items are re-executed and finished ones are never repeated.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        """
+        Args:
+            db_path: Path of the SQLite database file
+            max_attempts: Number of times an item is tried before being marked failed
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, statements):
+        """Runs a callable against the connection inside a write transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Jobs
+
+    def create_job(self, job_id: str, payloads: List[Any], source: Optional[str] = None):
+        """
+        Records a new job and enqueues one pending item per payload
+
+        Args:
+            job_id: Identifier of the job
+            payloads: JSON-serializable item payloads, processed in order
+            source: Optional description of where the items came from (e.g. a CSV URL)
+        """
+        now = time.time()
+
+        def insert(conn):
+            conn.execute(
+                "INSERT INTO jobs (job_id, source, state, total, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, source, PENDING, len(payloads), now),
+            )
+            conn.executemany(
+                "INSERT INTO work_items (job_id, seq, payload, state) VALUES (?, ?, ?, ?)",
+                [(job_id, seq, json.dumps(payload), PENDING) for seq, payload in enumerate(payloads)],
+            )
+
+        self._transaction(insert)
+
+    def append_items(self, job_id: str, payloads: List[Any], start_seq: int) -> int:
+        """
+        Adds items to a job whose input is still arriving
+
+        Items are numbered from start_seq; items already present with the same
+        number are kept as they are, so re-reading an input after a crash only
+        adds what was not recorded before.
+
+        Returns:
+            Number of items added
+        """
+        def insert(conn):
+            added = conn.executemany(
+                "INSERT OR IGNORE INTO work_items (job_id, seq, payload, state) VALUES (?, ?, ?, ?)",
+                [(job_id, start_seq + n, json.dumps(payload), PENDING) for n, payload in enumerate(payloads)],
+            ).rowcount
+            conn.execute("UPDATE jobs SET total = MAX(total, ?) WHERE job_id = ?",
+                         (start_seq + len(payloads), job_id))
+            return added
+
+        return self._transaction(insert)
+
+    def set_job_state(self, job_id: str, state: str, error: Optional[str] = None):
+        now = time.time()
+        if state == IN_PROGRESS:
+            sql = "UPDATE jobs SET state = ?, started_at = COALESCE(started_at, ?), error = ? WHERE job_id = ?"
+        else:
+            sql = "UPDATE jobs SET state = ?, finished_at = ?, error = ? WHERE job_id = ?"
+        self._transaction(lambda conn: conn.execute(sql, (state, now, error, job_id)))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return dict(rows[0]) if rows else None
+
+    def find_unfinished_job(self, source: str) -> Optional[Dict[str, Any]]:
+        """Returns the most recent job for a source that has not finished yet"""
+        rows = self._query(
+            "SELECT * FROM jobs WHERE source = ? AND state IN (?, ?) ORDER BY created_at DESC LIMIT 1",
+            (source, PENDING, IN_PROGRESS),
+        )
+        return dict(rows[0]) if rows else None
+
+    def unfinished_jobs(self) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY created_at",
+            (PENDING, IN_PROGRESS),
+        )
+        return [dict(row) for row in rows]
+
+    def finished_before(self, cutoff: float) -> List[str]:
+        rows = self._query(
+            "SELECT job_id FROM jobs WHERE state NOT IN (?, ?) AND finished_at <= ?",
+            (PENDING, IN_PROGRESS, cutoff),
+        )
+        return [row["job_id"] for row in rows]
+
+    def delete_job(self, job_id: str):
+        def delete(conn):
+            conn.execute("DELETE FROM work_items WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+        self._transaction(delete)
+
+    def cancel_pending(self, job_id: str) -> int:
+        """Marks every item not yet finished as cancelled"""
+        now = time.time()
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE work_items SET state = ?, lease_owner = NULL, lease_expires_at = NULL, finished_at = ? "
+            "WHERE job_id = ? AND state IN (?, ?)",
+            (CANCELLED, now, job_id, PENDING, IN_PROGRESS),
+        ).rowcount)
+
+    # Items
+
+    def claim(self, job_id: str, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Leases the next pending item of a job, or an in-progress item whose lease has expired
+
+        Returns:
+            Dict with item_id, seq, attempts and the decoded payload, or None if nothing is claimable
+        """
+        now = time.time()
+
+        def claim_next(conn):
+            row = conn.execute(
+                "SELECT item_id, seq, payload, attempts FROM work_items "
+                "WHERE job_id = ? AND (state = ? OR (state = ? AND lease_expires_at < ?)) "
+                "ORDER BY seq LIMIT 1",
+                (job_id, PENDING, IN_PROGRESS, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE work_items SET state = ?, lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1 "
+                "WHERE item_id = ?",
+                (IN_PROGRESS, worker_id, now + lease_seconds, row["item_id"]),
+            )
+            return {
+                "item_id": row["item_id"],
+                "seq": row["seq"],
+                "attempts": row["attempts"] + 1,
+                "payload": json.loads(row["payload"]),
+            }
+
+        return self._transaction(claim_next)
+
+    def renew(self, item_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Extends a lease; returns False if the worker no longer holds it"""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE work_items SET lease_expires_at = ? WHERE item_id = ? AND lease_owner = ? AND state = ?",
+            (time.time() + lease_seconds, item_id, worker_id, IN_PROGRESS),
+        ).rowcount) == 1
+
+    def complete(self, item_id: int, worker_id: str, result: Any) -> bool:
+        """Stores the result of an item; ignored if the lease was lost to another worker"""
+        return self._finish_item(item_id, worker_id, DONE, result=json.dumps(result))
+
+    def fail(self, item_id: int, worker_id: str, error: str) -> bool:
+        """
+        Records a failed attempt; the item goes back to pending until max_attempts is reached
+
+        Returns:
+            True if the item is now permanently failed
+        """
+        def record_failure(conn):
+            row = conn.execute(
+                "SELECT attempts FROM work_items WHERE item_id = ? AND lease_owner = ? AND state = ?",
+                (item_id, worker_id, IN_PROGRESS),
+            ).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] < self.max_attempts:
+                conn.execute(
+                    "UPDATE work_items SET state = ?, lease_owner = NULL, lease_expires_at = NULL, error = ? "
+                    "WHERE item_id = ?",
+                    (PENDING, error, item_id),
+                )
+                return False
+            self._mark_finished(conn, item_id, FAILED, error=error)
+            return True
+
+        return self._transaction(record_failure)
+
+    def _finish_item(self, item_id: int, worker_id: str, state: str,
+                     result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        def finish(conn):
+            held = conn.execute(
+                "SELECT 1 FROM work_items WHERE item_id = ? AND lease_owner = ? AND state = ?",
+                (item_id, worker_id, IN_PROGRESS),
+            ).fetchone()
+            if held is None:
+                return False
+            self._mark_finished(conn, item_id, state, result=result, error=error)
+            return True
+
+        return self._transaction(finish)
+
+    def _mark_finished(self, conn, item_id: int, state: str,
+                       result: Optional[str] = None, error: Optional[str] = None):
+        conn.execute(
+            "UPDATE work_items SET state = ?, result = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL, "
+            "finished_at = ?, completion_order = (SELECT COALESCE(MAX(completion_order), 0) + 1 "
+            "FROM work_items WHERE job_id = (SELECT job_id FROM work_items WHERE item_id = ?)) "
+            "WHERE item_id = ?",
+            (state, result, error, time.time(), item_id, item_id),
+        )
+
+    def counts(self, job_id: str) -> Dict[str, int]:
+        rows = self._query(
+            "SELECT state, COUNT(*) AS n FROM work_items WHERE job_id = ? GROUP BY state", (job_id,)
+        )
+        counts = {PENDING: 0, IN_PROGRESS: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+        counts.update({row["state"]: row["n"] for row in rows})
+        return counts
+
+    def outstanding(self) -> int:
+        """Returns the number of pending and in-progress items across all jobs"""
+        rows = self._query(
+            "SELECT COUNT(*) AS n FROM work_items WHERE state IN (?, ?)", (PENDING, IN_PROGRESS)
+        )
+        return rows[0]["n"]
+
+    def next_lease_expiry(self, job_id: str) -> Optional[float]:
+        rows = self._query(
+            "SELECT MIN(lease_expires_at) AS expiry FROM work_items WHERE job_id = ? AND state = ?",
+            (job_id, IN_PROGRESS),
+        )
+        return rows[0]["expiry"] if rows else None
+
+    def finished_items(self, job_id: str, after: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Returns finished items in the order they completed
+
+        Args:
+            job_id: The job to read
+            after: Only return items whose completion order is greater than this
+            limit: Page size
+        """
+        rows = self._query(
+            "SELECT seq, state, result, error, completion_order FROM work_items "
+            "WHERE job_id = ? AND completion_order > ? AND state IN (?, ?) "
+            "ORDER BY completion_order LIMIT ?",
+            (job_id, after, DONE, FAILED, limit),
+        )
+        return [
+            {
+                "seq": row["seq"],
+                "state": row["state"],
+                "result": json.loads(row["result"]) if row["result"] is not None else None,
+                "error": row["error"],
+                "completion_order": row["completion_order"],
+            }
+            for row in rows
+        ]
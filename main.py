@@ -1,12 +1,16 @@
 import os
 import json
+import asyncio
 import logging
 import base64
+import time
+from contextlib import AsyncExitStack
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Union
 import pandas as pd
-from fastapi import FastAPI, HTTPException, BackgroundTasks, File, UploadFile, Form
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, File, UploadFile, Form, Request
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field
 import uvicorn
 from pathlib import Path
@@ -14,10 +18,26 @@ from pathlib import Path
 # Import our custom modules
 from agents.agent_factory import create_agent_system
 from utils.pdf_generator import create_webpage_snapshot
-from data_access.alert_reader import load_alerts_from_csv, load_alerts_from_database
+from data_access.alert_reader import (AlertFileError, iter_alert_batches_from_stream, load_alerts_from_csv,
+                                      load_alerts_from_database)
 from models.alert_models import Alert, AlertProcessingResult
 from market_validators.market_validator import MarketTypeValidator
 from share_validators.outstanding_share_validator import OutstandingShareValidator
+from jobs.job_manager import JobManager
+from jobs.work_queue import WorkQueue
+from agents.llm_governor import LLMGovernor
+from utils.browser_pool import BrowserPool
+from utils.priority_scheduler import INTERACTIVE, BULK, priority
+from utils.admission_controller import AdmissionController, CapacityExceeded
+from utils.pdf_renderer import PdfRenderer
+from utils.evidence_snapshot import create_page_snapshot, render_snapshot
+from utils.snapshot_store import SnapshotStore
+from utils.evidence_store import EvidenceStore
+from utils.file_responses import file_response
+from utils.pipeline import Pipeline, Stage
+from utils.result_store import ResultStore
+from utils.audit_log import AuditLog
+from models.job_models import JobStatus
 
 # Set up logging
 logging.basicConfig(
@@ -43,8 +63,54 @@ RESULTS_DIR = Path("results")
 EVIDENCE_DIR.mkdir(exist_ok=True)
 RESULTS_DIR.mkdir(exist_ok=True)
 
+# Shared capacity: LLM conversations and browser pages are handed out by priority,
+# so single alerts from analysts overtake batch work
+governor = LLMGovernor(max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", "1")))
+browser_pool = BrowserPool(
+    max_pages=int(os.getenv("BROWSER_MAX_PAGES", "4")),
+    per_host_limit=int(os.getenv("BROWSER_PER_HOST_LIMIT", "2")),
+)
+
+# Admission control: alerts accepted by the API are bounded by the LLM and browser
+# capacity plus a short queue; beyond that requests get 429 with a Retry-After
+admission = AdmissionController(
+    capacity=int(os.getenv("ADMISSION_CAPACITY", str(min(governor.max_concurrent, browser_pool.max_pages)))),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "16")),
+)
+JOB_MAX_BACKLOG = int(os.getenv("JOB_MAX_BACKLOG", "10000"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "500"))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "1"))
+
+# Evidence PDFs are rendered in separate processes so ReportLab does not block request handling
+pdf_renderer = PdfRenderer(
+    workers=int(os.getenv("PDF_RENDER_WORKERS", "2")),
+    max_pending=int(os.getenv("PDF_RENDER_QUEUE", "32")),
+)
+
+# Evidence mode: "pdf" renders a PDF for every alert; "snapshot" only stores the page's
+# MHTML or DOM and renders it the first time GET /evidence/{alert_id} asks for it
+EVIDENCE_MODE = os.getenv("EVIDENCE_MODE", "pdf").lower()
+SNAPSHOT_FORMAT = os.getenv("SNAPSHOT_FORMAT", "mhtml").lower()
+snapshot_store = SnapshotStore(str(EVIDENCE_DIR / "snapshots"))
+# Evidence PDFs are stored once per distinct capture and referenced by every alert using them
+_store_limit = os.getenv("EVIDENCE_STORE_MAX_BYTES")
+evidence_store = EvidenceStore(str(EVIDENCE_DIR / "store"), max_bytes=int(_store_limit) if _store_limit else None)
+_render_locks: Dict[str, asyncio.Lock] = {}
+# Every decision is kept in a local, indexed store for GET /results; writes are batched in the background
+result_store = ResultStore(
+    os.getenv("RESULT_STORE_DB", str(RESULTS_DIR / "results.db")),
+    batch_size=int(os.getenv("RESULT_STORE_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("RESULT_STORE_FLUSH_SECONDS", "1.0")),
+)
+# Append-only audit trail of decisions and evidence, group-committed by a background writer
+audit_log = AuditLog(
+    os.getenv("AUDIT_LOG_DIR", str(RESULTS_DIR / "audit")),
+    segment_bytes=int(os.getenv("AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024))),
+    segment_seconds=float(os.getenv("AUDIT_SEGMENT_SECONDS", "86400")),
+)
+
 # Create our agent system
-agent_system = create_agent_system()
+agent_system = create_agent_system(governor)
 
 class ProcessAlertRequest(BaseModel):
     alert_id: str
@@ -61,66 +127,433 @@ class AlertResponse(BaseModel):
     justification: str
     evidence_path: Optional[str] = None
 
+class JobSubmission(BaseModel):
+    job_id: str
+    status_url: str
+    results_url: str
+
+async def _create_evidence(url: str, pdf_path: str, priority_class: str,
+                           alert_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+    """Generates the evidence of an alert with the shared browser pool under the alert's priority"""
+    with priority(priority_class):
+        if EVIDENCE_MODE == "snapshot":
+            snapshot = await create_page_snapshot(snapshot_store, alert_id, url, SNAPSHOT_FORMAT, browser_pool,
+                                                  metadata)
+            audit_log.record("evidence", alert_id=alert_id, url=url, mode=EVIDENCE_MODE,
+                             content_hash=snapshot.content_hash, format=SNAPSHOT_FORMAT)
+        else:
+            path = await create_webpage_snapshot(url, pdf_path, browser_pool, renderer=pdf_renderer,
+                                                 evidence_store=evidence_store, alert_id=alert_id)
+            audit_log.record("evidence", alert_id=alert_id, url=url, mode=EVIDENCE_MODE,
+                             content_hash=Path(path).stem if path else None)
+
+async def _run_alert(alert: ProcessAlertRequest,
+                     background_tasks: Optional[BackgroundTasks] = None,
+                     priority_class: str = BULK) -> AlertResponse:
+    """
+    Runs the agent system for one alert and produces its evidence PDF
+
+    Args:
+        alert: The alert to process
+        background_tasks: When given, the evidence PDF is generated after the response
+            is sent; otherwise it is generated before returning
+        priority_class: INTERACTIVE for single alerts, BULK for batches and jobs
+
+    Returns:
+        The alert decision
+    """
+    started = time.monotonic()
+    with priority(priority_class):
+        response = await _process_with_agents(alert, background_tasks, priority_class)
+    admission.observe(time.monotonic() - started)
+    result_store.record(alert.alert_id, alert.isin, response.is_true_positive, response.justification,
+                        security_name=alert.security_name, evidence_path=response.evidence_path)
+    audit_log.record("decision", alert_id=alert.alert_id, isin=alert.isin, security_name=alert.security_name,
+                     outstanding_shares_system=alert.outstanding_shares_system,
+                     is_true_positive=response.is_true_positive, justification=response.justification,
+                     evidence_path=response.evidence_path, priority=priority_class)
+    return response
+
+async def _process_with_agents(alert: ProcessAlertRequest,
+                               background_tasks: Optional[BackgroundTasks],
+                               priority_class: str) -> AlertResponse:
+    logger.info(f"Processing alert {alert.alert_id} for ISIN {alert.isin}")
+    
+    # Convert to our internal Alert model
+    alert_obj = Alert(
+        alert_id=alert.alert_id,
+        isin=alert.isin,
+        security_name=alert.security_name,
+        outstanding_shares_system=alert.outstanding_shares_system
+    )
+    
+    # Process the alert
+    result = await agent_system.process_alert(alert_obj)
+    
+    # Generate evidence (if needed)
+    if result.evidence_url:
+        pdf_path = EVIDENCE_DIR / f"{alert.alert_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        # Evidence lands in the content-addressed store or is rendered on request,
+        # so clients fetch it through the API
+        evidence_path = f"/evidence/{alert.alert_id}"
+        metadata = {
+            "isin": alert.isin,
+            "is_true_positive": result.is_true_positive,
+            "justification": result.justification,
+        }
+        if background_tasks is not None:
+            background_tasks.add_task(_create_evidence, result.evidence_url, str(pdf_path), priority_class,
+                                      alert.alert_id, metadata)
+            result.evidence_path = evidence_path
+        else:
+            try:
+                await _create_evidence(result.evidence_url, str(pdf_path), priority_class,
+                                       alert.alert_id, metadata)
+                result.evidence_path = evidence_path
+            except Exception as e:
+                logger.error(f"Error creating evidence for alert {alert.alert_id}: {e}")
+    
+    return AlertResponse(
+        alert_id=alert.alert_id,
+        is_true_positive=result.is_true_positive,
+        justification=result.justification,
+        evidence_path=result.evidence_path
+    )
+
+async def _process_job_alert(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job processor: runs one alert of a batch job and returns a JSON-ready result"""
+    return jsonable_encoder(await _run_alert(ProcessAlertRequest(**payload), priority_class=BULK))
+
+# Background jobs for large batches, persisted so they resume after a restart
+job_manager = JobManager(
+    _process_job_alert,
+    WorkQueue(os.getenv("JOB_QUEUE_DB", str(RESULTS_DIR / "jobs.db"))),
+    retention_seconds=int(os.getenv("JOB_RETENTION_SECONDS", "3600")),
+    concurrency=int(os.getenv("JOB_CONCURRENCY", "1")),
+)
+
+@app.exception_handler(CapacityExceeded)
+async def capacity_exceeded_handler(request: Request, exc: CapacityExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.reason, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.on_event("startup")
+async def start_job_manager():
+    # Evidence written flat into EVIDENCE_DIR by earlier versions moves into the indexed store
+    await asyncio.to_thread(evidence_store.import_legacy, str(EVIDENCE_DIR))
+    result_store.start()
+    audit_log.start()
+    await job_manager.start()
+
+@app.on_event("shutdown")
+async def stop_job_manager():
+    await job_manager.shutdown()
+    await result_store.close()
+    await audit_log.close()
+    await browser_pool.close()
+    await asyncio.to_thread(pdf_renderer.shutdown)
+
 @app.post("/process_alert", response_model=AlertResponse)
 async def process_alert(alert: ProcessAlertRequest, background_tasks: BackgroundTasks):
-    try:
-        logger.info(f"Processing alert {alert.alert_id} for ISIN {alert.isin}")
-        
-        # Convert to our internal Alert model
-        alert_obj = Alert(
-            alert_id=alert.alert_id,
-            isin=alert.isin,
-            security_name=alert.security_name,
-            outstanding_shares_system=alert.outstanding_shares_system
-        )
-        
-        # Process the alert
-        result = await agent_system.process_alert(alert_obj)
-        
-        # Generate evidence PDF in the background (if needed)
-        if result.evidence_url:
-            pdf_path = EVIDENCE_DIR / f"{alert.alert_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            background_tasks.add_task(create_webpage_snapshot, result.evidence_url, str(pdf_path))
-            result.evidence_path = str(pdf_path)
+    async with admission.admit():
+        try:
+            return await _run_alert(alert, background_tasks, INTERACTIVE)
         
-        return AlertResponse(
-            alert_id=alert.alert_id,
-            is_true_positive=result.is_true_positive,
-            justification=result.justification,
-            evidence_path=result.evidence_path
-        )
-    
-    except Exception as e:
-        logger.error(f"Error processing alert: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error processing alert: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/process_alerts_batch", response_model=List[AlertResponse])
 async def process_alerts_batch(request: ProcessAlertsRequest, background_tasks: BackgroundTasks):
-    results = []
-    for alert_req in request.alerts:
+    # Alerts of a batch run one after another, so the batch holds a single slot
+    async with admission.admit():
+        results = []
+        for alert_req in request.alerts:
+            try:
+                result = await _run_alert(alert_req, background_tasks, BULK)
+                results.append(result)
+            except Exception as e:
+                logger.error(f"Error processing alert {alert_req.alert_id}: {e}")
+                results.append(AlertResponse(
+                    alert_id=alert_req.alert_id,
+                    is_true_positive=False,
+                    justification=f"Error during processing: {str(e)}",
+                    evidence_path=None
+                ))
+        
+        return results
+
+@app.post("/process_alerts_upload")
+async def process_alerts_upload(file: UploadFile = File(...)):
+    """
+    Processes the alerts of an uploaded CSV file, streaming one NDJSON line per alert
+
+    The file is parsed UPLOAD_BATCH_SIZE rows at a time while earlier alerts
+    are processed, and bounded queues between parsing, processing and the
+    response keep memory flat however large the file is. Results are written in
+    completion order, followed by an "end" line with the counts.
+    """
+    # Like a batch, an upload holds a single admission slot, released when the stream ends
+    slot = AsyncExitStack()
+    await slot.enter_async_context(admission.admit())
+    batches = iter_alert_batches_from_stream(file.file, UPLOAD_BATCH_SIZE)
+    try:
+        # The first batch is read up front, so a malformed file is rejected with a 400
+        first = await asyncio.to_thread(next, batches, None)
+    except AlertFileError as e:
+        await slot.aclose()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await slot.aclose()
+        raise
+
+    lines: asyncio.Queue = asyncio.Queue(UPLOAD_CONCURRENCY * 2)
+    counts = {"processed": 0, "failed": 0}
+
+    async def process(alert: Alert) -> AlertResponse:
         try:
-            result = await process_alert(alert_req, background_tasks)
-            results.append(result)
+            return await _run_alert(ProcessAlertRequest(
+                alert_id=alert.alert_id,
+                isin=alert.isin,
+                security_name=alert.security_name,
+                outstanding_shares_system=alert.outstanding_shares_system
+            ), priority_class=BULK)
         except Exception as e:
-            logger.error(f"Error processing alert {alert_req.alert_id}: {e}")
-            results.append(AlertResponse(
-                alert_id=alert_req.alert_id,
+            logger.error(f"Error processing alert {alert.alert_id}: {e}")
+            counts["failed"] += 1
+            return AlertResponse(
+                alert_id=alert.alert_id,
                 is_true_positive=False,
                 justification=f"Error during processing: {str(e)}",
                 evidence_path=None
-            ))
+            )
+
+    async def emit(response: AlertResponse):
+        counts["processed"] += 1
+        await lines.put({"event": "result", **jsonable_encoder(response)})
+
+    pipeline = Pipeline([Stage("process", process, UPLOAD_CONCURRENCY), Stage("emit", emit)])
+
+    async def feed():
+        try:
+            batch = first
+            while batch is not None:
+                for alert in batch:
+                    await pipeline.put(alert)
+                batch = await asyncio.to_thread(next, batches, None)
+        except Exception as e:
+            # Alerts read before the error are still processed
+            logger.error(f"Error reading uploaded alerts from {file.filename}: {e}")
+            await lines.put({"event": "error", "detail": str(e)})
+        await pipeline.join()
+        await lines.put({"event": "end", **counts})
+
+    async def events():
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                line = await lines.get()
+                yield json.dumps(line) + "\n"
+                if line["event"] == "end":
+                    break
+        finally:
+            # Stops processing when the client disconnects
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+            await pipeline.stop()
+            await file.close()
+            await slot.aclose()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/jobs", response_model=JobSubmission, status_code=202)
+async def submit_job(request: ProcessAlertsRequest):
+    if len(request.alerts) > JOB_MAX_BACKLOG:
+        raise HTTPException(status_code=413, detail=f"A job may contain at most {JOB_MAX_BACKLOG} alerts")
+    backlog = await job_manager.backlog()
+    excess = backlog + len(request.alerts) - JOB_MAX_BACKLOG
+    if excess > 0:
+        raise CapacityExceeded(admission.estimate_wait(excess, job_manager.concurrency),
+                               f"Job backlog is full ({backlog} alerts queued)")
+    job = await job_manager.submit(jsonable_encoder(request.alerts))
+    return JobSubmission(
+        job_id=job.job_id,
+        status_url=f"/jobs/{job.job_id}",
+        results_url=f"/jobs/{job.job_id}/results"
+    )
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.status()
+
+@app.get("/jobs/{job_id}/results")
+async def stream_job_results(job_id: str, request: Request, format: Optional[str] = None):
+    """Streams per-alert results as they complete, as NDJSON (default) or Server-Sent Events"""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    use_sse = format == "sse" or (format is None and "text/event-stream" in request.headers.get("accept", ""))
+    
+    async def events():
+        async for record in job_manager.stream(job):
+            if use_sse:
+                yield f"event: result\ndata: {json.dumps(record)}\n\n"
+            else:
+                yield json.dumps({"event": "result", **record}) + "\n"
+        status = jsonable_encoder(job.status())
+        if use_sse:
+            yield f"event: end\ndata: {json.dumps(status)}\n\n"
+        else:
+            yield json.dumps({"event": "end", "status": status}) + "\n"
+    
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+@app.get("/jobs/{job_id}/report")
+async def get_job_report(job_id: str):
+    """Returns one consolidated PDF report for all alerts of a finished job"""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.is_finished:
+        raise HTTPException(status_code=409, detail="Job is still running")
     
-    return results
+    report_path = RESULTS_DIR / f"job_{job_id}_report.pdf"
+    if not report_path.exists():
+        entries = []
+        async for record in job_manager.stream(job):
+            if "result" in record:
+                entries.append((record["index"], record["result"]))
+            else:
+                entries.append((record["index"], {"alert_id": f"#{record['index'] + 1}", "error": record["error"]}))
+        entries.sort(key=lambda entry: entry[0])
+        timing = await pdf_renderer.render_report(
+            f"Alert Processing Report - Job {job_id}", [entry for _, entry in entries], str(report_path)
+        )
+        logger.info(f"Report for job {job_id} ({len(entries)} alerts) rendered in {timing['render_seconds']:.2f}s")
+    return FileResponse(str(report_path), media_type="application/pdf")
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not await job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job already {job.state.value}")
+    return job.status()
+
+@app.get("/results")
+async def list_results(alert_id: Optional[str] = None, isin: Optional[str] = None, country: Optional[str] = None,
+                       decision: Optional[str] = None, since: Optional[datetime] = None,
+                       until: Optional[datetime] = None, limit: int = 100, before: Optional[int] = None):
+    """
+    Lists stored decisions, newest first, filtered by alert, ISIN, country (ISIN prefix),
+    decision ("true_positive" / "false_positive") and processing time
+
+    Pages hold up to `limit` results (at most 1000); pass the returned `next` as `before`
+    to get the following page.
+    """
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    return await asyncio.to_thread(result_store.query, limit=limit, before=before, alert_id=alert_id, isin=isin,
+                                   country=country, decision=decision, since=since, until=until)
+
+@app.get("/results/counts")
+async def count_results(group_by: str = "decision", alert_id: Optional[str] = None, isin: Optional[str] = None,
+                        country: Optional[str] = None, decision: Optional[str] = None,
+                        since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Counts stored decisions matching the filters of GET /results per decision, country, isin or day"""
+    try:
+        return await asyncio.to_thread(result_store.counts, group_by=group_by, alert_id=alert_id, isin=isin,
+                                       country=country, decision=decision, since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/evidence/{alert_id}")
-async def get_evidence(alert_id: str):
-    # Find the most recent evidence for this alert
-    files = list(EVIDENCE_DIR.glob(f"{alert_id}_*.pdf"))
-    if not files:
-        raise HTTPException(status_code=404, detail="Evidence not found")
+async def get_evidence(alert_id: str, request: Request, format: str = "pdf"):
+    """
+    Returns the latest evidence of an alert
+
+    Evidence is found through the store's index rather than by listing the
+    evidence directory. Responses carry the content hash as ETag, so clients
+    revalidate with If-None-Match, and support byte ranges for partial downloads.
+    """
+    if format not in ("pdf", "png"):
+        raise HTTPException(status_code=400, detail="format must be pdf or png")
+    media_type = "application/pdf" if format == "pdf" else "image/png"
     
-    latest_file = max(files, key=lambda p: p.stat().st_mtime)
-    return FileResponse(str(latest_file), media_type="application/pdf")
+    if format == "pdf":
+        stored = await asyncio.to_thread(evidence_store.latest, alert_id)
+        if stored is not None and stored["path"].exists():
+            return file_response(request, stored["path"], media_type, stored["digest"])
+    
+    # Otherwise render the stored snapshot once and serve the cached rendering afterwards
+    snapshot = await asyncio.to_thread(snapshot_store.latest, alert_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    # Concurrent requests for the same evidence wait for a single rendering
+    key = f"{alert_id}:{snapshot.content_hash}:{format}"
+    lock = _render_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            with priority(INTERACTIVE):
+                path = await render_snapshot(snapshot_store, snapshot, format, browser_pool, pdf_renderer)
+    finally:
+        _render_locks.pop(key, None)
+    return file_response(request, path, media_type, f"{snapshot.content_hash}-{format}")
+
+@app.delete("/evidence/{alert_id}")
+async def release_evidence(alert_id: str):
+    """Releases an alert's references to stored evidence; unreferenced evidence may then be evicted"""
+    released = await asyncio.to_thread(evidence_store.release, alert_id)
+    if not released:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    audit_log.record("evidence_released", alert_id=alert_id, released=released)
+    return {"alert_id": alert_id, "released": released}
+
+@app.get("/audit")
+async def export_audit_log(since: Optional[datetime] = None, until: Optional[datetime] = None,
+                           event: Optional[str] = None, alert_id: Optional[str] = None):
+    """Exports audit records (decision, evidence, evidence_released) as NDJSON, oldest first"""
+    # Records buffered so far are written first, so the export includes them
+    await audit_log.flush()
+    records = audit_log.read(since=since, until=until, event=event, alert_id=alert_id)
+    # A plain iterator is read in a worker thread by the response
+    return StreamingResponse((json.dumps(record) + "\n" for record in records), media_type="application/x-ndjson")
+
+@app.get("/metrics/evidence")
+async def evidence_metrics():
+    """Evidence storage: bytes stored, bytes referenced by alerts and the dedup ratio"""
+    return await asyncio.to_thread(evidence_store.stats)
+
+@app.get("/metrics/scheduling")
+async def scheduling_metrics():
+    """Queue wait times per priority class for browser pages and LLM conversations"""
+    return {
+        "browser_pool": browser_pool.stats(),
+        "llm": governor.stats(),
+    }
+
+@app.get("/metrics/queues")
+async def queue_metrics():
+    """Queue-depth gauges for API admission, browser pages, LLM conversations and jobs"""
+    return {
+        "admission": admission.stats(),
+        "result_store": result_store.stats(),
+        "audit_log": audit_log.stats(),
+        "browser_pages_waiting": sum(c["waiting"] for c in browser_pool.stats()["wait"].values()),
+        "llm_chats_waiting": sum(c["waiting"] for c in governor.stats()["wait"].values()),
+        "job_backlog": await job_manager.backlog(),
+        "job_max_backlog": JOB_MAX_BACKLOG,
+        "pdf_render": pdf_renderer.stats(),
+    }
 
 @app.get("/health")
 async def health_check():
@@ -1,21 +1,75 @@
-from typing import Dict, Optional, Tuple
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
 import logging
 import aiohttp
-from playwright.async_api import async_playwright
 import re
 import asyncio
+from utils.browser_pool import BrowserPool, open_page
+from utils.change_detection import ChangeDetector
+from utils.page_capture import CaptureStore, capture_page
+from utils.verification_history import MARKET, VerificationHistory
 
 logger = logging.getLogger(__name__)
 
+# Page each country's market check reads, by ISIN
+MARKET_URLS = {
+    "DE": "https://www.boerse-frankfurt.de/aktie/{isin}",
+    "FR": "https://live.euronext.com/en/product/equities/{isin}-XPAR/market-information",
+}
+
 class MarketTypeValidator:
     """Validates if a security is traded on a regulated market or growth market"""
     
-    async def check_market_type(self, isin: str) -> Tuple[bool, str, str]:
+    def __init__(self, browser_pool: Optional[BrowserPool] = None,
+                 capture_store: Optional[CaptureStore] = None,
+                 history: Optional[VerificationHistory] = None,
+                 change_detector: Optional[ChangeDetector] = None):
+        """
+        Args:
+            browser_pool: Shared browser pool; without one, each check launches its own browser
+            capture_store: When given, pages used as a source are captured for the evidence PDF
+            history: When given, conclusive results are recorded in it and as-of checks are answered from it
+            change_detector: When given, unchanged source pages are neither loaded nor captured again
+        """
+        self.browser_pool = browser_pool
+        self.capture_store = capture_store
+        self.history = history
+        self.change_detector = change_detector
+    
+    async def _capture(self, page, requested_url: str, selector: Optional[str] = None,
+                       outcome: Optional[Tuple] = None, values: Sequence[str] = ()):
+        """
+        Keeps screenshots of the source page so the evidence step does not load it again
+        
+        With a change detector, the screenshots are only taken again when the
+        outcome or the element holding the data changed since the last check.
+        
+        Args:
+            page: The loaded source page
+            requested_url: URL the page was opened with
+            selector: Element holding the data, captured on its own in clip and both modes
+            outcome: Result the check returns, fingerprinted with the element
+            values: Page text the outcome was read from, looked for in the page's HTTP body
+        """
+        if self.change_detector is not None and outcome is not None:
+            dom = await page.inner_html(selector) if selector else await page.content()
+            take_capture = (lambda: capture_page(page, selector=selector)) if self.capture_store is not None else None
+            capture = await self.change_detector.capture(requested_url, dom, list(outcome), take_capture, values)
+            if capture is not None:
+                self.capture_store.put(capture, requested_url)
+            return
+        if self.capture_store is not None:
+            self.capture_store.put(await capture_page(page, selector=selector), requested_url)
+    
+    async def check_market_type(self, isin: str, as_of: Optional[datetime] = None) -> Tuple[bool, str, str]:
         """
         Check the market type for a given ISIN
         
         Args:
             isin: The ISIN to check
+            as_of: When given, the market type at that time is taken from the verification
+                history without loading a page; the live check is the fallback for an ISIN
+                the history has no record of by then
             
         Returns:
             Tuple containing:
@@ -23,9 +77,32 @@ class MarketTypeValidator:
             - market_type: The identified market type
             - source_url: The URL that was used to get this information
         """
+        if as_of is not None and self.history is not None:
+            observation = await asyncio.to_thread(self.history.as_of, MARKET, isin, as_of)
+            if observation is not None:
+                logger.info(f"Market type of {isin} as of {as_of} taken from the verification history")
+                return observation.outcome["is_regulated"], observation.outcome["market_type"], observation.source_url
+        
+        is_regulated, market_type, source_url = await self._check_market(isin)
+        if is_regulated is not None and self.history is not None:
+            await asyncio.to_thread(self.history.record, MARKET, isin,
+                                    {"is_regulated": is_regulated, "market_type": market_type}, source_url)
+        return is_regulated, market_type, source_url
+    
+    async def _check_market(self, isin: str) -> Tuple[bool, str, str]:
+        """Checks the market type on the exchange of the ISIN's country"""
         # First, determine the country from the ISIN
         country_code = isin[:2]
         
+        # A source page unchanged since the last check is not loaded again
+        url = MARKET_URLS.get(country_code, "").format(isin=isin)
+        if url and self.change_detector is not None:
+            state = await self.change_detector.revalidate(url, need_capture=self.capture_store is not None)
+            if state is not None:
+                if self.capture_store is not None:
+                    self.capture_store.put(state.capture, url)
+                return tuple(state.outcome)
+        
         if country_code == "DE":
             return await self._check_german_market(isin)
         elif country_code == "FR":
@@ -39,12 +116,9 @@ class MarketTypeValidator:
         """
         Check if a German security is on a regulated market using boerse-frankfurt.de
         """
-        url = f"https://www.boerse-frankfurt.de/aktie/{isin}"
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
+        url = MARKET_URLS["DE"].format(isin=isin)
 
+        async with open_page(self.browser_pool, url) as page:
             try:
                 await page.goto(url)
                 await page.wait_for_selector(".widget-table", timeout=10000)
@@ -66,6 +140,8 @@ class MarketTypeValidator:
 
                 is_regulated = "regulierter markt" in market_type
                 pretty_market = "Regulated Market" if is_regulated else "Unregulated Market" if market_type else "Unknown Market"
+                await self._capture(page, url, "table.widget-table", (is_regulated, pretty_market, page.url),
+                                    (market_type,))
                 url = page.url
 
                 return is_regulated, pretty_market, url
@@ -73,16 +149,11 @@ class MarketTypeValidator:
             except Exception as e:
                 logger.error(f"Error checking German market for {isin}: {e}")
                 return None, f"Error checking market: {str(e)}", url
-
-            finally:
-                await browser.close()
     
     async def _check_french_market(self, isin: str) -> Tuple[bool, str, str]:
         """Check if a French security is on a regulated market (via Euronext Paris)."""
-        url = f"https://live.euronext.com/en/product/equities/{isin}-XPAR/market-information"
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            page = await browser.new_page()
+        url = MARKET_URLS["FR"].format(isin=isin)
+        async with open_page(self.browser_pool, url, launch_options={"headless": False}) as page:
             try:
                 await page.goto(url)
                 await page.wait_for_selector("div#fs_info_block table", timeout=15000)
@@ -97,13 +168,13 @@ class MarketTypeValidator:
                         if key == "Market":
                             is_regulated = value.strip().lower() == "euronext paris"
                             market_type = "Regulated Market" if is_regulated else "Unregulated Market"
+                            await self._capture(page, url, "div#fs_info_block table",
+                                                (is_regulated, market_type, url), (value,))
                             return is_regulated, market_type, url
                 return None, "Market info not found", url
             except Exception as e:
                 logger.error(f"Error checking French market for {isin}: {e}")
                 return None, f"Error checking market: {str(e)}", url
-            finally:
-                await browser.close()
 
 if __name__ == "__main__":
     val = MarketTypeValidator()
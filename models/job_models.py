@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+class JobState(str, Enum):
+    """Lifecycle states of a batch processing job"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+class JobStatus(BaseModel):
+    """Model representing the progress of a batch processing job"""
+    job_id: str
+    state: JobState
+    total: int
+    completed: int = 0
+    failed: int = 0
+    created_timestamp: datetime
+    started_timestamp: Optional[datetime] = None
+    finished_timestamp: Optional[datetime] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -1,20 +1,58 @@
+from datetime import datetime
 from typing import Dict, Optional, Tuple
+import asyncio
 import logging
 import aiohttp
-from playwright.async_api import async_playwright
 import re
 from bs4 import BeautifulSoup
+from utils.browser_pool import BrowserPool, open_page
+from utils.page_capture import CaptureStore, capture_page
+from utils.verification_history import SHARES, VerificationHistory
 
 logger = logging.getLogger(__name__)
 
+# Relative difference between the system and the register still accepted as a match
+SHARE_TOLERANCE = 0.05
+
+def _within_tolerance(actual_shares: int, shares_in_system: int) -> bool:
+    min_valid = shares_in_system * (1 - SHARE_TOLERANCE)
+    max_valid = shares_in_system * (1 + SHARE_TOLERANCE)
+    return min_valid <= actual_shares <= max_valid
+
 class OutstandingShareValidator:
     """Validates outstanding shares information against commercial registers"""
     
+    def __init__(self, browser_pool: Optional[BrowserPool] = None,
+                 capture_store: Optional[CaptureStore] = None,
+                 history: Optional[VerificationHistory] = None):
+        """
+        Args:
+            browser_pool: Shared browser pool; without one, each check launches its own browser
+            capture_store: When given, pages used as a source are captured for the evidence PDF
+            history: When given, register share counts are recorded in it and as-of checks are answered from it
+        """
+        self.browser_pool = browser_pool
+        self.capture_store = capture_store
+        self.history = history
+    
+    async def _capture(self, page, requested_url: str, selector: Optional[str] = None):
+        """
+        Keeps screenshots of the source page so the evidence step does not load it again
+        
+        Args:
+            page: The loaded source page
+            requested_url: URL the page was opened with
+            selector: Element holding the data, captured on its own in clip and both modes
+        """
+        if self.capture_store is not None:
+            self.capture_store.put(await capture_page(page, selector=selector), requested_url)
+    
     async def validate_outstanding_shares(self, 
                                    country_code: str, 
                                    company_name: str, 
                                    isin: str,
-                                   shares_in_system: int) -> Tuple[bool, int, str]:
+                                   shares_in_system: int,
+                                   as_of: Optional[datetime] = None) -> Tuple[bool, int, str]:
         """
         Validate the outstanding shares for a company
         
@@ -23,6 +61,9 @@ class OutstandingShareValidator:
             company_name: Name of the company
             isin: ISIN of the security
             shares_in_system: Number of outstanding shares in the UBS system
+            as_of: When given, the register share count at that time is taken from the
+                verification history without loading a page; the live check is the fallback
+                for an ISIN the history has no record of by then
             
         Returns:
             Tuple containing:
@@ -30,6 +71,27 @@ class OutstandingShareValidator:
             - actual_shares: The number of shares found in the commercial register
             - source_url: The URL that was used to get this information
         """
+        if as_of is not None and self.history is not None:
+            observation = await asyncio.to_thread(self.history.as_of, SHARES, isin, as_of)
+            if observation is not None:
+                logger.info(f"Outstanding shares of {isin} as of {as_of} taken from the verification history")
+                actual_shares = observation.outcome["actual_shares"]
+                return _within_tolerance(actual_shares, shares_in_system), actual_shares, observation.source_url
+        
+        is_valid, actual_shares, source_url = await self._check_register(
+            country_code, company_name, isin, shares_in_system
+        )
+        if actual_shares is not None and self.history is not None:
+            await asyncio.to_thread(self.history.record, SHARES, isin,
+                                    {"actual_shares": actual_shares, "company_name": company_name}, source_url)
+        return is_valid, actual_shares, source_url
+    
+    async def _check_register(self,
+                              country_code: str,
+                              company_name: str,
+                              isin: str,
+                              shares_in_system: int) -> Tuple[bool, int, str]:
+        """Checks the commercial register of the company's country"""
         if country_code == "DE":
             return await self._check_german_register(company_name, isin, shares_in_system)
         elif country_code == "FR":
@@ -43,10 +105,7 @@ class OutstandingShareValidator:
                               isin: str,
                               shares_in_system: int) -> Tuple[bool, int, str]:
         """Check the German commercial register for outstanding shares"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            
+        async with open_page(self.browser_pool, "https://www.unternehmensregister.de/") as page:
             try:
                 # Navigate to Unternehmensregister
                 await page.goto("https://www.unternehmensregister.de/")
@@ -80,12 +139,9 @@ class OutstandingShareValidator:
                         actual_shares = int(float(shares_str))
                         
                         # Compare with system value (with 5% tolerance)
-                        tolerance = 0.05
-                        min_valid = shares_in_system * (1 - tolerance)
-                        max_valid = shares_in_system * (1 + tolerance)
-                        
-                        is_valid = min_valid <= actual_shares <= max_valid
+                        is_valid = _within_tolerance(actual_shares, shares_in_system)
                         
+                        await self._capture(page, page.url)
                         return is_valid, actual_shares, page.url
                 
                 return False, None, page.url
@@ -93,9 +149,6 @@ class OutstandingShareValidator:
             except Exception as e:
                 logger.error(f"Error checking German register for {company_name}: {e}")
                 return None, None, None
-            
-            finally:
-                await browser.close()
     
     async def _check_french_register(self, 
                               company_name: str, 
@@ -120,10 +173,7 @@ class OutstandingShareValidator:
                                isin: str,
                                shares_in_system: int) -> Tuple[bool, int, str]:
         """Generic implementation for checking commercial registers"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            
+        async with open_page(self.browser_pool, register_url) as page:
             try:
                 await page.goto(register_url)
                 
@@ -150,19 +200,13 @@ class OutstandingShareValidator:
                     actual_shares = int(float(shares_str))
                     
                     # Compare with system value (with 5% tolerance)
-                    tolerance = 0.05
-                    min_valid = shares_in_system * (1 - tolerance)
-                    max_valid = shares_in_system * (1 + tolerance)
-                    
-                    is_valid = min_valid <= actual_shares <= max_valid
+                    is_valid = _within_tolerance(actual_shares, shares_in_system)
                     
+                    await self._capture(page, page.url)
                     return is_valid, actual_shares, page.url
                 
                 return False, None, page.url
                 
             except Exception as e:
                 logger.error(f"Error checking register at {register_url} for {company_name}: {e}")
-                return None, None, None
-            
-            finally:
-                await browser.close()
\ No newline at end of file
+                return None, None, None
\ No newline at end of file
@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from utils.admission_controller import AdmissionController, CapacityExceeded
+
+@pytest.mark.asyncio
+async def test_requests_beyond_capacity_and_queue_are_rejected_with_retry_after():
+    controller = AdmissionController(capacity=2, max_queue=1, initial_service_seconds=10.0)
+    release = asyncio.Event()
+
+    async def request():
+        async with controller.admit():
+            await release.wait()
+
+    running = [asyncio.create_task(request()) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert controller.stats()["queued"] == 1
+
+    with pytest.raises(CapacityExceeded) as rejected:
+        async with controller.admit():
+            pass
+    # Two queued alerts ahead (including this one) shared by two slots of 10s each
+    assert rejected.value.retry_after == 10
+    assert controller.rejected == 1
+
+    release.set()
+    await asyncio.gather(*running)
+    assert controller.in_flight == 0
+    async with controller.admit():
+        assert controller.in_flight == 1
+
+def test_retry_after_follows_observed_alert_time():
+    controller = AdmissionController(capacity=1, max_queue=0, initial_service_seconds=30.0, smoothing=0.5)
+    controller.observe(10.0)
+    assert controller.service_seconds == 20.0
+    assert controller.estimate_wait(3, workers=2) == 30
+    assert controller.estimate_wait(0, workers=1) == 1
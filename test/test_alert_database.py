@@ -0,0 +1,64 @@
+import asyncio
+import sqlite3
+import pytest
+import pytest_asyncio
+from data_access.alert_database import AlertDatabase, ConnectionPool, sqlite_connect
+
+def _create_alerts(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE alerts (alert_id TEXT, isin TEXT, security_name TEXT, "
+                 "outstanding_shares_system INTEGER, status TEXT, row_version INTEGER)")
+    _insert(conn, rows)
+    return conn
+
+def _insert(conn, rows):
+    conn.executemany("INSERT INTO alerts VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+@pytest.mark.asyncio
+async def test_alerts_are_streamed_in_batches_through_pooled_connections(tmp_path):
+    path = str(tmp_path / "alerts.db")
+    _create_alerts(path, [(f"A{n}", f"DE{n:010d}", f"Security {n}", 1000 + n if n % 2 else None,
+                           "PENDING" if n < 5 else "DONE", n) for n in range(7)])
+    opened = []
+
+    def connect():
+        opened.append(1)
+        return sqlite_connect(path)()
+
+    pool = ConnectionPool(connect, size=1)
+    database = AlertDatabase(pool, batch_size=2)
+    batches = [batch async for batch in database.iter_alert_batches()]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    alerts = [alert for batch in batches for alert in batch]
+    assert [alert.alert_id for alert in alerts] == ["A0", "A1", "A2", "A3", "A4"]
+    assert [alert.outstanding_shares_system for alert in alerts] == [None, 1001, None, 1003, None]
+
+    # Concurrent readers wait for the single connection and then reuse it
+    async def count():
+        return sum([len(batch) async for batch in database.iter_alert_batches()])
+
+    assert await asyncio.gather(count(), count()) == [5, 5]
+    assert len(opened) == 1
+    pool.close()
+
+@pytest.mark.asyncio
+async def test_watermark_reads_only_new_alerts(tmp_path):
+    path = str(tmp_path / "alerts.db")
+    writer = _create_alerts(path, [("A1", "DE1", "One", 1, "PENDING", 1), ("A2", "DE2", "Two", 2, "PENDING", 2)])
+    database = AlertDatabase(ConnectionPool(sqlite_connect(path)), watermark_column="row_version")
+
+    first = [alert.alert_id async for batch in database.iter_alert_batches() for alert in batch]
+    assert first == ["A1", "A2"]
+    assert database.watermark == 2
+    assert [batch async for batch in database.iter_alert_batches()] == []
+
+    _insert(writer, [("A3", "DE3", "Three", 3, "PENDING", 3)])
+    polled = database.poll(interval=0.01)
+    batch = await polled.__anext__()
+    await polled.aclose()
+    assert [alert.alert_id for alert in batch] == ["A3"]
+    assert database.watermark == 3
+
+    with pytest.raises(ValueError):
+        await AlertDatabase(ConnectionPool(sqlite_connect(path))).poll().__anext__()
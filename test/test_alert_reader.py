@@ -0,0 +1,50 @@
+import io
+import pytest
+from data_access.alert_reader import (AlertFileError, iter_alert_batches, iter_alert_batches_from_stream,
+                                      load_alerts_from_csv)
+
+def test_alerts_are_read_in_batches_with_typed_columns(tmp_path):
+    path = tmp_path / "alerts.csv"
+    path.write_text(
+        "alert_id,isin,security_name,outstanding_shares_system,comment\n"
+        "001,DE0005140008,Deutsche Bank,2066773131,x\n"
+        "002,FR0000131104,BNP Paribas,,y\n"
+        "003,CH0012032048,Roche,160000000.0,z\n"
+        ",CH0244767585,UBS,100,missing id\n"
+    )
+
+    batches = list(iter_alert_batches(str(path), batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 1]
+    alerts = [alert for batch in batches for alert in batch]
+    # Identifiers stay strings, share counts become integers or None
+    assert [alert.alert_id for alert in alerts] == ["001", "002", "003"]
+    assert [alert.outstanding_shares_system for alert in alerts] == [2066773131, None, 160000000]
+    assert alerts[0].received_timestamp is not None
+
+def test_invalid_files_are_rejected_per_column(tmp_path):
+    missing = tmp_path / "missing.csv"
+    missing.write_text("alert_id,security_name\n1,Deutsche Bank\n")
+    with pytest.raises(AlertFileError, match="isin"):
+        list(iter_alert_batches(str(missing)))
+    assert load_alerts_from_csv(str(missing)) == []
+
+    bad_shares = tmp_path / "bad_shares.csv"
+    bad_shares.write_text("alert_id,isin,security_name,outstanding_shares_system\n1,DE1,A,many\n2,DE2,B,1.5\n")
+    with pytest.raises(AlertFileError, match="2 values"):
+        list(iter_alert_batches(str(bad_shares)))
+
+def test_uploaded_streams_are_read_chunk_by_chunk():
+    upload = io.BytesIO(
+        "\ufeffalert_id,isin,security_name,outstanding_shares_system\n"
+        "001,DE0005140008,Deutsche Bank,2066773131\n"
+        "002,FR0000131104,BNP Paribas,\n"
+        "003,CH0012032048,Roche,160000000\n".encode("utf-8")
+    )
+    batches = list(iter_alert_batches_from_stream(upload, batch_size=2))
+    assert [[alert.alert_id for alert in batch] for batch in batches] == [["001", "002"], ["003"]]
+    assert batches[0][1].outstanding_shares_system is None
+
+    with pytest.raises(AlertFileError, match="security_name"):
+        list(iter_alert_batches_from_stream(io.BytesIO(b"alert_id,isin\n1,DE1\n")))
+    with pytest.raises(AlertFileError, match="empty"):
+        list(iter_alert_batches_from_stream(io.BytesIO(b"")))
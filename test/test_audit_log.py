@@ -0,0 +1,49 @@
+import asyncio
+import time
+from datetime import datetime
+import pytest
+import pytest_asyncio
+from utils.audit_log import AuditLog
+
+@pytest.mark.asyncio
+async def test_records_are_group_committed_and_read_back(tmp_path):
+    log = AuditLog(str(tmp_path), flush_interval=0.05)
+    log.start()
+    for n in range(100):
+        log.record("decision", alert_id=f"A{n % 3}", is_true_positive=n % 2 == 0)
+    log.record("evidence", alert_id="A1", digest="abc")
+    assert log.stats()["written"] == 0
+    await asyncio.sleep(0.2)
+    # All records buffered while the writer waited went out in one write
+    assert (log.stats()["written"], log.stats()["batches"]) == (101, 1)
+    await log.close()
+
+    records = list(log.read())
+    assert [record["seq"] for record in records] == list(range(1, 102))
+    assert [record["digest"] for record in log.read(event="evidence")] == ["abc"]
+    assert len(list(log.read(alert_id="A1", event="decision"))) == 33
+
+    # A reopened log continues the sequence in a new segment
+    reopened = AuditLog(str(tmp_path))
+    reopened.record("decision", alert_id="A9")
+    await reopened.close()
+    assert len(reopened.segments()) == 2
+    assert list(reopened.read(alert_id="A9"))[0]["seq"] == 102
+
+@pytest.mark.asyncio
+async def test_segments_rotate_and_corrupt_lines_are_skipped(tmp_path):
+    log = AuditLog(str(tmp_path), segment_bytes=200)
+    for n in range(6):
+        log.record("decision", alert_id=f"A{n}")
+        await log.flush()
+    await log.close()
+    segments = log.segments()
+    assert len(segments) > 1
+
+    # Alter a record: its checksum no longer matches
+    data = segments[0].read_bytes()
+    segments[0].write_bytes(data.replace(b'"A0"', b'"AX"'))
+    assert [record["alert_id"] for record in log.read()] == ["A1", "A2", "A3", "A4", "A5"]
+
+    assert list(log.read(since=datetime.fromtimestamp(time.time() + 10))) == []
+    assert len(list(log.read(until=datetime.fromtimestamp(time.time() + 10)))) == 5
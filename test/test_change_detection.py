@@ -0,0 +1,138 @@
+import pytest
+import pytest_asyncio
+from utils.change_detection import ChangeDetector
+from utils.page_capture import CapturedImage, PageCapture
+
+URL = "https://www.boerse-frankfurt.de/aktie/DE0007164600"
+PAGE = b"<html><td>Regulierter&nbsp;Markt</td></html>"
+
+def _capture(data: bytes) -> PageCapture:
+    image = CapturedImage(kind="clip", data=data, image_format="png", width=1, height=1,
+                          capture_seconds=0.1, encode_seconds=0.0)
+    return PageCapture(url=URL, title="SAP", images=[image])
+
+def _site(tmp_path, **options):
+    responses = []
+    requests = []
+
+    async def fetch(url, headers):
+        requests.append(headers)
+        return responses.pop(0)
+
+    return ChangeDetector(str(tmp_path / "fingerprints.db"), fetch=fetch, **options), responses, requests
+
+@pytest_asyncio.fixture
+async def site(tmp_path):
+    detector, responses, requests = _site(tmp_path)
+    yield detector, responses, requests
+    detector.close()
+
+@pytest.mark.asyncio
+async def test_unchanged_pages_are_not_loaded_again(site):
+    detector, responses, requests = site
+    outcome = [True, "Regulated Market", URL]
+
+    responses.append((200, {"ETag": '"v1"'}, PAGE))
+    assert await detector.revalidate(URL, need_capture=True) is None
+    taken = [_capture(b"\x89PNG\x00first")]
+
+    async def take():
+        return taken[-1]
+
+    assert await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take, ["regulierter markt"]) == taken[0]
+    assert requests[0] == {}
+
+    # The server revalidates the ETag
+    responses.append((304, {}, b""))
+    state = await detector.revalidate(URL, need_capture=True)
+    assert requests[1] == {"If-None-Match": '"v1"'}
+    assert state.outcome == outcome
+    assert state.capture.screenshot == b"\x89PNG\x00first"
+
+    # Without validator support, an identical body is as good
+    responses.append((200, {"ETag": '"v1"'}, PAGE))
+    assert (await detector.revalidate(URL, need_capture=True)).capture == taken[0]
+
+    stats = detector.stats()
+    assert stats["not_modified"] == 1 and stats["body_unchanged"] == 1
+    assert stats["load_skip_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_capture_is_taken_only_when_data_or_region_changes(site):
+    detector, responses, requests = site
+    outcome = [True, "Regulated Market", URL]
+    captures = iter([_capture(b"first"), _capture(b"second")])
+
+    async def take():
+        return next(captures)
+
+    await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take)
+    # The page changed elsewhere (e.g. quotes), but not where the data is read from
+    responses.append((200, {}, b"<html>new quotes <td>Regulierter Markt</td></html>"))
+    assert await detector.revalidate(URL, need_capture=True) is None
+    reused = await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take, ["Regulierter Markt"])
+    assert reused.screenshot == b"first"
+    assert detector.get(URL).body_hash is not None
+
+    changed = await detector.capture(URL, "<td>Freiverkehr</td>", [False, "Unregulated Market", URL], take)
+    assert changed.screenshot == b"second"
+    assert detector.get(URL).outcome == [False, "Unregulated Market", URL]
+
+    # A failed cheap check loads the page
+    responses.append((503, {}, b""))
+    assert await detector.revalidate(URL, need_capture=True) is None
+    stats = detector.stats()
+    assert stats["captures_taken"] == 2 and stats["captures_reused"] == 1
+    assert stats["load_skip_rate"] == 0.0
+
+@pytest.mark.asyncio
+async def test_client_rendered_pages_are_loaded_without_a_cheap_check(site):
+    detector, responses, requests = site
+    outcome = [True, "Regulated Market", URL]
+
+    async def take():
+        return _capture(b"first")
+
+    # The HTTP body is an empty application shell; the data is rendered by scripts
+    shell = (200, {"ETag": '"shell"'}, b"<html><app-root></app-root></html>")
+    responses.append(shell)
+    assert await detector.revalidate(URL, need_capture=True) is None
+    await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take, ["Regulierter Markt"])
+    state = detector.get(URL)
+    assert state.etag is None and state.body_hash is None and not state.verifiable
+
+    # Loaded again without another HTTP request, and still not verifiable
+    assert await detector.revalidate(URL, need_capture=True) is None
+    await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take, ["Regulierter Markt"])
+    assert len(requests) == 1 and not detector.get(URL).verifiable
+    assert detector.stats()["unverifiable"] == 1
+
+    # Once too old, the HTTP body is checked again: the site now serves the data
+    detector.max_age = 0
+    responses.append((200, {"ETag": '"v2"'}, PAGE))
+    assert await detector.revalidate(URL, need_capture=True) is None
+    await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take, ["Regulierter Markt"])
+    assert requests[1] == {}
+    assert detector.get(URL).verifiable and detector.get(URL).etag == '"v2"'
+
+@pytest.mark.asyncio
+async def test_old_pages_are_loaded_and_captured_again(tmp_path):
+    detector, responses, requests = _site(tmp_path, max_age=0)
+    outcome = [True, "Regulated Market", URL]
+    captures = iter([_capture(b"first"), _capture(b"second")])
+
+    async def take():
+        return next(captures)
+
+    responses.append((200, {"ETag": '"v1"'}, PAGE))
+    await detector.revalidate(URL, need_capture=True)
+    await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take, ["Regulierter Markt"])
+
+    # Unchanged, but loaded longer ago than the maximum age: loaded and captured again
+    responses.append((200, {"ETag": '"v1"'}, PAGE))
+    assert await detector.revalidate(URL, need_capture=True) is None
+    assert requests[1] == {}
+    fresh = await detector.capture(URL, "<td>Regulierter Markt</td>", outcome, take, ["Regulierter Markt"])
+    assert fresh.screenshot == b"second"
+    assert detector.stats()["expired"] == 1
+    detector.close()
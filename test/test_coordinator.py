@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from models.alert_models import Alert
+from workers.distributed import Coordinator
+from workers.sqlite_broker import SQLiteBroker
+
+@pytest.mark.asyncio
+async def test_alerts_sharing_an_id_are_verified_separately(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "broker.db"))
+    coordinator = Coordinator(broker, poll_interval=0.01)
+    alerts = [Alert(alert_id="1", isin="DE0007164600", security_name="SAP"),
+              Alert(alert_id="1", isin="FR0000120271", security_name="TotalEnergies")]
+
+    async def node():
+        submitted = 0
+        while submitted < len(alerts):
+            task = broker.claim("node-1")
+            if task is None:
+                await asyncio.sleep(0.01)
+                continue
+            broker.submit_result(task["task_id"], "node-1", {
+                "alert_id": task["payload"]["alert_id"], "is_true_positive": True,
+                "justification": task["payload"]["isin"],
+            })
+            submitted += 1
+
+    worker = asyncio.create_task(node())
+    results = [result async for result in coordinator.run(alerts, job_id="job")]
+    await worker
+
+    assert sorted(result.justification for result in results) == ["DE0007164600", "FR0000120271"]
+    assert broker.progress("job")["done"] == 2
+    broker.close()
+
+@pytest.mark.asyncio
+async def test_task_failed_by_the_broker_is_reported_as_an_error(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "broker.db"), max_attempts=1)
+    coordinator = Coordinator(broker, heartbeat_timeout=-1, poll_interval=0.01)
+    alert = Alert(alert_id="7", isin="DE0007164600", security_name="SAP")
+
+    results = coordinator.run([alert], job_id="job")
+    first = asyncio.create_task(results.__anext__())
+    await asyncio.sleep(0.05)
+    # The node claims the alert and dies with it
+    broker.heartbeat("node-1")
+    broker.claim("node-1")
+
+    result = await asyncio.wait_for(first, timeout=5)
+    assert result.alert_id == "7" and not result.is_true_positive
+    assert result.justification.startswith("Processing error: Task failed")
+    await results.aclose()
+    broker.close()
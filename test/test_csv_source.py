@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+import pytest
+import pytest_asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ubs_autogen"))
+
+from csv_source import _ByteStream, _parse_download  # noqa: E402
+
+HEADER = b"alert_id,isin\n"
+ROWS = b"".join(b"%d,DE0007164600\n" % n for n in range(1000))
+
+async def _collect(body, partial, completed, chunk_rows=100, limit=None):
+    rows = []
+    parsed = _parse_download("https://example.com/alerts.csv", HEADER, body, partial, "utf-8", chunk_rows, None,
+                             lambda: completed.append(True))
+    async for chunk in parsed:
+        rows.extend(chunk)
+        if limit is not None and len(rows) >= limit:
+            await parsed.aclose()
+            break
+    return rows
+
+@pytest.mark.asyncio
+async def test_complete_download_is_parsed_and_cached(tmp_path):
+    async def body():
+        for start in range(0, len(ROWS), 4096):
+            yield ROWS[start:start + 4096]
+
+    completed = []
+    with open(tmp_path / "alerts.part", "wb") as partial:
+        rows = await _collect(body(), partial, completed)
+
+    assert [row["alert_id"] for row in rows] == list(range(1000))
+    assert completed == [True]
+    assert (tmp_path / "alerts.part").read_bytes() == HEADER + ROWS
+
+@pytest.mark.asyncio
+async def test_early_exit_stops_a_download_blocked_on_the_parser(tmp_path):
+    async def endless():
+        while True:
+            yield ROWS
+
+    completed = []
+    with open(tmp_path / "alerts.part", "wb") as partial:
+        rows = await asyncio.wait_for(_collect(endless(), partial, completed, limit=1), timeout=10)
+
+    assert len(rows) == 100
+    assert completed == []
+
+@pytest.mark.asyncio
+async def test_download_failure_fails_the_parse(tmp_path):
+    async def broken():
+        yield ROWS
+        raise ConnectionError("connection reset")
+
+    completed = []
+    with open(tmp_path / "alerts.part", "wb") as partial:
+        with pytest.raises(OSError, match="Download failed: connection reset"):
+            await asyncio.wait_for(_collect(broken(), partial, completed), timeout=10)
+    assert completed == []
+
+def test_finishing_a_full_stream_does_not_block():
+    stream = _ByteStream(max_chunks=1)
+    assert stream.feed(b"abc")
+    stream.finish()
+    buffer = bytearray(8)
+    assert stream.readinto(buffer) == 3 and buffer[:3] == b"abc"
+    assert stream.readinto(buffer) == 0
+
+    stream = _ByteStream(max_chunks=1)
+    stream.feed(b"abc")
+    stream.close()
+    assert not stream.feed(b"def")
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+import threading
+import pytest
+import pytest_asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ubs_autogen"))
+
+import storage  # noqa: E402
+from evidence_index import EvidenceIndex  # noqa: E402
+from storage import EvidenceStorage, SpillDirectory, UploadQueue  # noqa: E402
+
+class FakeBackend:
+    def __init__(self):
+        self.puts = []
+        self.deleted = []
+        self.failing = set()
+        self.open = threading.Event()
+        self.open.set()
+        self._lock = threading.Lock()
+
+    def put(self, object_name, data, content_type):
+        self.open.wait()
+        if object_name in self.failing:
+            raise OSError("bucket unavailable")
+        with self._lock:
+            self.puts.append((object_name, data.read_bytes() if hasattr(data, "read_bytes") else data))
+
+    def delete(self, object_name):
+        self.deleted.append(object_name)
+
+    def public_url(self, object_name):
+        return f"https://storage.example/{object_name}"
+
+@pytest_asyncio.fixture
+async def evidence_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_spill", SpillDirectory(str(tmp_path / "spill"), 1024))
+    index = EvidenceIndex(str(tmp_path / "index.db"))
+    backend = FakeBackend()
+    evidence = EvidenceStorage(backend=backend, evidence_index=index)
+    yield evidence, backend, index
+    await evidence.close()
+
+@pytest.mark.asyncio
+async def test_small_objects_are_batched_and_large_ones_go_alone():
+    backend = FakeBackend()
+    queue = UploadQueue(backend, concurrency=1, batch_size=3, small_bytes=10)
+    results = []
+    for name in ("s1", "s2", "s3"):
+        await queue.submit(name, b"small", on_done=results.append)
+    await queue.submit("large", b"x" * 100, on_done=results.append)
+    backend.failing.add("s5")
+    for name in ("s4", "s5"):
+        await queue.submit(name, b"small", on_done=results.append)
+    await queue.close()
+
+    assert [name for name, _ in backend.puts] == ["s1", "s2", "s3", "large", "s4"]
+    assert results == [True, True, True, True, True, False]
+    stats = queue.stats()
+    assert stats["batches"] == 3
+    assert stats["uploaded"] == 5 and stats["failed"] == 1
+    assert stats["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_large_objects_wait_in_spill_files_within_the_budget(tmp_path):
+    backend = FakeBackend()
+    backend.open.clear()
+    spill = SpillDirectory(str(tmp_path / "spill"), max_bytes=150)
+    queue = UploadQueue(backend, concurrency=1, small_bytes=10, spill=spill, spill_bytes=50)
+    await queue.submit("first", b"a" * 100)
+    # Over the budget while the first file waits: kept in memory instead
+    await queue.submit("second", b"b" * 100)
+    assert spill.stats()["used_bytes"] == 100
+    backend.open.set()
+    await queue.close()
+
+    assert backend.puts == [("first", b"a" * 100), ("second", b"b" * 100)]
+    assert spill.stats() == {"used_bytes": 0, "max_bytes": 150, "spilled": 1, "refused": 1}
+    assert list((tmp_path / "spill").iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_evidence_is_uploaded_once(evidence_storage):
+    evidence, backend, index = evidence_storage
+    urls = await asyncio.gather(*(evidence.upload_bytes(b"\x89PNG same", "shot.png") for _ in range(3)))
+
+    assert len(backend.puts) == 1
+    assert backend.puts[0][0].startswith("evidence/") and backend.puts[0][0].endswith(".png")
+    assert urls == [backend.public_url(backend.puts[0][0])] * 3
+    assert await evidence.upload_bytes(b"\x89PNG same", "again.png") == urls[0]
+    assert len(backend.puts) == 1
+    stats = index.stats()
+    assert stats["objects"] == 1 and stats["dedup_hits"] == 3
+
+@pytest.mark.asyncio
+async def test_failed_upload_returns_no_url(evidence_storage):
+    evidence, backend, index = evidence_storage
+    backend.failing.add(evidence_name := f"evidence/{storage.content_digest(b'broken')}.png")
+    urls = await asyncio.gather(*(evidence.upload_bytes(b"broken", "shot.png") for _ in range(2)))
+
+    assert urls == [None, None]
+    assert index.stats()["objects"] == 0
+
+    # Nothing was recorded, so a later attempt uploads it again
+    backend.failing.clear()
+    assert await evidence.upload_bytes(b"broken", "shot.png") == backend.public_url(evidence_name)
+    assert index.stats()["objects"] == 1
+
+@pytest.mark.asyncio
+async def test_released_evidence_is_evicted_above_the_size_limit(evidence_storage):
+    evidence, backend, index = evidence_storage
+    index.max_bytes = 20
+    first = await evidence.upload_bytes(b"a" * 10, "first.png")
+    second = await evidence.upload_bytes(b"b" * 10, "second.png")
+    assert await evidence.upload_bytes(b"b" * 10, "again.png") == second
+
+    # Referenced evidence is kept above the limit
+    await evidence.upload_bytes(b"c" * 10, "third.png")
+    assert backend.deleted == [] and index.stats()["storage_bytes"] == 30
+
+    # The second object is still referenced once; the first goes
+    assert await evidence.release(second)
+    assert await evidence.release(first)
+    assert backend.deleted == [f"evidence/{storage.content_digest(b'a' * 10)}.png"]
+    stats = index.stats()
+    assert stats["objects"] == 2 and stats["evicted_bytes"] == 10
+
+    # Evicted content is uploaded again when captured again
+    assert await evidence.upload_bytes(b"a" * 10, "first.png") == first
+    assert len(backend.puts) == 4
+    assert index.stats()["objects"] == 3
+    assert not await evidence.release("https://storage.example/unknown.png")
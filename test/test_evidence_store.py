@@ -0,0 +1,59 @@
+import os
+from utils.evidence_store import EvidenceStore, content_key
+
+def test_duplicate_evidence_is_referenced_instead_of_written(tmp_path):
+    store = EvidenceStore(str(tmp_path / "store"))
+    first = store.put_bytes("A1", b"%PDF evidence", ".pdf")
+    source = tmp_path / "render.pdf"
+    source.write_bytes(b"%PDF evidence")
+    second = store.put_file("A2", str(source), ".pdf")
+
+    assert first == second
+    assert first.parent.name == first.name[2:4]
+    assert not source.exists()
+    assert store.latest("A2")["path"] == first
+
+    stats = store.stats()
+    assert stats["blobs"] == 1
+    assert stats["storage_bytes"] == len(b"%PDF evidence")
+    assert stats["dedup_hits"] == 1
+    assert stats["dedup_ratio"] == 2.0
+
+def test_unreferenced_blobs_are_evicted_least_recently_used_first(tmp_path):
+    store = EvidenceStore(str(tmp_path / "store"), max_bytes=20)
+    old = store.put_bytes("A1", b"a" * 10, ".pdf")
+    recent = store.put_bytes("A2", b"b" * 10, ".pdf")
+    assert store.release("A1") == 1
+    assert store.release("A2") == 1
+    assert old.exists() and recent.exists()
+
+    # A third blob pushes the store over its limit; the oldest unreferenced blob goes
+    kept = store.put_bytes("A3", b"c" * 10, ".pdf")
+    assert not old.exists()
+    assert recent.exists() and kept.exists()
+    assert store.latest("A1") is None
+
+    # Referenced evidence is never evicted, even above the limit
+    store.put_bytes("A4", b"d" * 10, ".pdf")
+    assert kept.exists()
+    assert store.stats()["evicted_bytes"] == 20
+
+def test_content_key_separates_parts():
+    assert content_key(b"ab", b"c") != content_key(b"a", b"bc")
+
+def test_legacy_evidence_is_imported_with_its_timestamp(tmp_path):
+    legacy = tmp_path / "evidence"
+    legacy.mkdir()
+    older = legacy / "ALERT_1_20240101_090000.pdf"
+    older.write_bytes(b"%PDF older")
+    newer = legacy / "ALERT_1_20240102_090000.pdf"
+    newer.write_bytes(b"%PDF newer")
+    os.utime(older, (1_700_000_000, 1_700_000_000))
+    os.utime(newer, (1_700_086_400, 1_700_086_400))
+
+    store = EvidenceStore(str(legacy / "store"))
+    assert store.import_legacy(str(legacy)) == 2
+    assert not list(legacy.glob("*.pdf"))
+    latest = store.latest("ALERT_1")
+    assert latest["path"].read_bytes() == b"%PDF newer"
+    assert latest["created_at"] == 1_700_086_400
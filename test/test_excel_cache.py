@@ -0,0 +1,45 @@
+import os
+import shutil
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ubs_autogen"))
+
+import excel_cache  # noqa: E402
+from excel_cache import ExcelCache  # noqa: E402
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "alerts.xlsx"
+    pd.DataFrame({
+        "alert_id": [1, 2, 3],
+        "isin": ["DE0007164600", "FR0000120271", "CH0012005267"],
+        "note": ["text", 42, None],
+    }).to_excel(path, index=False)
+    return path
+
+def test_same_content_is_read_from_the_cache(tmp_path, workbook, monkeypatch):
+    cache = ExcelCache(str(tmp_path / "cache"))
+    first = cache.load(workbook)
+    assert len(list((tmp_path / "cache").glob(f"*{cache.extension}"))) == 1
+
+    # Same workbook under another name: not parsed again
+    renamed = tmp_path / "renamed.xlsx"
+    shutil.copyfile(workbook, renamed)
+    monkeypatch.setattr(excel_cache.pd, "read_excel", lambda *args, **kwargs: pytest.fail("parsed again"))
+    pd.testing.assert_frame_equal(cache.load(renamed).fillna(""), first.fillna(""))
+    # Mixed-type values come back as text, as the first read returned them
+    assert first["note"].tolist()[:2] == ["text", "42"]
+
+def test_projection_limits_parsing_and_is_served_by_a_full_conversion(tmp_path, workbook, monkeypatch):
+    cache = ExcelCache(str(tmp_path / "cache"))
+    projected = cache.load(workbook, columns=["isin", "missing"])
+    assert list(projected.columns) == ["isin"]
+
+    full = cache.load(workbook)
+    assert list(full.columns) == ["alert_id", "isin", "note"]
+
+    monkeypatch.setattr(excel_cache.pd, "read_excel", lambda *args, **kwargs: pytest.fail("parsed again"))
+    assert cache.load(workbook, columns=["alert_id"])["alert_id"].tolist() == [1, 2, 3]
+    assert len(list((tmp_path / "cache").glob(f"*{cache.extension}"))) == 2
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from starlette.requests import Request
+
+from utils.file_responses import file_response
+
+async def _get(path, **headers):
+    """Serves the file for a request with the given headers; returns status, headers and body"""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/file",
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    response = file_response(Request(scope), path, "application/pdf", "abc123")
+    messages = []
+
+    async def receive():
+        # The client stays connected until the response is complete
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await response(scope, receive, send)
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+@pytest.mark.asyncio
+async def test_etag_revalidation(tmp_path):
+    path = tmp_path / "evidence.pdf"
+    path.write_bytes(b"0123456789")
+
+    status, headers, body = await _get(path)
+    assert status == 200
+    assert body == b"0123456789"
+    assert headers["etag"] == '"abc123"'
+    assert headers["accept-ranges"] == "bytes"
+
+    assert (await _get(path, if_none_match='"abc123"'))[0] == 304
+    assert (await _get(path, if_none_match='W/"abc123"'))[0] == 304
+    assert (await _get(path, if_none_match='"other"'))[0] == 200
+
+@pytest.mark.asyncio
+async def test_byte_ranges(tmp_path):
+    path = tmp_path / "evidence.pdf"
+    path.write_bytes(b"0123456789")
+
+    status, headers, body = await _get(path, range="bytes=2-5")
+    assert status == 206
+    assert body == b"2345"
+    assert headers["content-range"] == "bytes 2-5/10"
+
+    assert (await _get(path, range="bytes=7-"))[2] == b"789"
+    assert (await _get(path, range="bytes=-3"))[2] == b"789"
+
+    status, headers, _ = await _get(path, range="bytes=20-")
+    assert status == 416
+    assert headers["content-range"] == "bytes */10"
+
+    # A range for another version of the file gets the whole file
+    status, _, body = await _get(path, range="bytes=2-5", if_range='"stale"')
+    assert status == 200
+    assert body == b"0123456789"
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from jobs.job_manager import JobManager
+from jobs.work_queue import WorkQueue
+from models.job_models import JobState
+
+@pytest.mark.asyncio
+async def test_job_streams_results_as_they_complete(tmp_path):
+    async def processor(item):
+        if item == "bad":
+            raise ValueError("bad alert")
+        return {"item": item}
+
+    manager = JobManager(processor, WorkQueue(str(tmp_path / "jobs.db"), max_attempts=1))
+    job = await manager.submit(["a", "bad", "c"])
+
+    records = [record async for record in manager.stream(job)]
+
+    assert [r["index"] for r in records] == [0, 1, 2]
+    assert records[1]["error"] == "bad alert"
+    status = job.status()
+    assert status.state == JobState.COMPLETED
+    assert status.completed == 2
+    assert status.failed == 1
+
+@pytest.mark.asyncio
+async def test_cancel_keeps_partial_results_and_purges_after_retention(tmp_path):
+    release = asyncio.Event()
+
+    async def processor(item):
+        if item > 0:
+            await release.wait()
+        return {"item": item}
+
+    manager = JobManager(processor, WorkQueue(str(tmp_path / "jobs.db")), retention_seconds=0)
+    job = await manager.submit([0, 1, 2])
+    while job.completed < 1:
+        await asyncio.sleep(0.01)
+
+    assert await manager.cancel(job.job_id)
+    assert job.state == JobState.CANCELLED
+    assert [r["index"] async for r in manager.stream(job)] == [0]
+    assert not await manager.cancel(job.job_id)
+
+    assert await manager.purge_expired() == 1
+    assert await manager.get(job.job_id) is None
+
+@pytest.mark.asyncio
+async def test_unfinished_job_resumes_after_restart(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    calls = []
+
+    async def processor(item):
+        calls.append(item)
+        return {"item": item}
+
+    queue = WorkQueue(db_path)
+    queue.create_job("job-1", [0, 1, 2])
+    queue.set_job_state("job-1", "in_progress")
+    first = queue.claim("job-1", "crashed-worker", lease_seconds=60)
+    queue.complete(first["item_id"], "crashed-worker", {"item": 0})
+    queue.claim("job-1", "crashed-worker", lease_seconds=0)
+    queue.close()
+
+    manager = JobManager(processor, WorkQueue(db_path))
+    await manager.start()
+    job = await manager.get("job-1")
+    await job.task
+    await manager.shutdown()
+
+    assert sorted(calls) == [1, 2]
+    assert job.state == JobState.COMPLETED
+    assert job.completed == 3
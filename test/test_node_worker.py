@@ -0,0 +1,60 @@
+import pytest
+import pytest_asyncio
+from models.alert_models import Alert, AlertProcessingResult
+from workers.distributed import NodeWorker
+from workers.sqlite_broker import SQLiteBroker
+
+ALERT = Alert(alert_id="1", isin="DE0007164600", security_name="SAP")
+
+class FakeVerifier:
+    def __init__(self, evidence_error=None):
+        self.evidence_error = evidence_error
+
+    async def check(self, alert):
+        return AlertProcessingResult(alert_id=alert.alert_id, is_true_positive=True, justification="Regulated")
+
+    async def write_evidence(self, alert, result):
+        if self.evidence_error is not None:
+            raise self.evidence_error
+        return result
+
+class FlakyBroker(SQLiteBroker):
+    def __init__(self, db_path, failures):
+        super().__init__(db_path)
+        self.failures = failures
+
+    def submit_result(self, task_id, worker_id, result):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("database is locked")
+        return super().submit_result(task_id, worker_id, result)
+
+@pytest_asyncio.fixture
+async def broker(tmp_path):
+    broker = FlakyBroker(str(tmp_path / "broker.db"), failures=0)
+    broker.publish("job", [{"task_id": "job:0", "host": "", "payload": ALERT.model_dump(mode="json")}])
+    yield broker
+    broker.close()
+
+async def _run(broker, verifier):
+    worker = NodeWorker(broker, worker_id="node-1", submit_attempts=2, submit_retry_delay=0)
+    pipeline = worker._build_pipeline(verifier)
+    await pipeline.put(broker.claim("node-1"))
+    await pipeline.join()
+
+@pytest.mark.asyncio
+async def test_result_is_submitted_when_its_evidence_fails(broker):
+    await _run(broker, FakeVerifier(evidence_error=RuntimeError("PDF failed")))
+    assert [record["result"]["justification"] for record in broker.results("job")] == ["Regulated"]
+
+@pytest.mark.asyncio
+async def test_submission_is_retried_then_the_task_released(broker):
+    broker.failures = 1
+    await _run(broker, FakeVerifier())
+    assert len(broker.results("job")) == 1
+
+    broker.publish("job", [{"task_id": "job:1", "host": "", "payload": ALERT.model_dump(mode="json")}])
+    broker.failures = 2
+    await _run(broker, FakeVerifier())
+    assert broker.progress("job") == {"pending": 1, "in_progress": 0, "done": 1}
+    assert broker.claim("node-2")["task_id"] == "job:1"
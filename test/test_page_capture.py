@@ -0,0 +1,97 @@
+import io
+import os
+import sys
+import pytest
+import pytest_asyncio
+from PIL import Image
+from utils.page_capture import (BOTH, CLIP, FULL, CaptureProfile, CaptureStore, CapturedImage,
+                                PageCapture, capture_page, encode_image)
+
+def _png(width, height):
+    output = io.BytesIO()
+    Image.new("RGBA", (width, height), "white").save(output, format="PNG")
+    return output.getvalue()
+
+def _capture(url):
+    image = CapturedImage(kind=FULL, data=b"png", image_format="png", width=1, height=1,
+                          capture_seconds=0.0, encode_seconds=0.0)
+    return PageCapture(url=url, title="Page", images=[image])
+
+class _Screenshots:
+    """Minimal page/element exposing the screenshot calls capture_page makes"""
+
+    def __init__(self, width, height, element=None):
+        self.url = "https://example.com/"
+        self.size = (width, height)
+        self.element = element
+
+    async def screenshot(self, type="png", **options):
+        return _png(*self.size)
+
+    async def query_selector(self, selector):
+        return self.element
+
+    async def title(self):
+        return "Example"
+
+def test_capture_is_found_under_requested_and_final_url():
+    store = CaptureStore()
+    capture = _capture("https://example.com/final")
+    store.put(capture, "https://example.com/start")
+
+    assert store.get("https://example.com/start") is capture
+    assert store.get("https://example.com/final") is capture
+    assert store.get("https://example.com/other") is None
+    assert (store.hits, store.misses) == (2, 1)
+
+def test_old_and_excess_captures_are_dropped():
+    store = CaptureStore(max_entries=2, ttl_seconds=60)
+    for n in range(3):
+        store.put(_capture(f"https://example.com/{n}"))
+    assert store.get("https://example.com/0") is None
+    assert store.get("https://example.com/2") is not None
+
+    expired = CaptureStore(ttl_seconds=-1)
+    expired.put(_capture("https://example.com/"))
+    assert expired.get("https://example.com/") is None
+
+def test_encode_image_downscales_and_converts():
+    data, width, height, image_format = encode_image(_png(2000, 1000), "jpeg", 70, max_width=1000)
+    assert (width, height, image_format) == (1000, 500, "jpeg")
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.format == "JPEG" and img.size == (1000, 500)
+
+@pytest.mark.asyncio
+async def test_capture_profiles_clip_full_and_both():
+    page = _Screenshots(1280, 4000, element=_Screenshots(600, 200))
+    webp = CaptureProfile(mode=BOTH, image_format="webp", quality=60, max_width=640)
+
+    both = await capture_page(page, webp, selector="table")
+    assert [image.kind for image in both.images] == [CLIP, FULL]
+    assert both.images[1].width == 640
+    assert all(image.image_format == "webp" and image.size > 0 for image in both.images)
+
+    clip = await capture_page(page, CaptureProfile(mode=CLIP), selector="table")
+    assert [(image.kind, image.width) for image in clip.images] == [(CLIP, 600)]
+    assert clip.images[0].encode_seconds == 0.0
+
+    # Without a matching element, clip mode falls back to the full page
+    fallback = await capture_page(_Screenshots(800, 600), CaptureProfile(mode=CLIP), selector="table")
+    assert [image.kind for image in fallback.images] == [FULL]
+
+@pytest.mark.asyncio
+async def test_pages_too_tall_for_webp_fall_back_to_jpeg():
+    page = _Screenshots(1280, 20000, element=_Screenshots(600, 200))
+    capture = await capture_page(page, CaptureProfile(mode=BOTH, image_format="webp"), selector="table")
+    assert [image.image_format for image in capture.images] == ["webp", "jpeg"]
+    with Image.open(io.BytesIO(capture.images[1].data)) as img:
+        assert img.format == "JPEG" and img.size == (1280, 20000)
+
+    # The alert app stacks the clip above the full page into one image
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ubs_autogen"))
+    from capture import _encode
+
+    data, image_format = _encode([_png(600, 200), _png(1280, 16300)], "webp", 80, None)
+    assert image_format == "jpeg"
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.size == (1280, 16500)
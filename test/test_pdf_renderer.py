@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from utils.pdf_renderer import PdfRenderer, create_job_report
+
+@pytest.mark.asyncio
+async def test_renders_evidence_and_job_report_in_worker_processes(tmp_path):
+    renderer = PdfRenderer(workers=1, max_pending=1)
+    try:
+        evidence = tmp_path / "alert.pdf"
+        report = tmp_path / "report.pdf"
+        timings = await asyncio.gather(
+            renderer.render_evidence(title="Page", url="https://example.com", output_path=str(evidence)),
+            renderer.render_report("Job report", [
+                {"alert_id": "A1", "is_true_positive": True, "justification": "Regulated market",
+                 "evidence_path": str(evidence)},
+                {"alert_id": "#2", "error": "Timeout"},
+            ], str(report)),
+        )
+    finally:
+        renderer.shutdown()
+
+    assert evidence.read_bytes().startswith(b"%PDF")
+    assert report.read_bytes().startswith(b"%PDF")
+    # With a single place in the queue, one of the renders had to wait for the other
+    assert max(t["wait_seconds"] for t in timings) >= min(t["render_seconds"] for t in timings)
+    assert renderer.stats()["rendered"] == 2
+    assert renderer.stats()["pending"] == 0
+
+def test_report_text_is_not_parsed_as_markup(tmp_path):
+    report = tmp_path / "report.pdf"
+    create_job_report("Job <1> & co", [
+        {"alert_id": "A&1", "is_true_positive": False, "justification": "shares <5% diff & R&D <b>"},
+        {"alert_id": "A2", "error": "Unexpected </para> in page"},
+    ], str(report))
+    assert report.read_bytes().startswith(b"%PDF")
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from utils.pipeline import Pipeline, Stage
+
+@pytest.mark.asyncio
+async def test_stages_overlap_and_report_statistics():
+    events = []
+
+    async def navigate(item):
+        events.append(("navigate", item))
+        await asyncio.sleep(0.01)
+        return item
+
+    async def upload(item):
+        await asyncio.sleep(0.03)
+        events.append(("upload", item))
+        if item == 2:
+            raise ValueError("upload failed")
+
+    pipeline = Pipeline([Stage("navigate", navigate, 1), Stage("upload", upload, 1)])
+    for item in range(4):
+        await pipeline.put(item)
+    await pipeline.join()
+
+    # The next navigation starts before the previous upload is done
+    assert events.index(("navigate", 1)) < events.index(("upload", 0))
+    stats = pipeline.stats()
+    assert stats["navigate"]["processed"] == 4
+    assert stats["upload"]["processed"] == 3
+    assert stats["upload"]["failed"] == 1
+    assert stats["upload"]["queue_depth"] == 0
+    # Upload is the bottleneck: navigation spends time blocked on its full queue
+    assert stats["navigate"]["blocked_seconds"] > 0
+    assert stats["upload"]["utilization"] > stats["navigate"]["utilization"]
+
+@pytest.mark.asyncio
+async def test_bounded_queues_limit_items_in_flight():
+    in_flight = 0
+    peak = 0
+    release = asyncio.Event()
+
+    async def enter(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        return item
+
+    async def slow(item):
+        nonlocal in_flight
+        await release.wait()
+        in_flight -= 1
+
+    pipeline = Pipeline([Stage("enter", enter, 1, queue_size=1), Stage("slow", slow, 2, queue_size=2)])
+    feeder = asyncio.create_task(asyncio.wait_for(asyncio.gather(*(pipeline.put(n) for n in range(20))), 5))
+    await asyncio.sleep(0.05)
+    # Two items in the slow stage, two waiting for it and one blocked handing over
+    assert peak == 5
+    release.set()
+    await feeder
+    await pipeline.join()
+    assert pipeline.stats()["slow"]["processed"] == 20
+
+@pytest.mark.asyncio
+async def test_stop_drops_pending_items():
+    started = []
+
+    async def hang(item):
+        started.append(item)
+        await asyncio.Event().wait()
+
+    pipeline = Pipeline([Stage("hang", hang, 1, queue_size=2)])
+    for item in range(3):
+        await pipeline.put(item)
+    await asyncio.sleep(0.01)
+    await asyncio.wait_for(pipeline.stop(), 1)
+    assert started == [0]
+    assert pipeline.stats()["hang"]["queue_depth"] == 2
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from utils.priority_scheduler import BULK, INTERACTIVE, PriorityScheduler, priority
+
+@pytest.mark.asyncio
+async def test_interactive_work_overtakes_queued_bulk_work():
+    scheduler = PriorityScheduler(1, {INTERACTIVE: 4, BULK: 1})
+    order = []
+
+    async def work(name, priority_class):
+        with priority(priority_class):
+            async with scheduler.slot():
+                order.append(name)
+                await asyncio.sleep(0)
+
+    await scheduler.acquire(BULK)
+    bulk = [asyncio.create_task(work(f"bulk-{i}", BULK)) for i in range(3)]
+    await asyncio.sleep(0)
+    interactive = [asyncio.create_task(work(f"interactive-{i}", INTERACTIVE)) for i in range(3)]
+    await asyncio.sleep(0)
+    assert scheduler.waiting(BULK) == 3 and scheduler.waiting(INTERACTIVE) == 3
+
+    scheduler.release()
+    await asyncio.gather(*bulk, *interactive)
+
+    # Interactive work goes first, but bulk work still gets a share of the slots
+    assert order == ["interactive-0", "interactive-1", "bulk-0", "interactive-2", "bulk-1", "bulk-2"]
+    stats = scheduler.stats()
+    assert stats[INTERACTIVE]["served"] == 3
+    assert stats[BULK]["served"] == 4
+    assert scheduler.in_use == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    scheduler = PriorityScheduler(1)
+    await scheduler.acquire(BULK)
+    waiter = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    scheduler.release()
+    assert scheduler.in_use == 0
+    assert scheduler.waiting() == 0
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_during_a_release_does_not_take_the_slot():
+    scheduler = PriorityScheduler(1)
+    await scheduler.acquire(BULK)
+    cancelled = asyncio.create_task(scheduler.acquire(BULK))
+    served = asyncio.create_task(scheduler.acquire(BULK))
+    await asyncio.sleep(0)
+
+    # Cancelled and released in the same loop iteration: the slot goes to the next waiter
+    cancelled.cancel()
+    scheduler.release()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await served
+    assert scheduler.in_use == 1 and scheduler.waiting() == 0
+    scheduler.release()
+    assert scheduler.in_use == 0
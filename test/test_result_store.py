@@ -0,0 +1,75 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+import pytest_asyncio
+from utils.result_store import ResultStore
+
+@pytest.mark.asyncio
+async def test_results_are_written_in_batches_in_the_background(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"), batch_size=3, flush_interval=0.05)
+    store.start()
+    for n in range(4):
+        store.record(f"A{n}", f"DE{n:010d}", n % 2 == 0, "reason")
+    # Nothing is written on the caller's path
+    assert store.stats()["written"] == 0
+    await asyncio.sleep(0.2)
+    # Everything buffered when the writer runs goes into one transaction
+    stats = store.stats()
+    assert (stats["written"], stats["batches"], stats["buffered"]) == (4, 1, 0)
+
+    store.record("A4", "CH0000000004", True)
+    await store.close()
+    reopened = ResultStore(str(tmp_path / "results.db"))
+    assert reopened.counts()["total"] == 5
+
+@pytest.mark.asyncio
+async def test_filters_pagination_and_counts(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    now = datetime.now()
+    old = (now - timedelta(days=10)).timestamp()
+    store.record("A1", "DE0005140008", False, processed_at=old)
+    store.record("A2", "DE0007164600", False)
+    store.record("A3", "DE0007164600", True)
+    store.record("A4", "FR0000131104", False)
+    store.record("A5", "de0008404005", False)
+    await store.flush()
+
+    week = dict(country="de", decision="false_positive", since=now - timedelta(days=7))
+    first = store.query(limit=1, **week)
+    assert [r["alert_id"] for r in first["results"]] == ["A5"]
+    assert first["results"][0]["decision"] == "False Positive"
+    second = store.query(limit=1, before=first["next"], **week)
+    assert [r["alert_id"] for r in second["results"]] == ["A2"]
+    assert second["next"] is None
+    assert [r["alert_id"] for r in store.query(isin="DE0007164600")["results"]] == ["A3", "A2"]
+
+    by_country = store.counts(group_by="country", decision="False Positive")
+    assert by_country["counts"] == [{"country": "DE", "count": 3}, {"country": "FR", "count": 1}]
+    assert store.counts(since=now - timedelta(days=7))["total"] == 4
+    with pytest.raises(ValueError):
+        store.counts(group_by="justification")
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_kept_and_written_later(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"), batch_size=2, flush_interval=0.01)
+    transaction = store._transaction
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    def locked_once(statements):
+        if failures:
+            raise failures.pop()
+        return transaction(statements)
+
+    store._transaction = locked_once
+    store.start()
+    store.record("A1", "DE0005140008", True)
+    store.record("A2", "DE0005140008", False)
+    await asyncio.sleep(0.1)
+    store.record("A3", "FR0000120271", True)
+    await store.flush()
+
+    assert [row["alert_id"] for row in store.query(limit=10)["results"]][::-1] == ["A1", "A2", "A3"]
+    assert store.stats()["written"] == 3
+    await store.close()
@@ -0,0 +1,73 @@
+import csv
+import json
+import os
+import sys
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ubs_autogen"))
+
+from results_writer import ResultsWriter  # noqa: E402
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+
+    async def upload_object(self, object_name, data, content_type="application/octet-stream"):
+        self.objects[object_name] = (data, content_type)
+        return f"https://storage.example/{object_name}"
+
+@pytest.fixture
+def storage():
+    return FakeStorage()
+
+@pytest.mark.asyncio
+async def test_results_are_uploaded_in_numbered_parts_with_a_manifest(storage, tmp_path):
+    writer = ResultsWriter(storage, formats=["csv", "jsonl"], part_rows=2, directory=str(tmp_path))
+    for n in range(5):
+        await writer.append({"alert_id": f"A{n}", "isin": "DE0007164600", "decision": "True Positive"})
+    # Two full parts are uploaded while alerts are still being appended
+    assert len(storage.objects) == 4
+    manifest = await writer.close()
+
+    prefix = f"results/{writer.run_name}"
+    for kind in ("csv", "jsonl"):
+        names = [f"{prefix}/{kind}/part-{number:05d}.{kind}" for number in range(3)]
+        assert manifest["parts"][kind] == [f"https://storage.example/{name}" for name in names]
+        assert all(name in storage.objects for name in names)
+    assert storage.objects[f"{prefix}/csv/part-00000.csv"][0].startswith(b"alert_id,")
+    assert not storage.objects[f"{prefix}/csv/part-00001.csv"][0].startswith(b"alert_id,")
+
+    # The local file is the parts concatenated: one header, every record
+    with open(manifest["files"]["csv"], newline="") as f:
+        assert [row["alert_id"] for row in csv.DictReader(f)] == [f"A{n}" for n in range(5)]
+
+    uploaded, content_type = storage.objects[f"{prefix}/manifest.json"]
+    assert content_type == "application/json"
+    assert json.loads(uploaded)["record_count"] == manifest["record_count"] == 5
+    assert manifest["manifest_url"] == f"https://storage.example/{prefix}/manifest.json"
+
+@pytest.mark.asyncio
+async def test_values_keep_their_column_types(storage, tmp_path):
+    writer = ResultsWriter(storage, formats=["parquet", "jsonl"], part_rows=10, directory=str(tmp_path))
+    await writer.append({
+        "alert_id": 7,
+        "is_regulated": "yes",
+        "expected_shares": "1500.0",
+        "actual_shares": "unknown",
+        "market_verification": {"is_regulated": True, "market_type": "Regulated Market"},
+    })
+    manifest = await writer.close()
+
+    row = pq.read_table(manifest["files"]["parquet"]).to_pylist()[0]
+    assert row["alert_id"] == "7"
+    assert row["is_regulated"] is True
+    assert row["expected_shares"] == 1500
+    assert row["actual_shares"] is None
+    assert {"name": "expected_shares", "type": "int"} in manifest["columns"]
+
+    # JSONL keeps every field, nested ones as dotted keys, with their original values
+    with open(manifest["files"]["jsonl"]) as f:
+        record = json.loads(f.readline())
+    assert record["market_verification.is_regulated"] is True
+    assert record["actual_shares"] == "unknown"
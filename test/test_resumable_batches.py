@@ -0,0 +1,48 @@
+import os
+import sys
+import pytest
+import pytest_asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ubs_autogen"))
+
+from work_queue import WorkQueue, process_resumable  # noqa: E402
+
+SOURCE = "https://example.com/alerts.csv"
+
+async def _rows(*chunks, fail=False):
+    for chunk in chunks:
+        yield chunk
+    if fail:
+        raise ConnectionError("download interrupted")
+
+@pytest_asyncio.fixture
+async def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    yield queue
+    queue.close()
+
+@pytest.mark.asyncio
+async def test_a_crashed_run_is_resumed_only_for_the_same_content(queue):
+    handled = []
+
+    async def handler(row):
+        handled.append(row["id"])
+        return {"id": row["id"]}
+
+    first = [{"id": 1}, {"id": 2}]
+    with pytest.raises(ConnectionError):
+        await process_resumable(queue, SOURCE, _rows(first, fail=True), handler)
+    assert handled == [1, 2]
+
+    # The same file again: only the rows not processed before
+    results = await process_resumable(queue, SOURCE, _rows(first, [{"id": 3}]), handler)
+    assert handled == [1, 2, 3]
+    assert results == [{"id": 1}, {"id": 2}, {"id": 3}]
+
+    # The URL now serves another file: a new run, nothing mixed in from the old one
+    with pytest.raises(ConnectionError):
+        await process_resumable(queue, SOURCE, _rows(first, fail=True), handler)
+    handled.clear()
+    results = await process_resumable(queue, SOURCE, _rows([{"id": 7}], [{"id": 8}]), handler)
+    assert handled == [7, 8]
+    assert results == [{"id": 7}, {"id": 8}]
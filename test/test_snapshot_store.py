@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+from utils.snapshot_store import SnapshotStore
+
+def test_snapshots_are_stored_once_per_content_hash(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    page = b"<html><body>Regulierter Markt</body></html>"
+
+    first = store.save("A1", "https://example.com/", "Example", page, "dom", {"is_true_positive": True})
+    second = store.save("A2", "https://example.com/", "Example", page, "dom")
+    assert first.content_hash == second.content_hash
+    assert first.content_path == second.content_path
+    assert len(list(tmp_path.rglob("*.gz"))) == 1
+
+    latest = store.latest("A1")
+    assert latest.metadata == {"is_true_positive": True}
+    assert store.content(latest) == page
+    assert store.latest("missing") is None
+
+def test_rendered_evidence_is_cached_per_alert_and_content(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    snapshot = store.save("A1", "https://example.com/", "Example", b"<html></html>", "dom")
+    pdf_path = store.rendered_path(snapshot, "pdf")
+    assert pdf_path.parent == tmp_path / snapshot.content_hash[:2] / snapshot.content_hash[2:4]
+    assert pdf_path.name.startswith("A1_") and pdf_path.suffix == ".pdf"
+    assert store.rendered_path(snapshot, "png") != pdf_path
+
+def test_latest_snapshot_comes_from_the_index(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save("A1", "https://example.com/", "Example", b"<html>old</html>", "dom")
+    newer = store.save("A1", "https://example.com/", "Example", b"<html>new</html>", "dom")
+    store.save("A10", "https://example.com/", "Example", b"<html>other</html>", "dom")
+    assert not list(tmp_path.glob("*.json"))
+    assert store.latest("A1").content_hash == newer.content_hash
+
+def test_concurrent_saves_of_the_same_content_share_one_file(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    page = b"<html><body>" + b"Regulierter Markt " * 50000 + b"</body></html>"
+
+    with ThreadPoolExecutor(8) as pool:
+        snapshots = list(pool.map(lambda n: store.save(f"A{n}", "https://example.com/", "Example", page, "dom"),
+                                  range(16)))
+
+    assert len({snapshot.content_path for snapshot in snapshots}) == 1
+    assert store.content(snapshots[-1]) == page
+    assert [path.name for path in tmp_path.rglob("*") if path.is_file() and path.suffix == ".tmp"] == []
@@ -0,0 +1,67 @@
+from workers.broker import create_broker
+from workers.sqlite_broker import SQLiteBroker
+
+def _tasks(*hosts):
+    return [{"task_id": f"job:{n}", "host": host, "payload": {"n": n}} for n, host in enumerate(hosts)]
+
+def test_claim_respects_global_host_limit(tmp_path):
+    broker = create_broker(f"sqlite:///{tmp_path / 'broker.db'}")
+    other_node = create_broker(f"sqlite:///{tmp_path / 'broker.db'}")
+    broker.set_host_limit("a.example", 1)
+    broker.publish("job", _tasks("a.example", "a.example", "b.example"))
+
+    first = broker.claim("node-1")
+    second = other_node.claim("node-2")
+
+    assert first["host"] == "a.example"
+    assert second["host"] == "b.example"
+    assert other_node.claim("node-2") is None
+
+def test_results_are_idempotent_and_dead_workers_are_reassigned(tmp_path):
+    broker = create_broker(f"sqlite:///{tmp_path / 'broker.db'}")
+    broker.publish("job", _tasks("a.example"))
+    broker.heartbeat("node-1")
+    task = broker.claim("node-1")
+
+    assert broker.reassign_dead_workers(heartbeat_timeout=-1) == 1
+    broker.heartbeat("node-2")
+    retry = broker.claim("node-2")
+    assert retry["task_id"] == task["task_id"]
+
+    assert broker.submit_result(task["task_id"], "node-2", {"ok": True})
+    assert not broker.submit_result(task["task_id"], "node-1", {"ok": False})
+    assert [r["result"] for r in broker.results("job")] == [{"ok": True}]
+    assert broker.progress("job") == {"pending": 0, "in_progress": 0, "done": 1}
+
+def test_claim_takes_a_slot_on_every_host_of_a_task(tmp_path):
+    broker = create_broker(f"sqlite:///{tmp_path / 'broker.db'}")
+    broker.set_host_limit("register.example", 1)
+    broker.publish("job", [
+        {"task_id": "job:0", "host": "a.example", "hosts": ["a.example", "register.example"], "payload": {}},
+        {"task_id": "job:1", "host": "b.example", "hosts": ["b.example", "register.example"], "payload": {}},
+        {"task_id": "job:2", "host": "", "hosts": [], "payload": {}},
+        {"task_id": "job:3", "host": "", "hosts": [], "payload": {}},
+    ])
+
+    first = broker.claim("node-1")
+    assert first["hosts"] == ["a.example", "register.example"]
+    # The second task's market host is free, but the register is at its limit
+    assert [broker.claim("node-2")["task_id"] for _ in range(2)] == ["job:2", "job:3"]
+    assert broker.claim("node-2") is None
+
+    broker.submit_result(first["task_id"], "node-1", {})
+    assert broker.claim("node-2")["task_id"] == "job:1"
+
+def test_task_failing_every_worker_is_not_reassigned_forever(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "broker.db"), max_attempts=2)
+    broker.publish("job", _tasks("a.example"))
+    for node in ("node-1", "node-2"):
+        broker.heartbeat(node)
+        assert broker.claim(node)["task_id"] == "job:0"
+        broker.reassign_dead_workers(heartbeat_timeout=-1)
+
+    assert broker.claim("node-3") is None
+    assert [r["result"] for r in broker.results("job")] == [
+        {"error": "Task failed: its worker died on each of 2 attempts"}
+    ]
+    assert broker.progress("job") == {"pending": 0, "in_progress": 0, "done": 0, "failed": 1}
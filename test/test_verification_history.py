@@ -0,0 +1,33 @@
+from datetime import datetime
+import pytest
+from utils.verification_history import MARKET, SHARES, VerificationHistory
+
+@pytest.fixture
+def history(tmp_path):
+    history = VerificationHistory(str(tmp_path / "history.db"))
+    yield history
+    history.close()
+
+def test_only_changes_are_stored(history):
+    regulated = {"is_regulated": True, "market_type": "Regulated Market"}
+    assert history.record(MARKET, "DE0007164600", regulated, "https://a", at=100)
+    assert not history.record(MARKET, "DE0007164600", regulated, "https://a", at=200)
+    assert history.record(MARKET, "DE0007164600", {"is_regulated": False, "market_type": "Scale"}, "https://a", at=300)
+    # Recorded late: extends the first outcome back, in whatever key order
+    assert history.record(MARKET, "DE0007164600", dict(reversed(list(regulated.items()))), at=50)
+
+    timeline = history.timeline(MARKET, "DE0007164600")
+    assert [observation.valid_from.timestamp() for observation in timeline] == [50, 300]
+    assert timeline[0].confirmed_at == datetime.fromtimestamp(200)
+    assert timeline[0].source_url == "https://a"
+
+def test_as_of_returns_the_outcome_in_force(history):
+    for at, shares in ((100, 1000), (200, 1500), (300, 1500), (400, 1000)):
+        history.record(SHARES, "CH0012005267", {"actual_shares": shares}, at=at)
+
+    assert history.as_of(SHARES, "CH0012005267", 99) is None
+    assert history.as_of(SHARES, "CH0012005267", 100).outcome == {"actual_shares": 1000}
+    assert history.as_of(SHARES, "CH0012005267", datetime.fromtimestamp(350)).outcome == {"actual_shares": 1500}
+    assert history.as_of(SHARES, "CH0012005267").outcome == {"actual_shares": 1000}
+    assert history.as_of(MARKET, "CH0012005267", 350) is None
+    assert len(history.timeline(SHARES, "CH0012005267")) == 3
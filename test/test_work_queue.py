@@ -0,0 +1,45 @@
+from jobs.work_queue import WorkQueue, DONE, FAILED, IN_PROGRESS, PENDING
+
+def test_claim_skips_live_leases_and_reclaims_stale_ones(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.create_job("job", [{"n": 0}, {"n": 1}])
+
+    live = queue.claim("job", "worker-a", lease_seconds=60)
+    stale = queue.claim("job", "worker-a", lease_seconds=-1)
+    assert (live["seq"], stale["seq"]) == (0, 1)
+
+    reclaimed = queue.claim("job", "worker-b", lease_seconds=60)
+    assert reclaimed["seq"] == 1
+    assert reclaimed["attempts"] == 2
+    assert queue.claim("job", "worker-b", lease_seconds=60) is None
+
+    # The original holder lost its lease, so its late result is ignored
+    assert not queue.complete(stale["item_id"], "worker-a", {"n": 1})
+    assert queue.complete(reclaimed["item_id"], "worker-b", {"n": 1})
+    assert queue.counts("job")[DONE] == 1
+    assert queue.counts("job")[IN_PROGRESS] == 1
+
+def test_failed_items_are_retried_until_max_attempts(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    queue.create_job("job", ["x"])
+
+    item = queue.claim("job", "w", lease_seconds=60)
+    assert not queue.fail(item["item_id"], "w", "timeout")
+    assert queue.counts("job")[PENDING] == 1
+
+    item = queue.claim("job", "w", lease_seconds=60)
+    assert queue.fail(item["item_id"], "w", "timeout")
+    assert queue.counts("job")[FAILED] == 1
+    assert queue.finished_items("job") == [
+        {"seq": 0, "state": FAILED, "result": None, "error": "timeout", "completion_order": 1}
+    ]
+
+def test_outstanding_counts_pending_and_in_progress_items_of_all_jobs(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.create_job("a", [1, 2])
+    queue.create_job("b", [3])
+
+    item = queue.claim("a", "w", lease_seconds=60)
+    assert queue.outstanding() == 3
+    queue.complete(item["item_id"], "w", 1)
+    assert queue.outstanding() == 2
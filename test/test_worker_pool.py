@@ -0,0 +1,28 @@
+from collections import Counter
+from models.alert_models import Alert
+from workers.routing import REGISTER_HOSTS, country_hosts, target_hosts
+from workers.worker_pool import host_workers
+
+def test_host_limit_is_split_across_a_fixed_set_of_workers():
+    for host in ("www.boerse-frankfurt.de", "live.euronext.com+www.infogreffe.fr", "a.example"):
+        assignment = host_workers(host, workers=8, per_host_limit=5)
+        assert assignment == host_workers(host, workers=8, per_host_limit=5)
+        assert len({worker for worker, _ in assignment}) == 5
+        assert sum(limit for _, limit in assignment) == 5
+        assert all(0 <= worker < 8 for worker, _ in assignment)
+
+    # More pages allowed than workers: every worker serves the host, the limit still adds up
+    assignment = host_workers("a.example", workers=3, per_host_limit=7)
+    assert sorted(worker for worker, _ in assignment) == [0, 1, 2]
+    assert Counter(limit for _, limit in assignment) == Counter([3, 2, 2])
+
+def test_register_hosts_count_as_targets():
+    shares = Alert(alert_id="1", isin="DE0007164600", security_name="SAP", outstanding_shares_system=1000)
+    market_only = Alert(alert_id="1", isin="DE0007164600", security_name="SAP")
+    elsewhere = Alert(alert_id="2", isin="IT0003128367", security_name="Enel", outstanding_shares_system=1000)
+
+    assert target_hosts(shares) == ["www.boerse-frankfurt.de", REGISTER_HOSTS["DE"]]
+    assert target_hosts(market_only) == ["www.boerse-frankfurt.de"]
+    assert target_hosts(elsewhere) == []
+    assert set(target_hosts(shares)) <= set(country_hosts("DE"))
+    assert country_hosts("IT") == []
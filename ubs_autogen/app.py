@@ -37,9 +37,10 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
         Processing results summary
     """
     from playwright.async_api import async_playwright
+    from capture import capture_evidence_bytes
+    from storage import EvidenceStorage
     import datetime
     from typing import Tuple
-    from supabase import create_client
     import json
     import os
     import re
@@ -48,57 +49,11 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
     proxy_username = "xdsmbKbB-cc-ch-pool-rampagecore"
     proxy_password = "FZeZSSFc"
 
-    class SupabaseStorage:
-        def __init__(self):
-            self.supabase_url = os.environ.get("SUPABASE_URL")
-            self.supabase_key = os.environ.get("SUPABASE_KEY")
-            self.client = create_client(self.supabase_url, self.supabase_key)
-            self.bucket_name = "ubs"
-            
-            # Create bucket if it doesn't exist
-            try:
-                self.client.storage.get_bucket(self.bucket_name)
-            except Exception as e:
-                self.client.storage.create_bucket(self.bucket_name)
-        
-        def upload_file(self, file_path, file_name=None):
-            """Upload a file to Supabase Storage"""
-            if file_name is None:
-                file_name = os.path.basename(file_path)
-            
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-                
-            return self.upload_binary(file_data, file_name)
-        
-        def upload_binary(self, binary_data, file_name):
-            """Upload binary data to Supabase Storage"""
-            # Generate a unique filename to avoid collisions
-            unique_filename = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{file_name}"
-            
-            # Upload to Supabase Storage
-            self.client.storage.from_(self.bucket_name).upload(
-                path=unique_filename,
-                file=binary_data,
-                file_options={"content-type": "application/octet-stream"}
-            )
-            
-            # Get public URL
-            file_url = self.client.storage.from_(self.bucket_name).get_public_url(unique_filename)
-            return file_url
-        
-        def save_json_data(self, data, file_name):
-            """Save JSON data to Supabase Storage"""
-            json_str = json.dumps(data, indent=2)
-            return self.upload_binary(json_str.encode('utf-8'), file_name)
-
     class MarketTypeValidator:
         """Validates if a security is traded on a regulated market or growth market"""
         
         def __init__(self, storage_manager):
             self.storage_manager = storage_manager
-            # Create temp directory for screenshots if it doesn't exist
-            os.makedirs("temp", exist_ok=True)
         
         async def check_market_type(self, isin: str) -> Tuple[bool, str, str, str]:
             """
@@ -130,7 +85,7 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
             Check if a German security is on a regulated market using boerse-frankfurt.de
             """
             url = f"https://www.boerse-frankfurt.de/aktie/{isin}"
-            temp_screenshot_path = f"temp/evidence_{isin}_german_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            evidence_name = f"evidence_{isin}_german_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
             async with async_playwright() as p:
                 browser = await p.chromium.launch(proxy={
@@ -153,11 +108,11 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
                     # Allow some time for any lazy-loaded content to appear
                     await asyncio.sleep(1)
                     
-                    # Capture screenshot for evidence
-                    await page.screenshot(path=temp_screenshot_path, full_page=True)
+                    # Capture screenshot for evidence, in memory
+                    screenshot, extension = await capture_evidence_bytes(page, "table.widget-table")
                     
-                    # Upload screenshot to Supabase
-                    evidence_url = self.storage_manager.upload_file(temp_screenshot_path)
+                    # Upload the screenshot; no URL is returned if the upload failed
+                    evidence_url = await self.storage_manager.upload_bytes(screenshot, evidence_name + extension)
                     
                     # Extract all table rows
                     rows = await page.query_selector_all("table.widget-table tr")
@@ -177,15 +132,9 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
                     pretty_market = "Regulated Market" if is_regulated else "Unregulated Market" if market_type else "Unknown Market"
                     page_url = page.url
 
-                    # Clean up the temp file
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
-
                     return is_regulated, pretty_market, page_url, evidence_url
 
                 except Exception as e:
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
                     return None, f"Error checking market: {str(e)}", url, evidence_url
 
                 finally:
@@ -194,7 +143,7 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
         async def _check_french_market(self, isin: str) -> Tuple[bool, str, str, str]:
             """Check if a French security is on a regulated market (via Euronext Paris)."""
             url = f"https://live.euronext.com/en/product/equities/{isin}-XPAR/market-information"
-            temp_screenshot_path = f"temp/evidence_{isin}_french_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            evidence_name = f"evidence_{isin}_french_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
             async with async_playwright() as p:
                 browser = await p.chromium.launch()
@@ -211,11 +160,11 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
                     # Allow some time for any lazy-loaded content to appear
                     await asyncio.sleep(1)
                     
-                    # Capture screenshot for evidence
-                    await page.screenshot(path=temp_screenshot_path, full_page=True)
+                    # Capture screenshot for evidence, in memory
+                    screenshot, extension = await capture_evidence_bytes(page, "div#fs_info_block table")
                     
-                    # Upload screenshot to Supabase
-                    evidence_url = self.storage_manager.upload_file(temp_screenshot_path)
+                    # Upload the screenshot; no URL is returned if the upload failed
+                    evidence_url = await self.storage_manager.upload_bytes(screenshot, evidence_name + extension)
 
                     # Get all rows in the General Information table
                     rows = await page.query_selector_all("div#fs_info_block table tr")
@@ -228,22 +177,11 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
                                 is_regulated = value.strip().lower() == "euronext paris"
                                 market_type = "Regulated Market" if is_regulated else "Unregulated Market"
                                 
-                                # Clean up the temp file
-                                if os.path.exists(temp_screenshot_path):
-                                    os.remove(temp_screenshot_path)
-                                    
                                 return is_regulated, market_type, url, evidence_url
                                 
-                    # Clean up the temp file
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
-                        
                     return None, "Market info not found", url, evidence_url
                     
                 except Exception as e:
-                    # Clean up the temp file if it exists
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
                     return None, f"Error checking market: {str(e)}", url, evidence_url
                     
                 finally:
@@ -254,8 +192,6 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
         
         def __init__(self, storage_manager):
             self.storage_manager = storage_manager
-            # Create temp directory for screenshots if it doesn't exist
-            os.makedirs("temp", exist_ok=True)
             
         async def verify_outstanding_shares(self, company_name: str, expected_shares: int) -> Tuple[bool, int, str, str]:
             """
@@ -277,7 +213,7 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
             proxy_password = "FZeZSSFc"
             # Zefix search URL
             zefix_url = "https://www.zefix.ch/en/search/entity/list/firm/1184151"
-            temp_screenshot_path = f"temp/evidence_{company_name.replace(' ', '_')}_shares_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            evidence_name = f"evidence_{company_name.replace(' ', '_')}_shares_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
             async with async_playwright() as p:
                 browser = await p.chromium.launch(
@@ -377,11 +313,11 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
                     # Wait for page to load completely
                     await page.wait_for_load_state("networkidle")
                     
-                    # Take a screenshot for evidence
-                    await page.screenshot(path=temp_screenshot_path, full_page=True)
+                    # Take a screenshot for evidence, in memory
+                    screenshot, extension = await capture_evidence_bytes(page, 'table:has(th:has-text("Denomination of shares"))')
                     
-                    # Upload screenshot to Supabase
-                    evidence_url = self.storage_manager.upload_file(temp_screenshot_path)
+                    # Upload the screenshot; no URL is returned if the upload failed
+                    evidence_url = await self.storage_manager.upload_bytes(screenshot, evidence_name + extension)
                     
                     # Check if the table with "Denomination of shares" exists
                     has_denomination_column = await page.locator('th:has-text("Denomination of shares")').count() > 0
@@ -421,10 +357,6 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
                         if total_denomination > 0:
                             actual_shares = total_denomination
                     
-                    # Clean up the temp file
-                    # if os.path.exists(temp_screenshot_path):
-                    #     os.remove(temp_screenshot_path)
-                    
                     # Compare with expected shares
                     is_matched = False
                     if actual_shares is not None:
@@ -433,17 +365,16 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
                     return is_matched, actual_shares, target_url, evidence_url
                     
                 except Exception as e:
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
                     return False, None, zefix_url, evidence_url
                     
                 finally:
                     await browser.close()
 
     # Process the alert
+    storage_manager = None
     try:
-        # Initialize storage manager
-        storage_manager = SupabaseStorage()
+        # Evidence uploads run in the background and are awaited before the summary is returned
+        storage_manager = EvidenceStorage()
         
         # Generate a unique alert ID
         alert_id = f"MANUAL_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
@@ -534,7 +465,6 @@ async def process_individual_alert(isin: str, company_name: str, outstanding_sha
             "source_url": verification.get("source_url"),
         }
         
-        
         # Return a human-readable summary
         return f"""
 Individual alert processing completed successfully:
@@ -556,6 +486,10 @@ Evidence:
 """
     except Exception as e:
         return f"Error processing individual alert: {str(e)}"
+    finally:
+        # Waits for the evidence uploads, and stops the upload workers on errors too
+        if storage_manager is not None:
+            await storage_manager.close()
 
 async def process_group_alert(csv_url: str) -> str:
     """
@@ -568,12 +502,10 @@ async def process_group_alert(csv_url: str) -> str:
         Processing results summary
     """
     from playwright.async_api import async_playwright
-    from io import BytesIO
-    import requests
+    from capture import capture_evidence_bytes
+    from storage import EvidenceStorage
     import datetime
-    import pandas as pd
     from typing import Tuple
-    from supabase import create_client
     import json
     import os
     import re
@@ -582,57 +514,11 @@ async def process_group_alert(csv_url: str) -> str:
     proxy_username = "xdsmbKbB-cc-ch-pool-rampagecore"
     proxy_password = "FZeZSSFc"
 
-    class SupabaseStorage:
-        def __init__(self):
-            self.supabase_url = os.environ.get("SUPABASE_URL")
-            self.supabase_key = os.environ.get("SUPABASE_KEY")
-            self.client = create_client(self.supabase_url, self.supabase_key)
-            self.bucket_name = "ubs"
-            
-            # Create bucket if it doesn't exist
-            try:
-                self.client.storage.get_bucket(self.bucket_name)
-            except Exception as e:
-                self.client.storage.create_bucket(self.bucket_name)
-        
-        def upload_file(self, file_path, file_name=None):
-            """Upload a file to Supabase Storage"""
-            if file_name is None:
-                file_name = os.path.basename(file_path)
-            
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-                
-            return self.upload_binary(file_data, file_name)
-        
-        def upload_binary(self, binary_data, file_name):
-            """Upload binary data to Supabase Storage"""
-            # Generate a unique filename to avoid collisions
-            unique_filename = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{file_name}"
-            
-            # Upload to Supabase Storage
-            self.client.storage.from_(self.bucket_name).upload(
-                path=unique_filename,
-                file=binary_data,
-                file_options={"content-type": "application/octet-stream"}
-            )
-            
-            # Get public URL
-            file_url = self.client.storage.from_(self.bucket_name).get_public_url(unique_filename)
-            return file_url
-        
-        def save_json_data(self, data, file_name):
-            """Save JSON data to Supabase Storage"""
-            json_str = json.dumps(data, indent=2)
-            return self.upload_binary(json_str.encode('utf-8'), file_name)
-
     class MarketTypeValidator:
         """Validates if a security is traded on a regulated market or growth market"""
         
         def __init__(self, storage_manager):
             self.storage_manager = storage_manager
-            # Create temp directory for screenshots if it doesn't exist
-            os.makedirs("temp", exist_ok=True)
         
         async def check_market_type(self, isin: str) -> Tuple[bool, str, str, str]:
             """
@@ -664,7 +550,7 @@ async def process_group_alert(csv_url: str) -> str:
             Check if a German security is on a regulated market using boerse-frankfurt.de
             """
             url = f"https://www.boerse-frankfurt.de/aktie/{isin}"
-            temp_screenshot_path = f"temp/evidence_{isin}_german_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            evidence_name = f"evidence_{isin}_german_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
             async with async_playwright() as p:
                 browser = await p.chromium.launch(proxy={
@@ -687,11 +573,11 @@ async def process_group_alert(csv_url: str) -> str:
                     # Allow some time for any lazy-loaded content to appear
                     await asyncio.sleep(1)
                     
-                    # Capture screenshot for evidence
-                    await page.screenshot(path=temp_screenshot_path, full_page=True)
+                    # Capture screenshot for evidence, in memory
+                    screenshot, extension = await capture_evidence_bytes(page, "table.widget-table")
                     
-                    # Upload screenshot to Supabase
-                    evidence_url = self.storage_manager.upload_file(temp_screenshot_path)
+                    # Upload the screenshot; no URL is returned if the upload failed
+                    evidence_url = await self.storage_manager.upload_bytes(screenshot, evidence_name + extension)
                     
                     # Extract all table rows
                     rows = await page.query_selector_all("table.widget-table tr")
@@ -711,15 +597,9 @@ async def process_group_alert(csv_url: str) -> str:
                     pretty_market = "Regulated Market" if is_regulated else "Unregulated Market" if market_type else "Unknown Market"
                     page_url = page.url
 
-                    # Clean up the temp file
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
-
                     return is_regulated, pretty_market, page_url, evidence_url
 
                 except Exception as e:
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
                     return None, f"Error checking market: {str(e)}", url, evidence_url
 
                 finally:
@@ -728,7 +608,7 @@ async def process_group_alert(csv_url: str) -> str:
         async def _check_french_market(self, isin: str) -> Tuple[bool, str, str, str]:
             """Check if a French security is on a regulated market (via Euronext Paris)."""
             url = f"https://live.euronext.com/en/product/equities/{isin}-XPAR/market-information"
-            temp_screenshot_path = f"temp/evidence_{isin}_french_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            evidence_name = f"evidence_{isin}_french_market_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
             async with async_playwright() as p:
                 browser = await p.chromium.launch()
@@ -745,11 +625,11 @@ async def process_group_alert(csv_url: str) -> str:
                     # Allow some time for any lazy-loaded content to appear
                     await asyncio.sleep(1)
                     
-                    # Capture screenshot for evidence
-                    await page.screenshot(path=temp_screenshot_path, full_page=True)
+                    # Capture screenshot for evidence, in memory
+                    screenshot, extension = await capture_evidence_bytes(page, "div#fs_info_block table")
                     
-                    # Upload screenshot to Supabase
-                    evidence_url = self.storage_manager.upload_file(temp_screenshot_path)
+                    # Upload the screenshot; no URL is returned if the upload failed
+                    evidence_url = await self.storage_manager.upload_bytes(screenshot, evidence_name + extension)
 
                     # Get all rows in the General Information table
                     rows = await page.query_selector_all("div#fs_info_block table tr")
@@ -762,22 +642,11 @@ async def process_group_alert(csv_url: str) -> str:
                                 is_regulated = value.strip().lower() == "euronext paris"
                                 market_type = "Regulated Market" if is_regulated else "Unregulated Market"
                                 
-                                # Clean up the temp file
-                                if os.path.exists(temp_screenshot_path):
-                                    os.remove(temp_screenshot_path)
-                                    
                                 return is_regulated, market_type, url, evidence_url
                                 
-                    # Clean up the temp file
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
-                        
                     return None, "Market info not found", url, evidence_url
                     
                 except Exception as e:
-                    # Clean up the temp file if it exists
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
                     return None, f"Error checking market: {str(e)}", url, evidence_url
                     
                 finally:
@@ -788,8 +657,6 @@ async def process_group_alert(csv_url: str) -> str:
         
         def __init__(self, storage_manager):
             self.storage_manager = storage_manager
-            # Create temp directory for screenshots if it doesn't exist
-            os.makedirs("temp", exist_ok=True)
             
         async def verify_outstanding_shares(self, company_name: str, expected_shares: int) -> Tuple[bool, int, str, str]:
             """
@@ -811,7 +678,7 @@ async def process_group_alert(csv_url: str) -> str:
             proxy_password = "FZeZSSFc"
             # Zefix search URL
             zefix_url = "https://www.zefix.ch/en/search/entity/list/firm/1184151"
-            temp_screenshot_path = f"temp/evidence_{company_name.replace(' ', '_')}_shares_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            evidence_name = f"evidence_{company_name.replace(' ', '_')}_shares_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
             async with async_playwright() as p:
                 browser = await p.chromium.launch(
@@ -911,11 +778,11 @@ async def process_group_alert(csv_url: str) -> str:
                     # Wait for page to load completely
                     await page.wait_for_load_state("networkidle")
                     
-                    # Take a screenshot for evidence
-                    await page.screenshot(path=temp_screenshot_path, full_page=True)
+                    # Take a screenshot for evidence, in memory
+                    screenshot, extension = await capture_evidence_bytes(page, 'table:has(th:has-text("Denomination of shares"))')
                     
-                    # Upload screenshot to Supabase
-                    evidence_url = self.storage_manager.upload_file(temp_screenshot_path)
+                    # Upload the screenshot; no URL is returned if the upload failed
+                    evidence_url = await self.storage_manager.upload_bytes(screenshot, evidence_name + extension)
                     
                     # Check if the table with "Denomination of shares" exists
                     has_denomination_column = await page.locator('th:has-text("Denomination of shares")').count() > 0
@@ -955,10 +822,6 @@ async def process_group_alert(csv_url: str) -> str:
                         if total_denomination > 0:
                             actual_shares = total_denomination
                     
-                    # Clean up the temp file
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
-                    
                     # Compare with expected shares
                     is_matched = False
                     if actual_shares is not None:
@@ -967,8 +830,6 @@ async def process_group_alert(csv_url: str) -> str:
                     return is_matched, actual_shares, target_url, evidence_url
                     
                 except Exception as e:
-                    if os.path.exists(temp_screenshot_path):
-                        os.remove(temp_screenshot_path)
                     return False, None, zefix_url, evidence_url
                     
                 finally:
@@ -977,50 +838,8 @@ async def process_group_alert(csv_url: str) -> str:
     class AlertProcessingSystem:
         def __init__(self):
             self.results = []
-            self.storage_manager = SupabaseStorage()
+            self.storage_manager = EvidenceStorage()
             
-        def load_csv_data(self, csv_url):
-            """Load CSV data from URL with robust encoding handling"""
-            try:
-                # Check if it's a URL or local file
-                if csv_url.startswith('http'):
-                    # Download the file from URL
-                    response = requests.get(csv_url)
-                    if response.status_code == 200:
-                        # Check if Excel or CSV
-                        if csv_url.endswith('.xlsx') or csv_url.endswith('.xls'):
-                            return pd.read_excel(BytesIO(response.content))
-                        else:
-                            # Try different encodings
-                            encodings = ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-                            
-                            for encoding in encodings:
-                                try:
-                                    return pd.read_csv(BytesIO(response.content), encoding=encoding, engine='python')
-                                except UnicodeDecodeError:
-                                    continue
-                            
-                            return pd.read_csv(BytesIO(response.content), encoding='latin1', errors='replace', engine='python')
-                    else:
-                        raise Exception(f"Failed to download file: {response.status_code}")
-                else:
-                    # Check if Excel or CSV
-                    if csv_url.endswith('.xlsx') or csv_url.endswith('.xls'):
-                        return pd.read_excel(csv_url)
-                    else:
-                        # Try different encodings
-                        encodings = ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-                        
-                        for encoding in encodings:
-                            try:
-                                return pd.read_csv(csv_url, encoding=encoding, engine='python')
-                            except UnicodeDecodeError:
-                                continue
-                        
-                        return pd.read_csv(csv_url, encoding='latin1', errors='replace', engine='python')
-            except Exception as e:
-                raise
-        
         async def verify_market_type(self, isin, alert_id):
             """Verify market type for a security"""
             validator = MarketTypeValidator(self.storage_manager)
@@ -1092,51 +911,35 @@ async def process_group_alert(csv_url: str) -> str:
                 "timestamp": datetime.datetime.now().isoformat()
             }
         
-        def export_results(self, results):
-            """Export processing results to Supabase in a human-readable format"""
-            # Create a more human-readable format with the most relevant fields
-            readable_results = []
-            for result in results:
-                readable_result = {
-                    "alert_id": result.get("alert_id"),
-                    "isin": result.get("isin"),
-                    "company_name": result.get("company_name"),
-                    "source_url": result.get("source_url", ""),
-                    "evidence_url": result.get("evidence_url", ""),
-                    "decision": result.get("decision", ""),
-                    "justification": result.get("justification", ""),
-                    "verification_timestamp": result.get("verification_timestamp", "")
-                }
-                readable_results.append(readable_result)
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(readable_results)
-            
-            # Save to CSV in memory
-            csv_buffer = BytesIO()
-            df.to_csv(csv_buffer, index=False)
-            csv_buffer.seek(0)
+        async def export_results(self, writer):
+            """Finishes the incremental result files and waits until every upload is done"""
+            manifest = await writer.close()
             
-            # Save CSV to Supabase
-            results_filename = f"alert_processing_results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            results_url = self.storage_manager.upload_binary(csv_buffer.getvalue(), results_filename)
+            # Every queued upload, evidence and result parts included, is finished before the URLs are reported
+            uploads = await self.storage_manager.close()
             
             return {
-                "csv_url": results_url,
-                "record_count": len(readable_results)
+                "manifest_url": manifest["manifest_url"],
+                "record_count": manifest["record_count"],
+                "files": manifest["files"],
+                "parts": manifest["parts"],
+                "evidence_storage": self.storage_manager.evidence_index.stats(),
+                "uploads": uploads
             }
 
     # Process the alerts
     async def process_alerts(csv_url):
+        from csv_source import stream_alert_rows
+        from results_writer import ResultsWriter
+        from work_queue import WorkQueue, process_resumable
+
         # Initialize the alert processing system
         aps = AlertProcessingSystem()
+        # Results are written and uploaded in parts as alerts complete
+        writer = ResultsWriter(aps.storage_manager)
         
-        # Load data
-        data = aps.load_csv_data(csv_url)
-        
-        # Process each alert
-        results = []
-        for _, row in data.iterrows():
+        # Process a single alert row
+        async def process_row(row):
             alert_id = row['Alert ID']
             isin = row['ISIN']
             company_name = row['Company Name']
@@ -1146,7 +949,7 @@ async def process_group_alert(csv_url: str) -> str:
             
             if is_swiss:
                 # For Swiss companies, verify outstanding shares
-                if 'Outstanding Shares' in row and pd.notna(row['Outstanding Shares']):
+                if row.get('Outstanding Shares') is not None:
                     expected_shares = int(row['Outstanding Shares'])
                     verification = await aps.verify_swiss_shares(company_name, expected_shares, alert_id, isin)
                 else:
@@ -1195,15 +998,32 @@ async def process_group_alert(csv_url: str) -> str:
                     "source_url": verification.get("source_url"),
                     "verification_timestamp": datetime.datetime.now().isoformat()
                 }
-            results.append(result)
+            return result
+        
+        # Alerts are tracked in a local queue so a crashed run resumes where it stopped
+        os.makedirs("temp", exist_ok=True)
+        queue = WorkQueue(os.environ.get("ALERT_QUEUE_DB", "temp/alert_queue.db"))
+        # Rows are processed as their chunk is parsed, while the rest of the file downloads;
+        # only the columns process_row reads are parsed
+        rows = stream_alert_rows(
+            csv_url,
+            columns=["Alert ID", "ISIN", "Company Name", "Outstanding Shares"]
+        )
+        await process_resumable(
+            queue,
+            csv_url,
+            rows,
+            process_row,
+            concurrency=int(os.environ.get("ALERT_WORKERS", "1")),
+            on_result=writer.append
+        )
         
         # Export results
-        output_info = aps.export_results(results)
+        output_info = await aps.export_results(writer)
         
         return {
             "completed": True,
-            "alerts_processed": len(results),
-            "results": results,
+            "alerts_processed": output_info["record_count"],
             "output_files": output_info
         }
 
@@ -1213,8 +1033,11 @@ async def process_group_alert(csv_url: str) -> str:
     Alert processing completed successfully.
     - Processed {processing_results['alerts_processed']} alerts
     - Results exported to:
-    - CSV: {processing_results['output_files']['csv_url']}
+    - Manifest: {processing_results['output_files']['manifest_url']}
+    - Parts: {', '.join(f"{kind}: {len(urls)}" for kind, urls in processing_results['output_files']['parts'].items())}
+    - Local files: {', '.join(processing_results['output_files']['files'].values())}
     - Detailed evidence and reports saved in Supabase
+    - Evidence storage: {processing_results['output_files']['evidence_storage']['storage_bytes']} bytes in {processing_results['output_files']['evidence_storage']['objects']} objects, dedup ratio {processing_results['output_files']['evidence_storage']['dedup_ratio']}
     """
     except Exception as e:
         return f"Error processing alerts: {str(e)}"
@@ -0,0 +1,107 @@
+"""
+Compact evidence screenshots for the validators in app.py
+
+The capture profile is read from the environment:
+- CAPTURE_MODE: clip (the element holding the data), full (the whole page) or both
+- CAPTURE_FORMAT: png, jpeg or webp
+- CAPTURE_QUALITY: 1-100, used by jpeg and webp
+- CAPTURE_MAX_WIDTH: downscale wider screenshots to this many pixels
+"""
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+# Format limits are shared with the service's captures in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.page_capture import fitting_format  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+def _profile():
+    max_width = os.getenv("CAPTURE_MAX_WIDTH")
+    return {
+        "mode": os.getenv("CAPTURE_MODE", "full").lower(),
+        "format": os.getenv("CAPTURE_FORMAT", "png").lower(),
+        "quality": int(os.getenv("CAPTURE_QUALITY", "80")),
+        "max_width": int(max_width) if max_width else None,
+    }
+
+def _encode(images: List[bytes], image_format: str, quality: int, max_width: Optional[int]) -> Tuple[bytes, str]:
+    """
+    Stacks the PNG screenshots vertically, downscales and encodes them as one image
+
+    Returns:
+        The encoded image and its format, which falls back from webp to jpeg or png
+        for images taller than the format allows
+    """
+    decoded = [Image.open(io.BytesIO(data)).convert("RGB") for data in images]
+    if max_width:
+        decoded = [
+            img.resize((max_width, max(1, round(img.height * max_width / img.width))), Image.LANCZOS)
+            if img.width > max_width else img
+            for img in decoded
+        ]
+    if len(decoded) == 1:
+        combined = decoded[0]
+    else:
+        combined = Image.new("RGB", (max(img.width for img in decoded), sum(img.height for img in decoded)), "white")
+        top = 0
+        for img in decoded:
+            combined.paste(img, (0, top))
+            top += img.height
+    image_format = fitting_format(image_format, combined.width, combined.height)
+    output = io.BytesIO()
+    if image_format == "png":
+        combined.save(output, format="PNG", optimize=True)
+    else:
+        combined.save(output, format=image_format.upper(), quality=quality)
+    return output.getvalue(), image_format
+
+async def capture_evidence_bytes(page, selector: Optional[str] = None) -> Tuple[bytes, str]:
+    """
+    Takes an evidence screenshot of a loaded page according to the capture profile, in memory
+
+    In both mode the clipped element is placed above the full page in a single
+    image, so every alert still has one evidence file.
+
+    Args:
+        page: The loaded page
+        selector: Element holding the data (clip and both modes). The full page
+            is captured when it is not given or not found.
+
+    Returns:
+        The encoded image and its file extension, e.g. ".webp"
+    """
+    profile = _profile()
+    image_format = profile["format"] if profile["format"] in EXTENSIONS else "png"
+
+    started = time.perf_counter()
+    shots = []
+    if profile["mode"] in ("clip", "both") and selector:
+        element = await page.query_selector(selector)
+        if element is not None:
+            shots.append(await element.screenshot(type="png"))
+    if profile["mode"] in ("full", "both") or not shots:
+        shots.append(await page.screenshot(type="png", full_page=True))
+    captured = time.perf_counter()
+
+    if len(shots) == 1 and image_format == "png" and not profile["max_width"]:
+        data = shots[0]
+    else:
+        data, image_format = await asyncio.to_thread(_encode, shots, image_format, profile["quality"],
+                                                     profile["max_width"])
+    encoded = time.perf_counter()
+
+    logger.info(f"Evidence screenshot of {page.url}: {len(data)} bytes {image_format}, "
+                f"capture {captured - started:.2f}s, encode {encoded - captured:.2f}s")
+    return data, EXTENSIONS[image_format]
@@ -0,0 +1,326 @@
+"""
+Streaming alert file loader for process_group_alert
+
+Rows are parsed by pandas' C parser in chunks while the file is still
+downloading, so alerts can be processed before the download finishes. The
+encoding is detected once, from a prefix of the file. Downloads are cached
+with their ETag and Last-Modified headers; a later run revalidates the cached
+copy and reads it from disk when the server answers 304 Not Modified.
+
+Configuration is read from the environment:
+- CSV_CHUNK_ROWS: rows per parsed chunk (default 500)
+- DOWNLOAD_CACHE_DIR: where downloads are cached (default temp/downloads)
+"""
+import asyncio
+import codecs
+import collections
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ENCODING_SAMPLE_BYTES = 64 * 1024
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Detects the encoding of a file from a prefix of it
+
+    UTF-8 is chosen when the prefix decodes as UTF-8 (a multi-byte character
+    cut off at the end is allowed), Latin-1 otherwise.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin1"
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return json.loads(df.to_json(orient="records"))
+
+class _ByteStream(io.RawIOBase):
+    """
+    Blocking file-like object read by the parser thread while the download feeds it
+
+    finish() and close() never block, so they are safe to call on the event
+    loop: finish() ends the stream after the bytes already fed, close() drops
+    them and releases a feed() waiting for room.
+    """
+
+    def __init__(self, max_chunks: int = 64):
+        self._chunks: collections.deque = collections.deque()
+        self._max_chunks = max_chunks
+        self._condition = threading.Condition()
+        self._buffer = b""
+        self._finished = False
+        self._error: Optional[BaseException] = None
+
+    def feed(self, data: bytes) -> bool:
+        """Adds downloaded bytes; waits while the parser is max_chunks behind. False once the stream is closed"""
+        with self._condition:
+            while len(self._chunks) >= self._max_chunks and not self.closed:
+                self._condition.wait()
+            if self.closed:
+                return False
+            self._chunks.append(data)
+            self._condition.notify_all()
+            return True
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Ends the stream once the parser has read what was fed; with an error, reading it fails"""
+        with self._condition:
+            self._finished = True
+            self._error = error
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            super().close()
+            self._chunks.clear()
+            self._condition.notify_all()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._buffer:
+            with self._condition:
+                while not self._chunks and not self._finished and not self.closed:
+                    self._condition.wait()
+                if not self._chunks:
+                    if self._error is not None:
+                        raise IOError(f"Download failed: {self._error}")
+                    return 0
+                self._buffer = self._chunks.popleft()
+                self._condition.notify_all()
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+class DownloadCache:
+    """Downloaded files with the validators (ETag, Last-Modified) they were served with"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+    def body_path(self, url: str) -> Path:
+        return self.directory / f"{self._key(url)}.body"
+
+    def partial_path(self, url: str) -> Path:
+        return self.directory / f"{self._key(url)}.part"
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Headers revalidating the cached copy of a URL, if there is one"""
+        meta_path = self.directory / f"{self._key(url)}.json"
+        if not meta_path.exists() or not self.body_path(url).exists():
+            return {}
+        meta = json.loads(meta_path.read_text())
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def commit(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        """Makes a completed download the cached copy of its URL"""
+        os.replace(self.partial_path(url), self.body_path(url))
+        meta = {"url": url, "etag": etag, "last_modified": last_modified}
+        (self.directory / f"{self._key(url)}.json").write_text(json.dumps(meta))
+
+async def _parse_in_thread(handle, encoding: str, chunk_rows: int,
+                           columns: Optional[Sequence[str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Parses CSV chunks in a worker thread and yields their records as they are ready"""
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(4)
+    done = object()
+    stop = threading.Event()
+
+    wanted = set(columns) if columns is not None else None
+
+    def parse():
+        try:
+            reader = pd.read_csv(handle, encoding=encoding, encoding_errors="replace",
+                                 chunksize=chunk_rows, engine="c",
+                                 usecols=(lambda column: column in wanted) if wanted is not None else None)
+            with reader:
+                for df in reader:
+                    if stop.is_set():
+                        return
+                    asyncio.run_coroutine_threadsafe(chunks.put(_records(df)), loop).result()
+        except BaseException as e:
+            asyncio.run_coroutine_threadsafe(chunks.put(e), loop).result()
+            return
+        asyncio.run_coroutine_threadsafe(chunks.put(done), loop).result()
+
+    parser = loop.run_in_executor(None, parse)
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is done:
+                break
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+    finally:
+        # The consumer may stop early; keep the queue moving until the parser notices
+        stop.set()
+        while not parser.done():
+            try:
+                chunks.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.01)
+
+async def _read_file(path: str, chunk_rows: int, excel: bool, sheet: Union[str, int],
+                     columns: Optional[Sequence[str]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    if excel:
+        from excel_cache import ExcelCache
+
+        df = await asyncio.to_thread(ExcelCache().load, path, sheet, columns)
+        for start in range(0, len(df), chunk_rows):
+            yield _records(df.iloc[start:start + chunk_rows])
+        return
+    with open(path, "rb") as f:
+        encoding = detect_encoding(f.read(ENCODING_SAMPLE_BYTES))
+        f.seek(0)
+        async with aclosing(_parse_in_thread(f, encoding, chunk_rows, columns)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+async def _parse_download(source: str, sample: bytes, body: AsyncIterator[bytes], partial: BinaryIO,
+                          encoding: str, chunk_rows: int, columns: Optional[Sequence[str]],
+                          on_complete: Callable[[], None]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Parses a CSV download while it arrives, writing it to `partial` as well
+
+    Args:
+        source: URL of the file, for logging
+        sample: Bytes already read, from the start of the file
+        body: The rest of the download
+        partial: File the download is written to
+        encoding: Encoding of the file
+        chunk_rows: Rows per chunk
+        columns: Columns to parse, all when None
+        on_complete: Called once the whole download has been written to `partial`
+    """
+    stream = _ByteStream()
+
+    async def download():
+        try:
+            partial.write(sample)
+            await asyncio.to_thread(stream.feed, sample)
+            async for data in body:
+                partial.write(data)
+                if not await asyncio.to_thread(stream.feed, data):
+                    return
+            partial.close()
+            on_complete()
+            stream.finish()
+        except BaseException as e:
+            stream.finish(e)
+            raise
+
+    downloader = asyncio.create_task(download())
+    try:
+        async with aclosing(_parse_in_thread(io.BufferedReader(stream), encoding, chunk_rows, columns)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+        await downloader
+    finally:
+        if not downloader.done():
+            # The consumer stopped early: release a feed waiting for room, then stop the download
+            stream.close()
+            downloader.cancel()
+            await asyncio.gather(downloader, return_exceptions=True)
+        elif not downloader.cancelled() and downloader.exception():
+            logger.error(f"Download of {source} failed: {downloader.exception()}")
+
+async def stream_alert_rows(source: str, chunk_rows: Optional[int] = None,
+                            cache_dir: Optional[str] = None, sheet: Union[str, int] = 0,
+                            columns: Optional[Sequence[str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Reads an alert CSV or Excel file, local or remote, in chunks of rows
+
+    Remote CSV files are parsed while they download. Excel files cannot be
+    parsed incrementally; they are read once downloaded, through the Excel
+    conversion cache (see excel_cache.py).
+
+    Args:
+        source: URL or path of the file
+        chunk_rows: Rows per chunk (defaults to CSV_CHUNK_ROWS)
+        cache_dir: Download cache directory (defaults to DOWNLOAD_CACHE_DIR)
+        sheet: Sheet name or position, for Excel files
+        columns: Columns to parse; other columns are skipped, and columns missing
+            from the file are ignored. All columns when None.
+
+    Yields:
+        Lists of rows, as JSON-ready dicts keyed by column name
+    """
+    chunk_rows = chunk_rows or int(os.getenv("CSV_CHUNK_ROWS", "500"))
+    excel = source.lower().endswith(EXCEL_EXTENSIONS)
+    if not source.startswith("http"):
+        async with aclosing(_read_file(source, chunk_rows, excel, sheet, columns)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+        return
+
+    import aiohttp
+
+    cache = DownloadCache(cache_dir or os.getenv("DOWNLOAD_CACHE_DIR", "temp/downloads"))
+    async with aiohttp.ClientSession() as session:
+        async with session.get(source, headers=cache.conditional_headers(source)) as response:
+            if response.status == 304:
+                logger.info(f"{source} not modified; reading the cached copy")
+                async with aclosing(_read_file(str(cache.body_path(source)), chunk_rows, excel, sheet, columns)) as chunks:
+                    async for chunk in chunks:
+                        yield chunk
+                return
+            if response.status != 200:
+                raise Exception(f"Failed to download file: {response.status}")
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+            partial = open(cache.partial_path(source), "wb")
+            try:
+                if excel:
+                    async for data in response.content.iter_chunked(1 << 16):
+                        partial.write(data)
+                    partial.close()
+                    cache.commit(source, etag, last_modified)
+                    async with aclosing(_read_file(str(cache.body_path(source)), chunk_rows, excel, sheet, columns)) as chunks:
+                        async for chunk in chunks:
+                            yield chunk
+                    return
+
+                # The encoding is detected once, from the first bytes of the download
+                sample = b""
+                body = response.content.iter_chunked(1 << 16)
+                async for data in body:
+                    sample += data
+                    if len(sample) >= ENCODING_SAMPLE_BYTES:
+                        break
+                encoding = detect_encoding(sample)
+
+                async with aclosing(_parse_download(source, sample, body, partial, encoding, chunk_rows, columns,
+                                                    lambda: cache.commit(source, etag, last_modified))) as chunks:
+                    async for chunk in chunks:
+                        yield chunk
+            finally:
+                if not partial.closed:
+                    partial.close()
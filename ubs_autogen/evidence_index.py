@@ -0,0 +1,156 @@
+"""
+Local index of evidence already uploaded to storage, keyed by content hash
+
+EvidenceStorage (storage.py) consults it before uploading a screenshot: an
+identical capture (a repeated ISIN, an unchanged register page) is answered
+with the URL of the object uploaded the first time, and costs no upload.
+Every URL handed out holds a reference to its object until it is released;
+objects no longer referenced are deleted from storage, least recently used
+first, once the indexed objects grow beyond `max_bytes`.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    object_name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_unreferenced ON objects (refcount, last_access);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class EvidenceIndex:
+    """SQLite index of uploaded evidence objects with reference counts and dedup statistics"""
+
+    def __init__(self, db_path: str, max_bytes: Optional[int] = None):
+        """
+        Args:
+            db_path: SQLite database file
+            max_bytes: Size above which unreferenced objects are evicted (no limit when None)
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _count(self, name: str, amount: int):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def reference(self, digest: str) -> Optional[str]:
+        """Returns the URL of an uploaded object with this digest and counts the new reference"""
+        with self._lock:
+            row = self._conn.execute("SELECT url, size FROM objects WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE objects SET refcount = refcount + 1, last_access = ? WHERE digest = ?",
+                (time.time(), digest),
+            )
+            self._count("logical_bytes", row["size"])
+            self._count("dedup_hits", 1)
+            return row["url"]
+
+    def record(self, digest: str, object_name: str, url: str, size: int):
+        """Records a newly uploaded object"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO objects (digest, object_name, url, size, refcount, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?)",
+                (digest, object_name, url, size, now, now),
+            )
+            self._count("logical_bytes", size)
+            self._count("uploaded_bytes", size)
+
+    def release(self, url: str) -> bool:
+        """Drops one reference to the object at this URL; returns False if no object has it"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE objects SET refcount = MAX(refcount - 1, 0), last_access = ? WHERE url = ?",
+                (time.time(), url),
+            )
+            return cursor.rowcount > 0
+
+    def evict(self, delete: Callable[[str], None]) -> int:
+        """
+        Deletes unreferenced objects, least recently used first, until the index fits max_bytes
+
+        Args:
+            delete: Removes an object from storage by its name
+
+        Returns:
+            Number of objects deleted
+        """
+        if self.max_bytes is None:
+            return 0
+        evicted = 0
+        # Deleted under the lock: a reference to the same digest waits and then uploads it again
+        with self._lock:
+            stored = self._conn.execute("SELECT COALESCE(SUM(size), 0) AS n FROM objects").fetchone()["n"]
+            if stored <= self.max_bytes:
+                return 0
+            candidates = self._conn.execute(
+                "SELECT digest, object_name, size FROM objects WHERE refcount <= 0 ORDER BY last_access"
+            ).fetchall()
+            for row in candidates:
+                if stored <= self.max_bytes:
+                    break
+                try:
+                    delete(row["object_name"])
+                except Exception as e:
+                    logger.warning(f"Could not evict evidence object {row['object_name']}: {e}")
+                    break
+                self._conn.execute("DELETE FROM objects WHERE digest = ?", (row["digest"],))
+                self._count("evicted_bytes", row["size"])
+                stored -= row["size"]
+                evicted += 1
+        if stored > self.max_bytes:
+            logger.warning(f"Evidence index holds {stored} bytes of referenced objects, "
+                           f"above its limit of {self.max_bytes}")
+        if evicted:
+            logger.info(f"Evicted {evicted} unreferenced evidence objects")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {row["name"]: row["value"] for row in self._conn.execute("SELECT name, value FROM counters")}
+            objects = self._conn.execute(
+                "SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS bytes, "
+                "COALESCE(SUM(CASE WHEN refcount <= 0 THEN size ELSE 0 END), 0) AS unreferenced FROM objects"
+            ).fetchone()
+        uploaded = counters.get("uploaded_bytes", 0)
+        return {
+            "objects": objects["n"],
+            "storage_bytes": objects["bytes"],
+            "unreferenced_bytes": objects["unreferenced"],
+            "max_bytes": self.max_bytes,
+            "evicted_bytes": counters.get("evicted_bytes", 0),
+            "logical_bytes": counters.get("logical_bytes", 0),
+            "dedup_hits": counters.get("dedup_hits", 0),
+            "dedup_ratio": round(counters.get("logical_bytes", 0) / uploaded, 3) if uploaded else 1.0,
+        }
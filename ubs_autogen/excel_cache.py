@@ -0,0 +1,117 @@
+"""
+Columnar cache of converted Excel inputs
+
+Parsing a large workbook with pd.read_excel takes far longer than reading the
+same data from a columnar file, and the same workbook is often submitted more
+than once. The first read of a sheet converts it into a cache file named after
+the SHA-256 of the workbook; later reads of the same content, under any name or
+URL, load the cache instead. A projection (a list of columns) limits both the
+parsing and the cache file to those columns.
+
+The cache is written as Parquet when pyarrow is installed, as a pandas pickle
+otherwise.
+
+Configuration is read from the environment:
+- EXCEL_CACHE_DIR: where converted sheets are kept (default temp/excel_cache)
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def file_digest(path: Union[str, Path]) -> str:
+    """SHA-256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExcelCache:
+    """Converted workbook sheets, keyed by workbook content, sheet and projection"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.getenv("EXCEL_CACHE_DIR", "temp/excel_cache"))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.extension = ".parquet" if _parquet_available() else ".pkl"
+
+    def _path(self, digest: str, sheet: Union[str, int], columns: Optional[Iterable[str]]) -> Path:
+        projection = "all"
+        if columns is not None:
+            projection = hashlib.sha256("\x1f".join(sorted(columns)).encode("utf-8")).hexdigest()[:16]
+        sheet_key = hashlib.sha256(str(sheet).encode("utf-8")).hexdigest()[:8]
+        return self.directory / f"{digest}-{sheet_key}-{projection}{self.extension}"
+
+    def _read(self, path: Path, columns: Optional[Iterable[str]]) -> pd.DataFrame:
+        if self.extension == ".parquet":
+            if columns is None:
+                return pd.read_parquet(path)
+            import pyarrow.parquet as pq
+
+            present = set(pq.read_schema(path).names)
+            return pd.read_parquet(path, columns=[c for c in columns if c in present])
+        df = pd.read_pickle(path)
+        return df if columns is None else df[[c for c in columns if c in df.columns]]
+
+    def _storable(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Turns the values of mixed-type columns into text, which Parquet can store"""
+        if self.extension != ".parquet":
+            return df
+        df = df.copy()
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].map(lambda v: v if isinstance(v, str) or pd.isna(v) else str(v))
+        return df
+
+    def _write(self, path: Path, df: pd.DataFrame):
+        temp_path = path.with_name(path.name + ".tmp")
+        if self.extension == ".parquet":
+            df.to_parquet(temp_path, index=False)
+        else:
+            df.to_pickle(temp_path)
+        os.replace(temp_path, path)
+
+    def load(self, path: Union[str, Path], sheet: Union[str, int] = 0,
+             columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Reads a sheet of a workbook, from the cache when the same content was read before
+
+        Args:
+            path: Excel file (.xlsx or .xls)
+            sheet: Sheet name or position
+            columns: Columns to read; columns missing from the sheet are ignored.
+                All columns when None.
+
+        Returns:
+            The sheet as a DataFrame
+        """
+        columns = list(columns) if columns is not None else None
+        digest = file_digest(path)
+
+        # A cached conversion of the whole sheet serves any projection
+        for cached in (self._path(digest, sheet, None), self._path(digest, sheet, columns)):
+            if cached.exists():
+                logger.info(f"Reading {path} from the Excel cache")
+                return self._read(cached, columns)
+
+        wanted = set(columns) if columns is not None else None
+        df = pd.read_excel(path, sheet_name=sheet,
+                           usecols=(lambda column: column in wanted) if wanted is not None else None)
+        # The first read returns what later reads of the cache will
+        df = self._storable(df)
+        try:
+            self._write(self._path(digest, sheet, columns), df)
+        except Exception as e:
+            logger.warning(f"Could not cache {path}: {e}")
+        return df
@@ -0,0 +1,226 @@
+"""
+Incremental results writer for process_group_alert
+
+Results are appended as each alert completes instead of being collected and
+written at the end. Every record is flattened (nested dicts become dotted
+columns, e.g. "market_verification.is_regulated") and its values keep their
+types, so downstream readers never have to eval stringified dicts. Records are
+written to local files in RESULTS_DIR as they arrive and uploaded in parts of
+RESULTS_PART_ROWS records, so memory stays bounded and the results of a run
+that fails midway are kept up to its last part. A manifest listing the parts
+is uploaded when the writer is closed.
+
+Formats:
+- csv: the columns of the schema
+- jsonl: every flattened field, including fields outside the schema
+- parquet: the columns of the schema with their types (requires pyarrow)
+
+Configuration is read from the environment:
+- RESULTS_FORMATS: comma-separated formats (default csv,jsonl)
+- RESULTS_PART_ROWS: records per uploaded part (default 500)
+- RESULTS_DIR: local directory of the result files (default temp/results)
+"""
+import asyncio
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns of an alert result, with their types; Swiss share checks and market
+# type checks each fill their own columns
+RESULT_SCHEMA: List[Tuple[str, type]] = [
+    ("alert_id", str),
+    ("isin", str),
+    ("company_name", str),
+    ("market_type", str),
+    ("is_regulated", bool),
+    ("is_matched", bool),
+    ("expected_shares", int),
+    ("actual_shares", int),
+    ("decision", str),
+    ("justification", str),
+    ("evidence_url", str),
+    ("source_url", str),
+    ("verification_timestamp", str),
+]
+
+FORMATS = ("csv", "jsonl", "parquet")
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def flatten(record: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flattens nested dicts into dotted keys; lists are kept as JSON text"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (list, tuple)):
+            flat[name] = json.dumps(value, default=str)
+        else:
+            flat[name] = value
+    return flat
+
+def _coerce(value: Any, column_type: type) -> Any:
+    """Converts a value to its column type; values that do not convert become None"""
+    if value is None or isinstance(value, column_type) and not (column_type is int and isinstance(value, bool)):
+        return value
+    try:
+        if column_type is bool:
+            if isinstance(value, str):
+                return {"true": True, "false": False, "yes": True, "no": False}.get(value.strip().lower())
+            return bool(value)
+        if column_type is int:
+            number = float(value)
+            return int(number) if number.is_integer() else None
+        return column_type(value)
+    except (TypeError, ValueError):
+        return None
+
+class _Format:
+    """One output format: a local file written as records arrive, and its encoded parts"""
+
+    def __init__(self, kind: str, path: Path, schema: List[Tuple[str, type]]):
+        self.kind = kind
+        self.path = path
+        self.schema = schema
+        self.columns = [name for name, _ in schema]
+        self._parquet_writer = None
+        self._arrow_schema = None
+        if kind == "parquet":
+            import pyarrow as pa
+            types = {str: pa.string(), bool: pa.bool_(), int: pa.int64(), float: pa.float64()}
+            self._arrow_schema = pa.schema([(name, types[column_type]) for name, column_type in schema])
+
+    def encode(self, rows: List[Dict[str, Any]], flat: List[Dict[str, Any]], header: bool) -> bytes:
+        """Encodes a part: typed rows for csv and parquet, every flattened field for jsonl"""
+        if self.kind == "jsonl":
+            return "".join(json.dumps(record, default=str) + "\n" for record in flat).encode("utf-8")
+        if self.kind == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=self.columns)
+            if header:
+                writer.writeheader()
+            writer.writerows(rows)
+            return buffer.getvalue().encode("utf-8")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        buffer = io.BytesIO()
+        pq.write_table(pa.Table.from_pylist(rows, schema=self._arrow_schema), buffer)
+        return buffer.getvalue()
+
+    def append_local(self, rows: List[Dict[str, Any]], part: bytes):
+        """Appends a part to the local file, which stays readable up to its last part"""
+        if self.kind == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(str(self.path), self._arrow_schema)
+            self._parquet_writer.write_table(pa.Table.from_pylist(rows, schema=self._arrow_schema))
+            return
+        with open(self.path, "ab") as f:
+            f.write(part)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+class ResultsWriter:
+    """
+    Appends alert results to CSV, JSONL and Parquet outputs as they complete
+
+    Call append() for every result and close() at the end of the run, which
+    uploads the last part and a manifest of all parts. At most part_rows
+    records are held in memory.
+    """
+
+    def __init__(self, storage, name: str = "alert_processing_results",
+                 formats: Optional[Sequence[str]] = None, part_rows: Optional[int] = None,
+                 directory: Optional[str] = None, schema: Optional[List[Tuple[str, type]]] = None):
+        """
+        Args:
+            storage: EvidenceStorage the parts and manifest are uploaded through
+            name: Name of the run; a timestamp is appended
+            formats: Output formats (defaults to RESULTS_FORMATS)
+            part_rows: Records per uploaded part (defaults to RESULTS_PART_ROWS)
+            directory: Local directory of the result files (defaults to RESULTS_DIR)
+            schema: Columns and types of csv and parquet outputs (defaults to RESULT_SCHEMA)
+        """
+        self.storage = storage
+        self.run_name = f"{name}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        formats = formats or os.getenv("RESULTS_FORMATS", "csv,jsonl").split(",")
+        formats = [kind.strip().lower() for kind in formats if kind.strip()]
+        unknown = [kind for kind in formats if kind not in FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown results format: {unknown[0]}")
+        self.part_rows = part_rows or int(os.getenv("RESULTS_PART_ROWS", "500"))
+        self.schema = schema or RESULT_SCHEMA
+        self.directory = Path(directory or os.getenv("RESULTS_DIR", "temp/results"))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._formats = [_Format(kind, self.directory / f"{self.run_name}.{kind}", self.schema)
+                         for kind in formats]
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self.parts: Dict[str, List[str]] = {kind: [] for kind in formats}
+        self.record_count = 0
+
+    def _typed_row(self, flat: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: _coerce(flat.get(name), column_type) for name, column_type in self.schema}
+
+    async def append(self, result: Dict[str, Any]):
+        """Adds a result; a full part is written and uploaded before this returns"""
+        async with self._lock:
+            self._buffer.append(flatten(result))
+            self.record_count += 1
+            if len(self._buffer) >= self.part_rows:
+                await self._flush()
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        flat, self._buffer = self._buffer, []
+        rows = [self._typed_row(record) for record in flat]
+        number = len(next(iter(self.parts.values()), []))
+        for output in self._formats:
+            part = await asyncio.to_thread(output.encode, rows, flat, number == 0)
+            await asyncio.to_thread(output.append_local, rows, part)
+            object_name = f"results/{self.run_name}/{output.kind}/part-{number:05d}.{output.kind}"
+            url = await self.storage.upload_object(object_name, part, CONTENT_TYPES[output.kind])
+            self.parts[output.kind].append(url)
+
+    async def close(self) -> Dict[str, Any]:
+        """
+        Writes the last part and uploads a manifest of the run
+
+        Returns:
+            The manifest: record count, columns, local files, part URLs and its own URL
+        """
+        async with self._lock:
+            await self._flush()
+            for output in self._formats:
+                await asyncio.to_thread(output.close)
+            manifest = {
+                "run": self.run_name,
+                "record_count": self.record_count,
+                "columns": [{"name": name, "type": column_type.__name__} for name, column_type in self.schema],
+                "files": {output.kind: str(output.path) for output in self._formats},
+                "parts": self.parts,
+            }
+            manifest["manifest_url"] = await self.storage.upload_object(
+                f"results/{self.run_name}/manifest.json",
+                json.dumps(manifest, indent=2).encode("utf-8"),
+                "application/json",
+            )
+            logger.info(f"Wrote {self.record_count} results in {len(next(iter(self.parts.values()), []))} parts "
+                        f"per format to {self.directory}")
+            return manifest
@@ -0,0 +1,416 @@
+"""
+Non-blocking evidence storage for the validators in app.py
+
+Uploads never run on the event loop. Each tool call gets an EvidenceStorage
+whose upload queue hands objects to a few background workers. Evidence URLs
+are returned once the object is stored, so a failed upload never produces a
+dangling link; result files are returned at once and stored by close().
+Small objects waiting in the queue are uploaded together in one worker turn.
+Backends are created once per process and reused by every tool call, so the
+Supabase client, its connection pool and the bucket check are paid only once.
+
+Configuration is read from the environment:
+- STORAGE_BACKEND: supabase (default) or local
+- LOCAL_STORAGE_DIR: root directory of the local backend (default temp/storage)
+- EVIDENCE_INDEX_MAX_BYTES: size above which unreferenced evidence objects are deleted (no limit when unset)
+- UPLOAD_CONCURRENCY: uploads in flight at once (default 4)
+- UPLOAD_QUEUE_SIZE: batches waiting before submit blocks (default 64)
+- UPLOAD_BATCH_SIZE: small objects uploaded per worker turn (default 16)
+- UPLOAD_SMALL_BYTES: objects up to this size are batched (default 262144)
+- UPLOAD_SPILL_BYTES: larger objects wait for their upload on disk, not in memory (default 4194304)
+- UPLOAD_SPILL_DIR: directory of those spill files (default temp/spill)
+- UPLOAD_SPILL_MAX_BYTES: disk budget of the spill directory (default 268435456)
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from evidence_index import EvidenceIndex, content_digest
+
+logger = logging.getLogger(__name__)
+
+# Prefix of content-addressed evidence objects; any copy of one is the same object
+EVIDENCE_PREFIX = "evidence/"
+
+class LocalBackend:
+    """Stores objects under a directory; for offline runs and tests"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, object_name: str, data: Union[bytes, Path], content_type: str):
+        path = self.root / object_name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        if isinstance(data, Path):
+            shutil.copyfile(data, temp_path)
+        else:
+            temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+    def delete(self, object_name: str):
+        (self.root / object_name).unlink(missing_ok=True)
+
+    def public_url(self, object_name: str) -> str:
+        return (self.root / object_name).resolve().as_uri()
+
+class SupabaseBackend:
+    """Supabase Storage bucket behind one long-lived client"""
+
+    def __init__(self, url: str, key: str, bucket_name: str = "ubs"):
+        from supabase import create_client
+
+        self.client = create_client(url, key)
+        self.bucket_name = bucket_name
+        # Create bucket if it doesn't exist
+        try:
+            self.client.storage.get_bucket(bucket_name)
+        except Exception:
+            self.client.storage.create_bucket(bucket_name)
+        self.bucket = self.client.storage.from_(bucket_name)
+
+    def put(self, object_name: str, data: Union[bytes, Path], content_type: str):
+        # A spilled object is streamed from its file by the client
+        file = str(data) if isinstance(data, Path) else data
+        try:
+            self.bucket.upload(path=object_name, file=file, file_options={"content-type": content_type})
+        except Exception as e:
+            # Content-addressed objects may have been uploaded by another run; other names must not be reused
+            duplicate = "exist" in str(e).lower() or "duplicate" in str(e).lower()
+            if not (duplicate and object_name.startswith(EVIDENCE_PREFIX)):
+                raise
+
+    def delete(self, object_name: str):
+        self.bucket.remove([object_name])
+
+    def public_url(self, object_name: str) -> str:
+        return self.bucket.get_public_url(object_name)
+
+_backend = None
+_index = None
+_shared_lock = threading.Lock()
+
+def get_backend():
+    """Returns the process-wide storage backend selected by STORAGE_BACKEND"""
+    global _backend
+    with _shared_lock:
+        if _backend is None:
+            if os.getenv("STORAGE_BACKEND", "supabase").lower() == "local":
+                _backend = LocalBackend(os.getenv("LOCAL_STORAGE_DIR", "temp/storage"))
+            else:
+                _backend = SupabaseBackend(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+        return _backend
+
+def get_index() -> EvidenceIndex:
+    """Returns the process-wide index of uploaded evidence"""
+    global _index
+    with _shared_lock:
+        if _index is None:
+            os.makedirs("temp", exist_ok=True)
+            max_bytes = os.getenv("EVIDENCE_INDEX_MAX_BYTES")
+            _index = EvidenceIndex(os.getenv("EVIDENCE_INDEX_DB", "temp/evidence_index.db"),
+                                   max_bytes=int(max_bytes) if max_bytes else None)
+        return _index
+
+class SpillDirectory:
+    """
+    Disk space for queued uploads too large to keep in memory, within a byte budget
+
+    Files left behind by an interrupted run are removed when it is created.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        for leftover in self.root.glob("*.spill"):
+            leftover.unlink()
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.spilled = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> Optional[Path]:
+        """Writes data to a spill file, or returns None when the budget does not allow it"""
+        with self._lock:
+            if self.used_bytes + len(data) > self.max_bytes:
+                self.refused += 1
+                return None
+            self.used_bytes += len(data)
+            self.spilled += 1
+        path = self.root / f"{uuid.uuid4().hex}.spill"
+        try:
+            path.write_bytes(data)
+        except OSError:
+            self.remove(path, len(data))
+            raise
+        return path
+
+    def remove(self, path: Path, size: int):
+        if path.exists():
+            path.unlink()
+        with self._lock:
+            self.used_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "used_bytes": self.used_bytes,
+                "max_bytes": self.max_bytes,
+                "spilled": self.spilled,
+                "refused": self.refused,
+            }
+
+_spill = None
+
+def get_spill() -> SpillDirectory:
+    """Returns the process-wide spill directory"""
+    global _spill
+    with _shared_lock:
+        if _spill is None:
+            _spill = SpillDirectory(os.getenv("UPLOAD_SPILL_DIR", "temp/spill"),
+                                    int(os.getenv("UPLOAD_SPILL_MAX_BYTES", str(256 * 1024 * 1024))))
+        return _spill
+
+class UploadQueue:
+    """
+    Bounded queue of uploads drained by background workers
+
+    The queue holds batches: objects up to `small_bytes` join the newest batch
+    not yet taken by a worker, up to `batch_size` of them, and are uploaded in
+    a single worker-thread hop; larger objects are queued on their own. Objects above `spill_bytes` wait
+    in a spill file rather than in memory and are streamed from it, as long
+    as the spill directory's budget allows; otherwise they stay in memory.
+    """
+
+    def __init__(self, backend, concurrency: int = 4, max_pending: int = 64,
+                 batch_size: int = 16, small_bytes: int = 256 * 1024,
+                 spill: Optional[SpillDirectory] = None, spill_bytes: int = 4 * 1024 * 1024):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.small_bytes = small_bytes
+        self.spill = spill
+        self.spill_bytes = spill_bytes
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+        # Batch of small objects that later small objects may still join
+        self._open_batch: Optional[List[Tuple[str, Union[bytes, Path], int, str, Any]]] = None
+        self._workers: List[asyncio.Task] = []
+        self.uploaded = 0
+        self.uploaded_bytes = 0
+        self.batches = 0
+        self.failed = 0
+        self.upload_seconds = 0.0
+
+    async def submit(self, object_name: str, data: bytes, content_type: str = "application/octet-stream",
+                     on_done: Optional[Callable[[bool], None]] = None):
+        """
+        Queues an upload; waits only while the queue is full
+
+        Args:
+            object_name: Name of the object in storage
+            data: Object content
+            content_type: MIME type of the content
+            on_done: Called in the worker thread with True once the object is stored, or False if it failed
+        """
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        size = len(data)
+        payload: Union[bytes, Path] = data
+        if self.spill is not None and size > self.spill_bytes:
+            spilled = await asyncio.to_thread(self.spill.write, data)
+            if spilled is not None:
+                payload = spilled
+        item = (object_name, payload, size, content_type, on_done)
+        if size <= self.small_bytes:
+            if self._open_batch is not None and len(self._open_batch) < self.batch_size:
+                self._open_batch.append(item)
+                return
+            batch = self._open_batch = [item]
+        else:
+            batch = [item]
+        await self._queue.put(batch)
+
+    def _put_batch(self, batch: List[Tuple[str, Union[bytes, Path], int, str, Any]]) -> int:
+        failed = 0
+        for object_name, payload, size, content_type, on_done in batch:
+            try:
+                self.backend.put(object_name, payload, content_type)
+                stored = True
+            except Exception as e:
+                failed += 1
+                stored = False
+                logger.error(f"Upload of {object_name} failed: {e}")
+            finally:
+                if isinstance(payload, Path):
+                    self.spill.remove(payload, size)
+            if on_done is not None:
+                on_done(stored)
+        return failed
+
+    async def _work(self):
+        while True:
+            batch = await self._queue.get()
+            if batch is self._open_batch:
+                self._open_batch = None
+            started = time.perf_counter()
+            try:
+                failed = await asyncio.to_thread(self._put_batch, batch)
+            except Exception as e:
+                failed = len(batch)
+                logger.error(f"Upload batch of {len(batch)} objects failed: {e}")
+            finally:
+                self._queue.task_done()
+            self.upload_seconds += time.perf_counter() - started
+            self.batches += 1
+            self.failed += failed
+            self.uploaded += len(batch) - failed
+            self.uploaded_bytes += sum(item[2] for item in batch)
+
+    async def flush(self):
+        """Waits until every queued upload has finished"""
+        await self._queue.join()
+
+    async def close(self):
+        """Finishes the queued uploads and stops the workers"""
+        await self.flush()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize(),
+            "spill": self.spill.stats() if self.spill is not None else None,
+            "uploaded": self.uploaded,
+            "uploaded_bytes": self.uploaded_bytes,
+            "batches": self.batches,
+            "failed": self.failed,
+            "upload_seconds": round(self.upload_seconds, 3),
+        }
+
+class EvidenceStorage:
+    """
+    Storage used by one tool call: content-addressed evidence and timestamped result files
+
+    Evidence URLs are returned once the object is stored. Result files are
+    uploaded in the background and their URLs returned at once; call close()
+    before reporting those to the user, so the objects exist when opened.
+    Each evidence URL returned references its object until release() is
+    called with it, e.g. when the result holding it is discarded.
+    """
+
+    def __init__(self, backend=None, evidence_index: Optional[EvidenceIndex] = None):
+        self.backend = backend or get_backend()
+        self.evidence_index = evidence_index or get_index()
+        self.uploads = UploadQueue(
+            self.backend,
+            concurrency=int(os.getenv("UPLOAD_CONCURRENCY", "4")),
+            max_pending=int(os.getenv("UPLOAD_QUEUE_SIZE", "64")),
+            batch_size=int(os.getenv("UPLOAD_BATCH_SIZE", "16")),
+            small_bytes=int(os.getenv("UPLOAD_SMALL_BYTES", str(256 * 1024))),
+            spill=get_spill(),
+            spill_bytes=int(os.getenv("UPLOAD_SPILL_BYTES", str(4 * 1024 * 1024))),
+        )
+        # Evidence being uploaded, by digest: resolves to its URL, or None if the upload failed
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._in_flight_lock = threading.Lock()
+
+    async def upload_file(self, file_path: str, file_name: Optional[str] = None) -> Optional[str]:
+        """Uploads an evidence file, once per distinct content; returns its URL, or None if the upload failed"""
+        file_data = await asyncio.to_thread(Path(file_path).read_bytes)
+        return await self.upload_bytes(file_data, file_name or os.path.basename(file_path))
+
+    async def upload_bytes(self, file_data: bytes, file_name: str) -> Optional[str]:
+        """
+        Uploads evidence held in memory, e.g. a screenshot, once per distinct content
+
+        Args:
+            file_data: The evidence content
+            file_name: Name whose extension the stored object gets
+
+        Returns:
+            Public URL of the stored object, or None if the upload failed
+        """
+        # Identical evidence is stored under its content hash and uploaded only once
+        digest = content_digest(file_data)
+        loop = asyncio.get_running_loop()
+        with self._in_flight_lock:
+            pending = self._in_flight.get(digest)
+            uploading = pending is None
+            if uploading:
+                pending = self._in_flight[digest] = loop.create_future()
+        if not uploading:
+            # Shielded, so a cancelled caller does not cancel the upload others wait for
+            if await asyncio.shield(pending) is None:
+                return None
+            return await asyncio.to_thread(self.evidence_index.reference, digest)
+
+        file_url = None
+        try:
+            file_url = await asyncio.to_thread(self.evidence_index.reference, digest)
+            if file_url is None:
+                object_name = f"{EVIDENCE_PREFIX}{digest}{os.path.splitext(file_name)[1]}"
+                stored = loop.create_future()
+
+                def uploaded(ok: bool):
+                    loop.call_soon_threadsafe(lambda: stored.done() or stored.set_result(ok))
+
+                await self.uploads.submit(object_name, file_data, on_done=uploaded)
+                if await stored:
+                    url = self.backend.public_url(object_name)
+                    await asyncio.to_thread(self.evidence_index.record, digest, object_name, url, len(file_data))
+                    file_url = url
+                    await asyncio.to_thread(self.evidence_index.evict, self.backend.delete)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(digest, None)
+            if not pending.done():
+                pending.set_result(file_url)
+        return file_url
+
+    async def release(self, evidence_url: str) -> bool:
+        """
+        Drops the reference an evidence URL holds, so its object can be evicted
+
+        Returns:
+            False if the URL is not a known evidence object
+        """
+        released = await asyncio.to_thread(self.evidence_index.release, evidence_url)
+        if released:
+            await asyncio.to_thread(self.evidence_index.evict, self.backend.delete)
+        return released
+
+    async def upload_binary(self, binary_data: bytes, file_name: str) -> str:
+        """Uploads data under a timestamped name"""
+        unique_filename = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{file_name}"
+        await self.uploads.submit(unique_filename, binary_data)
+        return self.backend.public_url(unique_filename)
+
+    async def upload_object(self, object_name: str, data: bytes,
+                            content_type: str = "application/octet-stream") -> str:
+        """Uploads data under the given object name, e.g. one part of a results file"""
+        await self.uploads.submit(object_name, data, content_type)
+        return self.backend.public_url(object_name)
+
+    async def save_json_data(self, data, file_name: str) -> str:
+        json_str = json.dumps(data, indent=2)
+        return await self.upload_binary(json_str.encode("utf-8"), file_name)
+
+    async def close(self) -> Dict[str, Any]:
+        """Waits for the queued uploads and returns the upload statistics"""
+        await self.uploads.close()
+        stats = self.uploads.stats()
+        logger.info(f"Uploaded {stats['uploaded']} objects ({stats['uploaded_bytes']} bytes) "
+                    f"in {stats['batches']} batches, {stats['failed']} failed")
+        return stats
@@ -0,0 +1,164 @@
+"""
+Resumable batch processing for the alert app
+
+The SQLite work queue itself is shared with the FastAPI service
+(jobs/work_queue.py at the repository root); this module only adds the
+batch loop. Queue calls are blocking SQLite operations and run in worker
+threads, so they never stall the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterable, Dict, List, Union
+
+# The app runs from its own directory; the queue lives in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jobs.work_queue import DONE, FAILED, IN_PROGRESS, WorkQueue  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+def _fingerprint(payloads: List[Dict[str, Any]]) -> str:
+    text = json.dumps(payloads, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+async def process_resumable(queue: WorkQueue,
+                            source: str,
+                            payloads: Union[List[Dict[str, Any]], AsyncIterable[List[Dict[str, Any]]]],
+                            handler,
+                            concurrency: int = 1,
+                            lease_seconds: float = 300.0,
+                            on_result=None) -> List[Dict[str, Any]]:
+    """
+    Processes a batch through the queue, resuming an earlier unfinished run of the same source
+
+    Args:
+        queue: Work queue persisting item states and results
+        source: Identifier of the batch input (e.g. the CSV URL); a crashed run for the same
+            source and content is resumed instead of starting over. The content is told apart
+            by a hash of the items, or of the first chunk of an iterable, so a URL that serves
+            a different file starts a new run.
+        payloads: JSON-serializable items, or an async iterable of lists of items. Items of
+            an iterable are processed as they arrive; on resume it is read again and only
+            items not recorded before are added.
+        handler: Coroutine function processing one payload and returning a JSON-ready dict
+        concurrency: Number of worker coroutines
+        lease_seconds: Lease duration of a claimed item; renewed while it is processed
+        on_result: Coroutine function called with each result as soon as its item is
+            done, starting with the results recorded by an interrupted earlier run. When
+            given, results are not collected in memory and an empty list is returned.
+
+    Returns:
+        Results of the successfully processed items, in input order
+    """
+    streaming = not isinstance(payloads, list)
+    if streaming:
+        chunks = payloads.__aiter__()
+        first_chunk = await anext(chunks, [])
+        key = f"{source}#{_fingerprint(first_chunk)}"
+    else:
+        key = f"{source}#{_fingerprint(payloads)}"
+    job = await asyncio.to_thread(queue.find_unfinished_job, key)
+    if job is None:
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(queue.create_job, job_id, [] if streaming else payloads, key)
+    else:
+        job_id = job["job_id"]
+        counts = await asyncio.to_thread(queue.counts, job_id)
+        logger.info(f"Resuming {source}: {counts[DONE] + counts[FAILED]}/{job['total']} alerts already processed")
+        if on_result is not None:
+            position = 0
+            while True:
+                page = await asyncio.to_thread(queue.finished_items, job_id, position)
+                if not page:
+                    break
+                position = page[-1]["completion_order"]
+                for item in page:
+                    if item["state"] == DONE:
+                        await on_result(item["result"])
+    await asyncio.to_thread(queue.set_job_state, job_id, IN_PROGRESS)
+
+    # Items of a streamed input are added while the workers run; workers wait for them
+    arrived = asyncio.Event()
+    loaded = not streaming
+
+    async def load():
+        nonlocal loaded
+        seq = 0
+        try:
+            await asyncio.to_thread(queue.append_items, job_id, first_chunk, seq)
+            seq += len(first_chunk)
+            arrived.set()
+            async for chunk in chunks:
+                await asyncio.to_thread(queue.append_items, job_id, chunk, seq)
+                seq += len(chunk)
+                arrived.set()
+        finally:
+            loaded = True
+            arrived.set()
+
+    instance_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    held_items = set()
+
+    async def renew_lease(item_id, worker_id):
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            if not await asyncio.to_thread(queue.renew, item_id, worker_id, lease_seconds):
+                return
+
+    async def worker(worker_id):
+        while True:
+            # Cleared before claiming, so items appended during the claim still wake the worker
+            arrived.clear()
+            item = await asyncio.to_thread(queue.claim, job_id, worker_id, lease_seconds)
+            if item is None and not loaded:
+                await arrived.wait()
+                continue
+            if item is None:
+                if (await asyncio.to_thread(queue.counts, job_id))[IN_PROGRESS] <= len(held_items):
+                    return
+                # Items leased by a crashed run become claimable once their lease expires
+                expiry = await asyncio.to_thread(queue.next_lease_expiry, job_id)
+                delay = (expiry - time.time()) if expiry else 0
+                await asyncio.sleep(min(max(delay, 0.05), 5.0))
+                continue
+
+            held_items.add(item["item_id"])
+            heartbeat = asyncio.create_task(renew_lease(item["item_id"], worker_id))
+            completed = False
+            try:
+                result = await handler(item["payload"])
+                completed = await asyncio.to_thread(queue.complete, item["item_id"], worker_id, result)
+            except Exception as e:
+                logger.error(f"Alert {item['seq']} failed (attempt {item['attempts']}): {e}")
+                await asyncio.to_thread(queue.fail, item["item_id"], worker_id, str(e))
+            finally:
+                heartbeat.cancel()
+                held_items.discard(item["item_id"])
+            if completed and on_result is not None:
+                await on_result(result)
+
+    loader = asyncio.create_task(load()) if streaming else None
+    await asyncio.gather(*(worker(f"{instance_id}-{n}") for n in range(max(1, concurrency))))
+    if loader is not None:
+        # A failed input leaves the job unfinished, so the next run resumes it
+        await loader
+    await asyncio.to_thread(queue.set_job_state, job_id, DONE)
+    if on_result is not None:
+        return []
+
+    results = []
+    position = 0
+    while True:
+        page = await asyncio.to_thread(queue.finished_items, job_id, position)
+        if not page:
+            break
+        position = page[-1]["completion_order"]
+        results.extend(item for item in page if item["state"] == DONE)
+    return [item["result"] for item in sorted(results, key=lambda item: item["seq"])]
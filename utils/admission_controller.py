@@ -0,0 +1,86 @@
+import logging
+import math
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+class CapacityExceeded(Exception):
+    """Raised when a request is rejected because the service is at capacity"""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+class AdmissionController:
+    """
+    Bounds the number of alerts accepted by the API
+
+    Up to `capacity` alerts run at once (the number that can hold an LLM
+    conversation and a browser page together); up to `max_queue` more may wait
+    for a slot. Anything beyond that is rejected with a Retry-After estimated
+    from the queue length and the observed time per alert, so clients back off
+    instead of piling up Chromium pages and LLM chats.
+    """
+
+    def __init__(self, capacity: int, max_queue: int,
+                 initial_service_seconds: float = 30.0, smoothing: float = 0.2):
+        """
+        Args:
+            capacity: Alerts processed at the same time
+            max_queue: Additional alerts allowed to wait for a slot
+            initial_service_seconds: Time per alert assumed before any has been measured
+            smoothing: Weight of the latest measurement in the moving average of alert time
+        """
+        self.capacity = max(1, capacity)
+        self.max_queue = max(0, max_queue)
+        self.service_seconds = initial_service_seconds
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.capacity)
+
+    def observe(self, seconds: float):
+        """Records the processing time of one alert"""
+        self.service_seconds += self.smoothing * (seconds - self.service_seconds)
+
+    def estimate_wait(self, items_ahead: int, workers: int) -> int:
+        """Returns the whole seconds until items_ahead alerts have been processed by the given workers"""
+        return max(1, math.ceil(items_ahead * self.service_seconds / max(1, workers)))
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Holds a place for one request
+
+        Raises:
+            CapacityExceeded: When every slot and queue position is taken
+        """
+        if self.in_flight >= self.capacity + self.max_queue:
+            self.rejected += 1
+            retry_after = self.estimate_wait(self.queued + 1, self.capacity)
+            logger.warning(f"Rejecting request: {self.in_flight} alerts in flight, retry after {retry_after}s")
+            raise CapacityExceeded(retry_after, "Too many alerts in progress")
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns queue-depth gauges and admission counters"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "capacity": self.capacity,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_alert_seconds": round(self.service_seconds, 3),
+        }
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT = re.compile(r"^audit-(\d{8})-(\d+)\.log$")
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    """One line per record: CRC-32 of the compact JSON, a tab, the JSON"""
+    data = json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    return b"%08x\t%s\n" % (zlib.crc32(data), data)
+
+def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+    """Returns the record of a line, or None for a torn or altered line"""
+    checksum, _, data = line.rstrip(b"\n").partition(b"\t")
+    try:
+        if int(checksum, 16) != zlib.crc32(data):
+            return None
+        return json.loads(data)
+    except ValueError:
+        return None
+
+class AuditLog:
+    """
+    Append-only, structured audit log of decisions and evidence
+
+    record() appends to an in-memory buffer and returns at once. A background
+    writer group-commits everything buffered: one write and one fsync for the
+    whole batch, so logging every alert costs a fraction of a millisecond each
+    even at full batch throughput. Records are compact JSON lines, each with a
+    CRC-32, numbered in order. The log is split into segment files, rotated
+    once a segment reaches `segment_bytes` or is `segment_seconds` old; a
+    segment is never modified after rotation.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, segment_seconds: float = 86400,
+                 flush_interval: float = 0.2, fsync: bool = True):
+        """
+        Args:
+            directory: Directory holding the segment files
+            segment_bytes: Size after which a new segment is started
+            segment_seconds: Age after which a new segment is started
+            flush_interval: Time the writer waits to gather a batch once a record arrives, in seconds
+            fsync: Whether each batch is synced to disk before the writer continues
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._file = None
+        self._segment_started = 0.0
+        self.written = 0
+        self.batches = 0
+
+        segments = self.segments()
+        self._segment_number = int(_SEGMENT.match(segments[-1].name).group(1)) if segments else 0
+        self._seq = self._last_seq(segments[-1]) if segments else 0
+
+    def segments(self) -> List[Path]:
+        """Segment files, oldest first"""
+        return sorted(path for path in self.directory.iterdir() if _SEGMENT.match(path.name))
+
+    def _last_seq(self, segment: Path) -> int:
+        last = 0
+        with open(segment, "rb") as f:
+            for line in f:
+                record = _decode(line)
+                if record is not None:
+                    last = record["seq"]
+        return last
+
+    def start(self):
+        if self._writer is None:
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def record(self, event: str, **fields):
+        """
+        Buffers an audit record; it is written by the background writer
+
+        Args:
+            event: Kind of record, e.g. "decision" or "evidence"
+            **fields: JSON-serializable details, e.g. alert_id
+        """
+        with self._buffer_lock:
+            self._seq += 1
+            self._buffer.append({"seq": self._seq, "ts": time.time(), "event": event, **fields})
+            first = len(self._buffer) == 1
+        if first and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _open_segment(self, now: float, first_ts: float):
+        if self._file is not None:
+            self._file.close()
+        self._segment_number += 1
+        # Named after its first record, so readers can skip segments outside a time window
+        path = self.directory / f"audit-{self._segment_number:08d}-{int(first_ts)}.log"
+        self._file = open(path, "ab")
+        self._segment_started = now
+
+    def _write(self) -> int:
+        """Writes everything buffered as one batch"""
+        with self._write_lock:
+            with self._buffer_lock:
+                records, self._buffer = self._buffer, []
+            if not records:
+                return 0
+            try:
+                now = time.time()
+                if (self._file is None or self._file.tell() >= self.segment_bytes
+                        or now - self._segment_started >= self.segment_seconds):
+                    self._open_segment(now, records[0]["ts"])
+                self._file.write(b"".join(_encode(record) for record in records))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except Exception:
+                # Kept for the next attempt, ahead of the records buffered meanwhile
+                with self._buffer_lock:
+                    self._buffer = records + self._buffer
+                raise
+            self.written += len(records)
+            self.batches += 1
+            return len(records)
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Records arriving meanwhile join the batch
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self._write)
+            except Exception as e:
+                logger.error(f"Error writing audit records: {e}", exc_info=True)
+                self._wakeup.set()
+
+    async def flush(self):
+        """Writes the buffered records now"""
+        await asyncio.to_thread(self._write)
+
+    async def close(self):
+        """Stops the background writer after writing the buffered records"""
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        await self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def read(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+             event: Optional[str] = None, alert_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Reads written records in order, for compliance exports
+
+        Segments entirely outside the time window are not opened. Lines failing
+        their checksum (e.g. torn by a crash mid-write) are skipped with a warning.
+
+        Args:
+            since: Only records at or after this time
+            until: Only records before this time
+            event: Only records of this kind
+            alert_id: Only records of this alert
+
+        Yields:
+            Audit records
+        """
+        start = since.timestamp() if since else None
+        end = until.timestamp() if until else None
+        # A segment holds the records from its first timestamp (whole seconds in its name)
+        # up to the first timestamp of the next one
+        segments: List[Tuple[Path, int]] = [(path, int(_SEGMENT.match(path.name).group(2)))
+                                            for path in self.segments()]
+        for index, (path, first) in enumerate(segments):
+            if end is not None and first >= end:
+                break
+            next_first = segments[index + 1][1] if index + 1 < len(segments) else None
+            if start is not None and next_first is not None and next_first + 1 <= start:
+                continue
+            with open(path, "rb") as f:
+                for number, line in enumerate(f, 1):
+                    record = _decode(line)
+                    if record is None:
+                        logger.warning(f"Skipping corrupt audit record at {path.name}:{number}")
+                        continue
+                    if start is not None and record["ts"] < start:
+                        continue
+                    if end is not None and record["ts"] >= end:
+                        continue
+                    if event is not None and record["event"] != event:
+                        continue
+                    if alert_id is not None and record.get("alert_id") != alert_id:
+                        continue
+                    yield record
+
+    def stats(self) -> Dict[str, Any]:
+        return {"buffered": len(self._buffer), "written": self.written, "batches": self.batches,
+                "segments": len(self.segments())}
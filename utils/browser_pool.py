@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright
+from utils.priority_scheduler import PriorityScheduler
+
+logger = logging.getLogger(__name__)
+
+class BrowserPool:
+    """
+    Shares one Chromium instance between validators
+
+    Every page gets its own browser context, so cookies and storage do not leak
+    between alerts. The number of open pages is bounded globally and per target
+    host, which keeps us within the rate limits of the registers and exchanges.
+    Free slots go to interactive work before bulk work (see PriorityScheduler).
+    """
+
+    def __init__(self, max_pages: int = 4, per_host_limit: int = 2,
+                 launch_options: Optional[Dict[str, Any]] = None,
+                 priority_weights: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            max_pages: Maximum number of pages open at the same time
+            per_host_limit: Default maximum number of pages open on the same host
+            launch_options: Keyword arguments for chromium.launch
+            priority_weights: Share of page slots per priority class under contention
+        """
+        self.max_pages = max_pages
+        self.per_host_limit = per_host_limit
+        self.launch_options = launch_options or {}
+        self.priority_weights = priority_weights
+        self._slots = PriorityScheduler(max_pages, priority_weights)
+        self._host_limits: Dict[str, int] = {}
+        self._host_slots: Dict[str, PriorityScheduler] = {}
+        self._playwright = None
+        self._browser = None
+        self._launch_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        async with self._launch_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            if self._browser is None or not self._browser.is_connected():
+                self._browser = await self._playwright.chromium.launch(**self.launch_options)
+                logger.info("Launched pooled Chromium browser")
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def set_host_limit(self, host: str, limit: int):
+        """Overrides the number of concurrent pages allowed on a host"""
+        if self._host_limits.get(host) != limit:
+            self._host_limits[host] = limit
+            self._host_slots[host] = PriorityScheduler(limit, self.priority_weights)
+
+    def _host_slot(self, host: str) -> PriorityScheduler:
+        if host not in self._host_slots:
+            self._host_slots[host] = PriorityScheduler(
+                self._host_limits.get(host, self.per_host_limit), self.priority_weights
+            )
+        return self._host_slots[host]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns page slot usage and queue wait times per priority class"""
+        return {
+            "pages_open": self._slots.in_use,
+            "max_pages": self.max_pages,
+            "wait": self._slots.stats(),
+        }
+
+    @asynccontextmanager
+    async def page(self, url: str, **context_options):
+        """
+        Opens a page in a fresh context once a global and a per-host slot are available
+
+        Args:
+            url: The URL that will be loaded; its host selects the per-host limit
+            context_options: Keyword arguments for browser.new_context
+        """
+        host = urlparse(url).hostname or ""
+        async with self._host_slot(host).slot(), self._slots.slot():
+            await self.start()
+            context = await self._browser.new_context(**context_options)
+            try:
+                yield await context.new_page()
+            finally:
+                await context.close()
+
+@asynccontextmanager
+async def open_page(browser_pool: Optional[BrowserPool], url: str,
+                    launch_options: Optional[Dict[str, Any]] = None, **context_options):
+    """
+    Opens a page from the pool, or in a dedicated browser when no pool is given
+
+    Args:
+        browser_pool: Shared pool, or None to launch a browser just for this page
+        url: The URL that will be loaded
+        launch_options: Keyword arguments for chromium.launch (dedicated browser only)
+        context_options: Keyword arguments for browser.new_context
+    """
+    if browser_pool is not None:
+        async with browser_pool.page(url, **context_options) as page:
+            yield page
+        return
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(**(launch_options or {}))
+        try:
+            context = await browser.new_context(**context_options)
+            yield await context.new_page()
+        finally:
+            await browser.close()
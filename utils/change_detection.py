@@ -0,0 +1,326 @@
+import asyncio
+import base64
+import hashlib
+import html
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from utils.page_capture import PageCapture
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT,
+    dom_hash TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    capture TEXT,
+    verifiable INTEGER NOT NULL DEFAULT 1,
+    checked_at REAL NOT NULL,
+    loaded_at REAL NOT NULL
+);
+"""
+
+# fetch(url, headers) -> (status, response headers, body)
+Fetch = Callable[[str, Dict[str, str]], Awaitable[Tuple[int, Dict[str, str], bytes]]]
+
+def fingerprint(value: Any) -> str:
+    """SHA-256 of text, bytes or a JSON-serializable value"""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    elif not isinstance(value, bytes):
+        value = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(value).hexdigest()
+
+def mentions(body: bytes, values: Sequence[str]) -> bool:
+    """Whether every value appears in an HTTP body, ignoring case, entities and whitespace"""
+    text = " ".join(html.unescape(body.decode("utf-8", errors="replace")).lower().split())
+    wanted = [" ".join(str(value).lower().split()) for value in values]
+    return bool(wanted) and all(value and value in text for value in wanted)
+
+def _dump_capture(capture: PageCapture) -> str:
+    data = capture.model_dump()
+    for image in data["images"]:
+        image["data"] = base64.b64encode(image["data"]).decode("ascii")
+    return json.dumps(data, default=str)
+
+def _load_capture(text: str) -> PageCapture:
+    data = json.loads(text)
+    for image in data["images"]:
+        image["data"] = base64.b64decode(image["data"])
+    return PageCapture(**data)
+
+class Probe(BaseModel):
+    """Result of the cheap HTTP check of a source URL"""
+    not_modified: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+    body: Optional[bytes] = None
+
+class SourceState(BaseModel):
+    """What a validator last extracted from a source URL, with the fingerprints to compare against"""
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+    dom_hash: str
+    data_hash: str
+    outcome: Any
+    capture: Optional[PageCapture] = None
+    verifiable: bool = True
+    checked_at: datetime
+    loaded_at: datetime
+
+async def _aiohttp_fetch(url: str, headers: Dict[str, str], timeout: float) -> Tuple[int, Dict[str, str], bytes]:
+    import aiohttp
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async with session.get(url, headers=headers) as response:
+            body = await response.read() if response.status == 200 else b""
+            return response.status, dict(response.headers), body
+
+class ChangeDetector:
+    """
+    Fingerprints of validator sources, so unchanged pages are neither loaded nor captured again
+
+    For every source URL it keeps the extracted data, a hash of the DOM region
+    the data was read from, the capture taken of it and the HTTP validators of
+    the page. Re-verification of a known URL first makes a cheap HTTP request:
+    a conditional GET (If-None-Match / If-Modified-Since) answered with 304,
+    or for sites without validators a plain GET whose body hashes the same as
+    before, means the stored outcome and capture are reused without opening a
+    browser page. Otherwise the page is loaded and its data extracted; the
+    screenshot is only taken again when the data or the DOM region changed.
+
+    The HTTP response only vouches for the data when the values it was read
+    from appear in the body; a client-rendered page fills them in later, so it
+    is marked as not verifiable over HTTP, no cheap request is made for it and
+    it is always loaded. A page loaded longer than max_age ago is loaded and
+    captured again regardless, and its HTTP body checked once more.
+    """
+
+    def __init__(self, db_path: str, fetch: Optional[Fetch] = None, timeout: float = 10.0,
+                 max_age: float = 24 * 3600):
+        """
+        Args:
+            db_path: SQLite database file
+            fetch: HTTP client for the cheap check (defaults to aiohttp)
+            timeout: Timeout of the cheap check, in seconds
+            max_age: Seconds after which a page is loaded and captured again even if unchanged
+        """
+        self._fetch = fetch or (lambda url, headers: _aiohttp_fetch(url, headers, timeout))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Probes of pages about to be loaded, saved with the state once the page was checked
+        self._probes: Dict[str, Probe] = {}
+        self.max_age = max_age
+        self.revalidations = 0
+        self.expired = 0
+        self.unverifiable = 0
+        self.not_modified = 0
+        self.body_unchanged = 0
+        self.captures_reused = 0
+        self.captures_taken = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, url: str) -> Optional[SourceState]:
+        """Returns the stored state of a source URL, or None"""
+        rows = self._query("SELECT * FROM sources WHERE url = ?", (url,))
+        if not rows:
+            return None
+        row = dict(rows[0])
+        row["outcome"] = json.loads(row["outcome"])
+        row["capture"] = _load_capture(row["capture"]) if row["capture"] else None
+        row["verifiable"] = bool(row["verifiable"])
+        row["checked_at"] = datetime.fromtimestamp(row["checked_at"])
+        row["loaded_at"] = datetime.fromtimestamp(row["loaded_at"])
+        return SourceState(**row)
+
+    def _expired(self, state: SourceState) -> bool:
+        return time.time() - state.loaded_at.timestamp() > self.max_age
+
+    async def probe(self, url: str, state: Optional[SourceState] = None) -> Optional[Probe]:
+        """
+        Makes the cheap HTTP check of a URL
+
+        Args:
+            url: The source URL
+            state: Its stored state, whose validators make the request conditional
+
+        Returns:
+            The probe, or None when the request failed
+        """
+        headers = {}
+        if state is not None and state.etag:
+            headers["If-None-Match"] = state.etag
+        if state is not None and state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+        try:
+            status, response_headers, body = await self._fetch(url, headers)
+        except Exception as e:
+            logger.warning(f"Cheap check of {url} failed: {e}")
+            return None
+        response_headers = {key.lower(): value for key, value in response_headers.items()}
+        if status == 304:
+            return Probe(not_modified=True, etag=response_headers.get("etag", state.etag if state else None),
+                         last_modified=response_headers.get("last-modified", state.last_modified if state else None))
+        if status != 200:
+            return None
+        return Probe(not_modified=False, etag=response_headers.get("etag"),
+                     last_modified=response_headers.get("last-modified"), body_hash=fingerprint(body), body=body)
+
+    async def revalidate(self, url: str, need_capture: bool = False) -> Optional[SourceState]:
+        """
+        Checks cheaply whether a known source is unchanged
+
+        Args:
+            url: The source URL
+            need_capture: Whether the caller needs the stored capture to reuse it
+
+        Returns:
+            The stored state when the page is unchanged, or None when it has to be loaded
+        """
+        state = await asyncio.to_thread(self.get, url)
+        if state is not None and need_capture and state.capture is None:
+            state = None
+        expired = state is not None and self._expired(state)
+        if state is not None and not expired and not state.verifiable:
+            # Its HTTP body does not hold the data, so no response could vouch for it
+            self.revalidations += 1
+            self.unverifiable += 1
+            return None
+        # Unconditional for a page that has to be loaded anyway, so its body is checked and hashed
+        probe = await self.probe(url, None if expired else state)
+        if state is None or expired:
+            if expired:
+                self.revalidations += 1
+                self.expired += 1
+                logger.info(f"{url} was last loaded at {state.loaded_at}; loading it again")
+            if probe is not None:
+                self._probes[url] = probe
+            return None
+        self.revalidations += 1
+        if probe is not None and probe.not_modified:
+            self.not_modified += 1
+        elif probe is not None and probe.body_hash is not None and probe.body_hash == state.body_hash:
+            self.body_unchanged += 1
+        else:
+            if probe is not None:
+                self._probes[url] = probe
+            return None
+        await asyncio.to_thread(self._touch, url, probe)
+        if need_capture:
+            self.captures_reused += 1
+        logger.info(f"{url} is unchanged since {state.checked_at}; reusing its outcome")
+        return state
+
+    def _touch(self, url: str, probe: Probe):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sources SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "checked_at = ? WHERE url = ?",
+                (probe.etag, probe.last_modified, time.time(), url),
+            )
+
+    async def capture(self, url: str, dom: str, outcome: Any,
+                      take_capture: Optional[Callable[[], Awaitable[PageCapture]]] = None,
+                      values: Sequence[str] = ()) -> Optional[PageCapture]:
+        """
+        Stores what a validator extracted from a loaded page, capturing it only if it changed
+
+        Args:
+            url: The source URL, as requested
+            dom: The DOM region the data was read from
+            outcome: The extracted data (JSON-serializable)
+            take_capture: Takes the screenshots of the page; None when no evidence is kept
+            values: Page text the data was read from; the cheap check is only trusted
+                for this URL when all of them appear in its HTTP body
+
+        Returns:
+            The new capture, the stored one when data and DOM region are unchanged, or None
+        """
+        state = await asyncio.to_thread(self.get, url)
+        probe = self._probes.pop(url, None)
+        dom_hash, data_hash = fingerprint(dom), fingerprint(outcome)
+        unchanged = (state is not None and not self._expired(state)
+                     and state.dom_hash == dom_hash and state.data_hash == data_hash)
+        capture = None
+        if take_capture is not None:
+            if unchanged and state.capture is not None:
+                capture = state.capture
+                self.captures_reused += 1
+                logger.info(f"Data and page region of {url} are unchanged; reusing the capture "
+                            f"from {capture.captured_at}")
+            else:
+                capture = await take_capture()
+                self.captures_taken += 1
+        elif unchanged:
+            capture = state.capture
+        # A body without the values, e.g. a client-rendered shell, says nothing about the data
+        verifiable = state.verifiable if state is not None else True
+        if probe is not None:
+            verifiable = probe.body is not None and mentions(probe.body, values)
+            if not verifiable:
+                logger.info(f"The HTTP response of {url} does not contain its data; it will be loaded without "
+                            f"a cheap check until it is older than {self.max_age:.0f}s")
+                probe = None
+        now = time.time()
+        row = (url, probe.etag if probe else None, probe.last_modified if probe else None,
+               probe.body_hash if probe else None, dom_hash, data_hash, json.dumps(outcome, default=str),
+               _dump_capture(capture) if capture is not None else None, int(verifiable), now, now)
+        await asyncio.to_thread(self._save, row)
+        return capture if take_capture is not None else None
+
+    def _save(self, row: Tuple):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (url, etag, last_modified, body_hash, dom_hash, data_hash, outcome, "
+                "capture, verifiable, checked_at, loaded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts of the cheap checks and captures, with the share of loads and captures skipped"""
+        skipped_loads = self.not_modified + self.body_unchanged
+        captures = self.captures_reused + self.captures_taken
+        return {
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "body_unchanged": self.body_unchanged,
+            "expired": self.expired,
+            "unverifiable": self.unverifiable,
+            "load_skip_rate": skipped_loads / self.revalidations if self.revalidations else 0.0,
+            "captures_reused": self.captures_reused,
+            "captures_taken": self.captures_taken,
+            "capture_skip_rate": self.captures_reused / captures if captures else 0.0,
+        }
+
+def default_detector() -> ChangeDetector:
+    """Source fingerprints shared by every verifier of a machine, at CHANGE_DETECTION_DB"""
+    path = os.getenv("CHANGE_DETECTION_DB", os.path.join("results", "source_fingerprints.db"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return ChangeDetector(path, timeout=float(os.getenv("CHANGE_DETECTION_TIMEOUT", "10")),
+                          max_age=float(os.getenv("CHANGE_DETECTION_MAX_AGE", str(24 * 3600))))
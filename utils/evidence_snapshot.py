@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+from utils.browser_pool import BrowserPool, open_page
+from utils.page_capture import CaptureProfile, capture_page
+from utils.pdf_renderer import PdfRenderer, create_pdf_with_evidence
+from utils.snapshot_store import PageSnapshot, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# Snapshot formats: the serialized DOM, or an MHTML archive that also holds styles and images
+DOM = "dom"
+MHTML = "mhtml"
+
+async def serialize_page(page, snapshot_format: str = MHTML) -> bytes:
+    """
+    Serializes a loaded page without rasterizing it
+
+    Args:
+        page: The loaded page
+        snapshot_format: MHTML (through the DevTools protocol) or DOM (the current HTML)
+    """
+    if snapshot_format == MHTML:
+        session = await page.context.new_cdp_session(page)
+        try:
+            result = await session.send("Page.captureSnapshot", {"format": "mhtml"})
+        finally:
+            await session.detach()
+        return result["data"].encode("utf-8")
+    return (await page.content()).encode("utf-8")
+
+async def create_page_snapshot(store: SnapshotStore, alert_id: str, url: str,
+                               snapshot_format: str = MHTML,
+                               browser_pool: Optional[BrowserPool] = None,
+                               metadata: Optional[Dict[str, Any]] = None) -> PageSnapshot:
+    """
+    Loads a page and stores its snapshot as evidence; nothing is rasterized or encoded
+
+    Args:
+        store: Where the snapshot is kept
+        alert_id: The alert the page is evidence for
+        url: The URL of the page
+        snapshot_format: MHTML or DOM
+        browser_pool: Shared browser pool; without one, a dedicated browser is launched
+        metadata: What was extracted from the page, e.g. the decision and its justification
+
+    Returns:
+        The stored PageSnapshot
+    """
+    async with open_page(browser_pool, url) as page:
+        await page.goto(url, wait_until="networkidle")
+        content = await serialize_page(page, snapshot_format)
+        title = await page.title()
+    return await asyncio.to_thread(store.save, alert_id, url, title, content, snapshot_format, metadata)
+
+async def _load_snapshot(page, snapshot: PageSnapshot, content: bytes, content_file: Path):
+    if snapshot.snapshot_format == MHTML:
+        content_file.write_bytes(content)
+        await page.goto(content_file.resolve().as_uri(), wait_until="load")
+        return
+    # Resolve relative stylesheets and images against the original page
+    html = content.decode("utf-8")
+    base = f'<base href="{snapshot.url}">'
+    html, count = re.subn(r"<head([^>]*)>", lambda m: f"<head{m.group(1)}>{base}", html, count=1, flags=re.I)
+    if not count:
+        html = base + html
+    await page.set_content(html, wait_until="load")
+
+async def render_snapshot(store: SnapshotStore, snapshot: PageSnapshot, output_format: str = "pdf",
+                          browser_pool: Optional[BrowserPool] = None,
+                          renderer: Optional[PdfRenderer] = None) -> Path:
+    """
+    Renders a stored snapshot to a PNG or PDF, reusing an earlier rendering if there is one
+
+    Args:
+        store: The store holding the snapshot
+        snapshot: The snapshot to render
+        output_format: "pdf" or "png"
+        browser_pool: Shared browser pool; without one, a dedicated browser is launched
+        renderer: Process pool for the PDF; without one, it is built in a worker thread
+
+    Returns:
+        Path of the rendered file
+    """
+    output_path = store.rendered_path(snapshot, output_format)
+    if output_path.exists():
+        return output_path
+
+    content = await asyncio.to_thread(store.content, snapshot)
+    # Renders of other formats of the snapshot may run at the same time: each loads its own copy
+    with tempfile.NamedTemporaryFile(dir=output_path.parent, prefix=f"{output_path.stem}-", suffix=".mhtml",
+                                     delete=False) as handle:
+        content_file = Path(handle.name)
+    profile = CaptureProfile.from_env()
+    if output_format == "png":
+        profile = profile.model_copy(update={"mode": "full", "image_format": "png"})
+    try:
+        async with open_page(browser_pool, snapshot.url) as page:
+            await _load_snapshot(page, snapshot, content, content_file)
+            capture = await capture_page(page, profile)
+    finally:
+        if content_file.exists():
+            content_file.unlink()
+
+    # Unique per render, as renders of the same output in other processes are not serialized
+    temp_path = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        if output_format == "png":
+            temp_path.write_bytes(capture.screenshot)
+        else:
+            pdf_args = dict(
+                title=snapshot.title,
+                url=snapshot.url,
+                screenshots=[image.data for image in capture.images],
+                captured_at=snapshot.captured_at,
+                output_path=str(temp_path),
+            )
+            if renderer is not None:
+                await renderer.render_evidence(**pdf_args)
+            else:
+                await asyncio.to_thread(create_pdf_with_evidence, **pdf_args)
+        os.replace(temp_path, output_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    logger.info(f"Rendered {output_format} evidence for alert {snapshot.alert_id} at {output_path}")
+    return output_path
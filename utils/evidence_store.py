@@ -0,0 +1,315 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    extension TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_unreferenced ON blobs (refcount, last_access);
+CREATE TABLE IF NOT EXISTS refs (
+    ref_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_alert ON refs (alert_id, created_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def content_key(*parts: bytes) -> str:
+    """Hashes several pieces of content into one key, e.g. a URL and its screenshots"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+class EvidenceStore:
+    """
+    Content-addressed evidence files, shared between alerts with reference counts
+
+    Each distinct piece of evidence is written once under its hash; alerts hold
+    references to it, so a repeated capture of an unchanged page costs no write.
+    Blobs no longer referenced by any alert are kept as a cache and evicted,
+    least recently used first, once the store grows beyond `max_bytes`.
+    Referenced evidence is never evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None):
+        """
+        Args:
+            root: Directory holding the blobs and the index database
+            max_bytes: Size above which unreferenced blobs are evicted (no limit when None)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, statements):
+        """Runs a callable against the connection inside a write transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def blob_path(self, digest: str, extension: str) -> Path:
+        """Sharded location of a blob, e.g. ab/cd/abcd...pdf"""
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{extension}"
+
+    @staticmethod
+    def _count(conn, name: str, amount: int):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    @classmethod
+    def _reference(cls, conn, alert_id: str, blob: sqlite3.Row, now: float):
+        conn.execute("INSERT INTO refs (alert_id, digest, created_at) VALUES (?, ?, ?)",
+                     (alert_id, blob["digest"], now))
+        conn.execute("UPDATE blobs SET refcount = refcount + 1, last_access = ? WHERE digest = ?",
+                     (now, blob["digest"]))
+        cls._count(conn, "logical_bytes", blob["size"])
+        cls._count(conn, "references", 1)
+
+    def add_ref(self, alert_id: str, digest: str) -> Optional[Path]:
+        """
+        References an existing blob from an alert
+
+        Returns:
+            Path of the blob, or None if no blob has this digest
+        """
+        def reference(conn):
+            blob = conn.execute("SELECT * FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if blob is None:
+                return None
+            self._reference(conn, alert_id, blob, time.time())
+            self._count(conn, "dedup_hits", 1)
+            return self.blob_path(digest, blob["extension"])
+
+        path = self._transaction(reference)
+        if path is not None:
+            logger.info(f"Evidence for alert {alert_id} deduplicated against {digest[:12]}")
+        return path
+
+    def put_file(self, alert_id: str, source_path: str, extension: str, digest: Optional[str] = None,
+                 created_at: Optional[float] = None) -> Path:
+        """
+        Moves a file into the store and references it from an alert
+
+        When a blob with the same digest exists, the file is discarded instead.
+
+        Args:
+            alert_id: The alert the evidence belongs to
+            source_path: File to store; it is moved or deleted
+            extension: File extension of the blob, e.g. ".pdf"
+            digest: Content key (defaults to the SHA-256 of the file)
+            created_at: When the evidence was taken (defaults to now)
+
+        Returns:
+            Path of the stored blob
+        """
+        if digest is None:
+            sha256 = hashlib.sha256()
+            with open(source_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+        size = os.path.getsize(source_path)
+        path = self.blob_path(digest, extension)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        def store(conn):
+            now = created_at or time.time()
+            blob = conn.execute("SELECT * FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if blob is not None:
+                self._reference(conn, alert_id, blob, now)
+                self._count(conn, "dedup_hits", 1)
+                return self.blob_path(digest, blob["extension"]), False
+            os.replace(source_path, path)
+            conn.execute(
+                "INSERT INTO blobs (digest, extension, size, refcount, created_at, last_access) "
+                "VALUES (?, ?, ?, 0, ?, ?)",
+                (digest, extension, size, now, now),
+            )
+            blob = conn.execute("SELECT * FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            self._reference(conn, alert_id, blob, now)
+            self._count(conn, "stored_bytes", size)
+            return path, True
+
+        stored_path, written = self._transaction(store)
+        if not written and os.path.exists(source_path):
+            os.remove(source_path)
+        if written:
+            self.evict()
+        return stored_path
+
+    def put_bytes(self, alert_id: str, data: bytes, extension: str, digest: Optional[str] = None) -> Path:
+        """Stores content from memory; see put_file"""
+        digest = digest or hashlib.sha256(data).hexdigest()
+        existing = self.add_ref(alert_id, digest)
+        if existing is not None:
+            return existing
+        temp_path = self.root / f".{uuid.uuid4().hex}.tmp"
+        temp_path.write_bytes(data)
+        return self.put_file(alert_id, str(temp_path), extension, digest)
+
+    def import_legacy(self, directory: str) -> int:
+        """
+        Moves evidence PDFs named {alert_id}_{YYYYmmdd}_{HHMMSS}.pdf from a flat directory into the store
+
+        Returns:
+            Number of files imported
+        """
+        imported = 0
+        for path in Path(directory).glob("*_*_*.pdf"):
+            alert_id = path.name.rsplit("_", 2)[0]
+            self.put_file(alert_id, str(path), ".pdf", created_at=path.stat().st_mtime)
+            imported += 1
+        if imported:
+            logger.info(f"Imported {imported} evidence files from {directory}")
+        return imported
+
+    def latest(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the most recent evidence of an alert
+
+        Returns:
+            Dict with digest, path, size and created_at, or None
+        """
+        rows = self._query(
+            "SELECT refs.digest, refs.created_at, blobs.extension, blobs.size FROM refs "
+            "JOIN blobs ON blobs.digest = refs.digest WHERE refs.alert_id = ? "
+            "ORDER BY refs.created_at DESC, refs.ref_id DESC LIMIT 1",
+            (alert_id,),
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), row["digest"])
+        ))
+        return {
+            "digest": row["digest"],
+            "path": self.blob_path(row["digest"], row["extension"]),
+            "size": row["size"],
+            "created_at": row["created_at"],
+        }
+
+    def release(self, alert_id: str) -> int:
+        """
+        Drops every reference an alert holds; blobs left unreferenced become evictable
+
+        Returns:
+            Number of references released
+        """
+        def release_refs(conn):
+            rows = conn.execute("SELECT digest, COUNT(*) AS n FROM refs WHERE alert_id = ? GROUP BY digest",
+                                (alert_id,)).fetchall()
+            for row in rows:
+                conn.execute("UPDATE blobs SET refcount = refcount - ? WHERE digest = ?", (row["n"], row["digest"]))
+            conn.execute("DELETE FROM refs WHERE alert_id = ?", (alert_id,))
+            return sum(row["n"] for row in rows)
+
+        released = self._transaction(release_refs)
+        self.evict()
+        return released
+
+    def evict(self) -> int:
+        """
+        Deletes unreferenced blobs, least recently used first, until the store fits max_bytes
+
+        Returns:
+            Number of blobs deleted
+        """
+        if self.max_bytes is None:
+            return 0
+
+        def evict_blobs(conn):
+            stored = conn.execute("SELECT COALESCE(SUM(size), 0) AS n FROM blobs").fetchone()["n"]
+            evicted = []
+            if stored <= self.max_bytes:
+                return evicted
+            candidates = conn.execute(
+                "SELECT digest, extension, size FROM blobs WHERE refcount <= 0 ORDER BY last_access"
+            ).fetchall()
+            for blob in candidates:
+                if stored <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM blobs WHERE digest = ?", (blob["digest"],))
+                self._count(conn, "evicted_bytes", blob["size"])
+                stored -= blob["size"]
+                # Deleted inside the transaction: a put_file of the same digest waits for it,
+                # so it never finds its freshly stored file removed
+                path = self.blob_path(blob["digest"], blob["extension"])
+                if path.exists():
+                    path.unlink()
+                evicted.append(path)
+            if stored > self.max_bytes:
+                logger.warning(f"Evidence store holds {stored} bytes of referenced evidence, "
+                               f"above its limit of {self.max_bytes}")
+            return evicted
+
+        evicted = self._transaction(evict_blobs)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} unreferenced evidence blobs")
+        return len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the bytes stored, the bytes referenced by alerts and the resulting dedup ratio"""
+        counters = {row["name"]: row["value"] for row in self._query("SELECT name, value FROM counters")}
+        blobs = self._query(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS bytes, "
+            "COALESCE(SUM(CASE WHEN refcount <= 0 THEN size ELSE 0 END), 0) AS unreferenced FROM blobs"
+        )[0]
+        logical = counters.get("logical_bytes", 0)
+        written = counters.get("stored_bytes", 0)
+        return {
+            "blobs": blobs["n"],
+            "storage_bytes": blobs["bytes"],
+            "unreferenced_bytes": blobs["unreferenced"],
+            "max_bytes": self.max_bytes,
+            "references": counters.get("references", 0),
+            "dedup_hits": counters.get("dedup_hits", 0),
+            "logical_bytes": logical,
+            "written_bytes": written,
+            "evicted_bytes": counters.get("evicted_bytes", 0),
+            "dedup_ratio": round(logical / written, 3) if written else 1.0,
+        }
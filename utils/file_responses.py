@@ -0,0 +1,88 @@
+import os
+import re
+from pathlib import Path
+from typing import Optional, Tuple, Union
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CHUNK_SIZE = 64 * 1024
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single byte range
+
+    Returns:
+        Inclusive (start, end), or None if the range is malformed or cannot be satisfied
+    """
+    match = _RANGE.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last n bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+def _read_range(path: Union[str, Path], start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def file_response(request: Request, path: Union[str, Path], media_type: str, etag: str) -> Response:
+    """
+    Serves a file with ETag revalidation and single byte-range requests
+
+    Args:
+        request: The incoming request (If-None-Match, Range and If-Range are honoured)
+        path: File to serve
+        media_type: Content type of the file
+        etag: Unquoted entity tag, e.g. the content hash of the file
+
+    Returns:
+        304 when the client already holds this version, 206 for a satisfiable
+        range, 416 for an unsatisfiable one, and the whole file otherwise
+    """
+    quoted = f'"{etag}"'
+    headers = {"ETag": quoted, "Accept-Ranges": "bytes", "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, quoted):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == quoted):
+        size = os.path.getsize(path)
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        headers.update({
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(end - start + 1),
+        })
+        return StreamingResponse(_read_range(path, start, end), status_code=206,
+                                 media_type=media_type, headers=headers)
+
+    return FileResponse(str(path), media_type=media_type, headers=headers)
@@ -0,0 +1,203 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+from PIL import Image
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# Capture modes: the element holding the data, the whole page, or both
+CLIP = "clip"
+FULL = "full"
+BOTH = "both"
+
+# Largest width or height PIL can write in each format; PNG has no practical limit
+MAX_DIMENSIONS = {"webp": 16383, "jpeg": 65500}
+_FALLBACKS = ["webp", "jpeg", "png"]
+
+class CaptureProfile(BaseModel):
+    """How evidence screenshots are taken and encoded"""
+    mode: str = FULL
+    image_format: str = "png"
+    quality: int = 80
+    max_width: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "CaptureProfile":
+        """
+        Reads CAPTURE_MODE (clip, full, both), CAPTURE_FORMAT (png, jpeg, webp),
+        CAPTURE_QUALITY (1-100, lossy formats only) and CAPTURE_MAX_WIDTH (pixels)
+        """
+        max_width = os.getenv("CAPTURE_MAX_WIDTH")
+        return cls(
+            mode=os.getenv("CAPTURE_MODE", FULL).lower(),
+            image_format=os.getenv("CAPTURE_FORMAT", "png").lower(),
+            quality=int(os.getenv("CAPTURE_QUALITY", "80")),
+            max_width=int(max_width) if max_width else None,
+        )
+
+class CapturedImage(BaseModel):
+    """One encoded screenshot with the cost of producing it"""
+    kind: str
+    data: bytes
+    image_format: str
+    width: int
+    height: int
+    capture_seconds: float
+    encode_seconds: float
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+class PageCapture(BaseModel):
+    """Screenshots and metadata of a page as a validator saw it"""
+    url: str
+    title: str
+    images: List[CapturedImage]
+    captured_at: datetime = Field(default_factory=datetime.now)
+
+    @property
+    def screenshot(self) -> bytes:
+        """The first image: the clipped element if one was captured, else the full page"""
+        return self.images[0].data
+
+def fitting_format(image_format: str, width: int, height: int) -> str:
+    """
+    Returns the format an image of this size is encoded in
+
+    The requested format when it can hold the image, else the next of webp,
+    jpeg and png that can; a full-page screenshot is easily taller than WebP allows.
+    """
+    candidates = _FALLBACKS[_FALLBACKS.index(image_format):] if image_format in _FALLBACKS else [image_format]
+    for candidate in candidates:
+        if max(width, height) <= MAX_DIMENSIONS.get(candidate, max(width, height)):
+            return candidate
+    return "png"
+
+def encode_image(png: bytes, image_format: str, quality: int,
+                 max_width: Optional[int]) -> Tuple[bytes, int, int, str]:
+    """
+    Re-encodes a PNG screenshot, downscaling it to max_width if it is wider
+
+    Returns:
+        Tuple of the encoded bytes, width, height and the format used (see fitting_format)
+    """
+    with Image.open(io.BytesIO(png)) as img:
+        if max_width and img.width > max_width:
+            img = img.resize((max_width, max(1, round(img.height * max_width / img.width))), Image.LANCZOS)
+        image_format = fitting_format(image_format, img.width, img.height)
+        if image_format == "jpeg" and img.mode != "RGB":
+            img = img.convert("RGB")
+        output = io.BytesIO()
+        if image_format == "png":
+            img.save(output, format="PNG", optimize=True)
+        else:
+            img.save(output, format=image_format.upper(), quality=quality)
+        return output.getvalue(), img.width, img.height, image_format
+
+async def _screenshot(target, kind: str, profile: CaptureProfile, **options) -> CapturedImage:
+    """Screenshots a page or element, letting the browser encode when no re-encoding is needed"""
+    native = profile.max_width is None and profile.image_format in ("png", "jpeg")
+    if native and profile.image_format == "jpeg":
+        options["quality"] = profile.quality
+    started = time.perf_counter()
+    data = await target.screenshot(type=profile.image_format if native else "png", **options)
+    captured = time.perf_counter()
+    image_format = profile.image_format
+    if native:
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+        encode_seconds = 0.0
+    else:
+        data, width, height, image_format = await asyncio.to_thread(
+            encode_image, data, profile.image_format, profile.quality, profile.max_width
+        )
+        encode_seconds = time.perf_counter() - captured
+    return CapturedImage(
+        kind=kind,
+        data=data,
+        image_format=image_format,
+        width=width,
+        height=height,
+        capture_seconds=captured - started,
+        encode_seconds=encode_seconds,
+    )
+
+async def capture_page(page, profile: Optional[CaptureProfile] = None, selector: Optional[str] = None) -> PageCapture:
+    """
+    Screenshots an already loaded page according to a capture profile
+
+    Args:
+        page: The loaded page
+        profile: Capture profile (defaults to the one configured in the environment)
+        selector: Element holding the data the evidence is about; used in clip and both modes.
+            When it is not given or not found, the full page is captured instead.
+
+    Returns:
+        PageCapture with the clipped element first, if any
+    """
+    profile = profile or CaptureProfile.from_env()
+    images = []
+    if profile.mode in (CLIP, BOTH) and selector:
+        element = await page.query_selector(selector)
+        if element is not None:
+            images.append(await _screenshot(element, CLIP, profile))
+    if profile.mode in (FULL, BOTH) or not images:
+        images.append(await _screenshot(page, FULL, profile, full_page=True))
+    for image in images:
+        logger.info(f"Captured {image.kind} screenshot of {page.url}: {image.width}x{image.height} "
+                    f"{image.image_format}, {image.size} bytes, capture {image.capture_seconds:.2f}s, "
+                    f"encode {image.encode_seconds:.2f}s")
+    return PageCapture(url=page.url, title=await page.title(), images=images)
+
+class CaptureStore:
+    """
+    Holds recent validator captures by URL so evidence PDFs reuse them
+
+    Without it, the evidence step navigates to a page a validator loaded moments
+    before. Entries expire after `ttl_seconds` and the least recently stored
+    ones are dropped beyond `max_entries`, which bounds the memory held by
+    screenshots.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl_seconds: float = 900):
+        """
+        Args:
+            max_entries: Maximum number of captures kept
+            ttl_seconds: Age after which a capture is no longer used as evidence
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._captures: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, capture: PageCapture, requested_url: Optional[str] = None):
+        """
+        Stores a capture under its final URL and, after redirects, the URL that was requested
+
+        Args:
+            capture: The captured page
+            requested_url: URL passed to page.goto, if different from the final URL
+        """
+        for url in {capture.url, requested_url or capture.url}:
+            self._captures.pop(url, None)
+            self._captures[url] = (time.monotonic(), capture)
+        while len(self._captures) > self.max_entries:
+            self._captures.popitem(last=False)
+
+    def get(self, url: str) -> Optional[PageCapture]:
+        """Returns a fresh capture of the URL, or None"""
+        entry = self._captures.get(url)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            self._captures.pop(url, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
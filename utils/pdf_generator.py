@@ -1,25 +1,36 @@
+import asyncio
 import logging
 from datetime import datetime
 import os
 from pathlib import Path
-from playwright.async_api import async_playwright
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
+from typing import Optional
 import base64
+from utils.browser_pool import BrowserPool, open_page
+from utils.page_capture import CaptureStore, capture_page
+from utils.pdf_renderer import PdfRenderer, create_pdf_with_evidence
+from utils.evidence_store import EvidenceStore, content_key
 
 logger = logging.getLogger(__name__)
 
-async def create_webpage_snapshot(url: str, output_path: str):
+async def create_webpage_snapshot(url: str, output_path: str, browser_pool: Optional[BrowserPool] = None,
+                                  capture_store: Optional[CaptureStore] = None,
+                                  renderer: Optional[PdfRenderer] = None,
+                                  evidence_store: Optional[EvidenceStore] = None,
+                                  alert_id: Optional[str] = None):
     """
     Creates a PDF snapshot of a webpage for evidence purposes
     
     Args:
         url: The URL of the webpage to snapshot
         output_path: Path where to save the PDF
+        browser_pool: Shared browser pool; without one, a dedicated browser is launched
+        capture_store: Recent validator captures; a page found there is not loaded again
+        renderer: Process pool rendering the PDF; without one, it is rendered in a worker thread
+        evidence_store: Content-addressed store; an identical capture is referenced instead of rendered again
+        alert_id: The alert the evidence belongs to (required with evidence_store)
     
     Returns:
-        Path to the saved PDF
+        Path to the saved PDF (inside the evidence store when one is given)
     """
     logger.info(f"Creating webpage snapshot for {url}")
     
@@ -27,34 +38,39 @@ async def create_webpage_snapshot(url: str, output_path: str):
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Take a screenshot of the webpage using Playwright
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            
-            # Navigate to the URL
-            await page.goto(url, wait_until="networkidle")
-            
-            # Take a screenshot
-            screenshot_path = f"{output_path}.png"
-            await page.screenshot(path=screenshot_path, full_page=True)
-            
-            # Get page title and content for additional context
-            title = await page.title()
-            
-            await browser.close()
+        # Reuse the screenshot a validator took of this page, if any
+        capture = capture_store.get(url) if capture_store is not None else None
+        if capture is None:
+            # Take a screenshot of the webpage using Playwright
+            async with open_page(browser_pool, url) as page:
+                # Navigate to the URL
+                await page.goto(url, wait_until="networkidle")
+                capture = await capture_page(page)
+        else:
+            logger.info(f"Reusing validator capture of {url} from {capture.captured_at}")
+        
+        # An unchanged page was already rendered for an earlier alert: just reference it
+        digest = None
+        if evidence_store is not None:
+            digest = content_key(url.encode("utf-8"), *(image.data for image in capture.images))
+            existing = await asyncio.to_thread(evidence_store.add_ref, alert_id, digest)
+            if existing is not None:
+                return str(existing)
         
         # Create a PDF with the screenshot and metadata
-        create_pdf_with_evidence(
-            title=title,
+        pdf_args = dict(
+            title=capture.title,
             url=url,
-            screenshot_path=screenshot_path,
+            screenshots=[image.data for image in capture.images],
+            captured_at=capture.captured_at,
             output_path=output_path
         )
-        
-        # Remove the temporary screenshot
-        if os.path.exists(screenshot_path):
-            os.remove(screenshot_path)
+        if renderer is not None:
+            await renderer.render_evidence(**pdf_args)
+        else:
+            await asyncio.to_thread(create_pdf_with_evidence, **pdf_args)
+        if evidence_store is not None:
+            output_path = str(await asyncio.to_thread(evidence_store.put_file, alert_id, output_path, ".pdf", digest))
         
         logger.info(f"Successfully created webpage snapshot at {output_path}")
         return output_path
@@ -62,43 +78,3 @@ async def create_webpage_snapshot(url: str, output_path: str):
     except Exception as e:
         logger.error(f"Error creating webpage snapshot: {e}", exc_info=True)
         raise
-
-def create_pdf_with_evidence(title: str, url: str, screenshot_path: str, output_path: str):
-    """
-    Creates a PDF with the screenshot and metadata
-    
-    Args:
-        title: The title of the webpage
-        url: The URL of the webpage
-        screenshot_path: Path to the screenshot
-        output_path: Path where to save the PDF
-    """
-    doc = SimpleDocTemplate(output_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Create the content for the PDF
-    content = []
-    
-    # Add title
-    content.append(Paragraph(f"Evidence: {title}", styles['Title']))
-    content.append(Spacer(1, 12))
-    
-    # Add metadata
-    content.append(Paragraph(f"URL: {url}", styles['Normal']))
-    content.append(Paragraph(f"Snapshot taken: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-    content.append(Spacer(1, 12))
-    
-    # Add the screenshot
-    if os.path.exists(screenshot_path):
-        img = Image(screenshot_path)
-        img.drawHeight = 450
-        img.drawWidth = 500
-        content.append(img)
-    
-    # Add footer with validation information
-    content.append(Spacer(1, 20))
-    content.append(Paragraph("This document serves as evidence for UBS Compliance purposes.", styles['Normal']))
-    content.append(Paragraph(f"Document ID: {os.path.basename(output_path)}", styles['Normal']))
-    
-    # Build the PDF
-    doc.build(content)
@@ -0,0 +1,222 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+
+logger = logging.getLogger(__name__)
+
+def create_pdf_with_evidence(title: str, url: str, output_path: str,
+                             screenshot_path: Optional[str] = None,
+                             screenshot: Optional[bytes] = None,
+                             captured_at: Optional[datetime] = None,
+                             screenshots: Optional[List[bytes]] = None):
+    """
+    Creates a PDF with the screenshot and metadata
+
+    Args:
+        title: The title of the webpage
+        url: The URL of the webpage
+        output_path: Path where to save the PDF
+        screenshot_path: Path to the screenshot
+        screenshot: Screenshot image bytes, used instead of screenshot_path
+        captured_at: When the screenshot was taken (defaults to now)
+        screenshots: Several screenshots (e.g. a clipped table and the full page), in order
+    """
+    doc = SimpleDocTemplate(output_path, pagesize=letter)
+    styles = getSampleStyleSheet()
+
+    # Create the content for the PDF
+    content = []
+
+    # Add title
+    # Paragraphs parse their text as markup, so page titles and URLs are escaped
+    content.append(Paragraph(f"Evidence: {escape(title)}", styles['Title']))
+    content.append(Spacer(1, 12))
+
+    # Add metadata
+    content.append(Paragraph(f"URL: {escape(url)}", styles['Normal']))
+    content.append(Paragraph(f"Snapshot taken: {(captured_at or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
+    content.append(Spacer(1, 12))
+
+    # Add the screenshots
+    images = list(screenshots or [])
+    if screenshot is not None:
+        images.insert(0, screenshot)
+    sources = [io.BytesIO(data) for data in images]
+    if not sources and screenshot_path and os.path.exists(screenshot_path):
+        sources.append(screenshot_path)
+    for source in sources:
+        img = Image(source)
+        # Short images such as a clipped table keep their aspect ratio; full pages are fitted to the box
+        img.drawWidth = 500
+        img.drawHeight = min(450, img.imageHeight * 500 / img.imageWidth) if img.imageWidth else 450
+        content.append(img)
+        content.append(Spacer(1, 12))
+
+    # Add footer with validation information
+    content.append(Spacer(1, 20))
+    content.append(Paragraph("This document serves as evidence for UBS Compliance purposes.", styles['Normal']))
+    content.append(Paragraph(f"Document ID: {os.path.basename(output_path)}", styles['Normal']))
+
+    # Build the PDF
+    doc.build(content)
+
+def create_job_report(title: str, entries: List[Dict[str, Any]], output_path: str):
+    """
+    Creates one consolidated PDF summarising every alert of a job
+
+    Args:
+        title: Report title
+        entries: One dict per alert with alert_id, is_true_positive, justification
+            and evidence_path, or alert_id and error for alerts that failed
+        output_path: Path where to save the PDF
+    """
+    doc = SimpleDocTemplate(output_path, pagesize=letter)
+    styles = getSampleStyleSheet()
+    cell = styles['BodyText']
+
+    true_positives = sum(1 for entry in entries if entry.get("is_true_positive"))
+    failed = sum(1 for entry in entries if entry.get("error"))
+    content = [
+        Paragraph(escape(title), styles['Title']),
+        Spacer(1, 12),
+        Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
+        Paragraph(f"Alerts: {len(entries)} - true positives: {true_positives}, "
+                  f"false positives: {len(entries) - true_positives - failed}, failed: {failed}", styles['Normal']),
+        Spacer(1, 12),
+    ]
+
+    rows = [["Alert", "Decision", "Justification", "Evidence"]]
+    for entry in entries:
+        if entry.get("error"):
+            decision, justification = "Failed", entry["error"]
+        else:
+            decision = "True positive" if entry.get("is_true_positive") else "False positive"
+            justification = entry.get("justification", "")
+        evidence = os.path.basename(entry.get("evidence_path") or "") or "-"
+        # Paragraphs parse their text as markup; justifications may contain "<", ">" or "&"
+        rows.append([Paragraph(escape(str(entry.get("alert_id", ""))), cell), decision,
+                     Paragraph(escape(str(justification)), cell), Paragraph(escape(evidence), cell)])
+
+    table = Table(rows, colWidths=[80, 75, 250, 125], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    content.append(table)
+
+    content.append(Spacer(1, 20))
+    content.append(Paragraph("This document serves as evidence for UBS Compliance purposes.", styles['Normal']))
+    content.append(Paragraph(f"Document ID: {os.path.basename(output_path)}", styles['Normal']))
+    doc.build(content)
+
+_RENDERERS = {
+    "evidence": create_pdf_with_evidence,
+    "report": create_job_report,
+}
+
+def _render(kind: str, kwargs: Dict[str, Any]) -> float:
+    """Runs in a pool process: renders one PDF and returns the time it took"""
+    started = time.perf_counter()
+    _RENDERERS[kind](**kwargs)
+    return time.perf_counter() - started
+
+class PdfRenderer:
+    """
+    Renders evidence PDFs in a pool of worker processes
+
+    Image decoding and compression in ReportLab are CPU-bound, so they run
+    outside the server process and never block the event loop. At most
+    `max_pending` renders are queued or running; further callers wait for a
+    place, which keeps memory bounded when alerts finish faster than PDFs.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32):
+        """
+        Args:
+            workers: Number of rendering processes
+            max_pending: Maximum renders queued or in progress
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self._places = asyncio.Semaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.rendered = 0
+        self.failed = 0
+        self.total_render_seconds = 0.0
+        self.max_render_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def _submit(self, kind: str, label: str, **kwargs) -> Dict[str, float]:
+        queued = time.perf_counter()
+        async with self._places:
+            waited = time.perf_counter() - queued
+            self.pending += 1
+            try:
+                render_seconds = await asyncio.get_running_loop().run_in_executor(
+                    self._pool(), _render, kind, kwargs
+                )
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.pending -= 1
+        self.rendered += 1
+        self.total_render_seconds += render_seconds
+        self.max_render_seconds = max(self.max_render_seconds, render_seconds)
+        self.total_wait_seconds += waited
+        logger.info(f"Rendered {label} in {render_seconds:.2f}s (waited {waited:.2f}s for a render slot)")
+        return {"wait_seconds": waited, "render_seconds": render_seconds}
+
+    async def render_evidence(self, **kwargs) -> Dict[str, float]:
+        """
+        Renders an evidence PDF; takes the arguments of create_pdf_with_evidence
+
+        Returns:
+            Seconds spent waiting for a render slot and rendering
+        """
+        return await self._submit("evidence", kwargs["output_path"], **kwargs)
+
+    async def render_report(self, title: str, entries: List[Dict[str, Any]], output_path: str) -> Dict[str, float]:
+        """
+        Renders a consolidated report for a batch of alerts (see create_job_report)
+
+        Returns:
+            Seconds spent waiting for a render slot and rendering
+        """
+        return await self._submit("report", output_path, title=title, entries=entries, output_path=output_path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns render counts, queue occupancy and timings"""
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "workers": self.workers,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "avg_render_seconds": self.total_render_seconds / self.rendered if self.rendered else 0.0,
+            "max_render_seconds": self.max_render_seconds,
+            "avg_wait_seconds": self.total_wait_seconds / self.rendered if self.rendered else 0.0,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class Stage:
+    """One step of a Pipeline: a handler run by `concurrency` workers, fed by a bounded queue"""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], concurrency: int = 1,
+                 queue_size: Optional[int] = None):
+        """
+        Args:
+            name: Name used in logs and statistics
+            handler: Coroutine function taking an item and returning the item for the next
+                stage; returning None ends the item's way through the pipeline
+            concurrency: Number of items handled at the same time
+            queue_size: Items waiting for this stage before upstream blocks (defaults to concurrency)
+        """
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size or concurrency)
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues
+
+    Every stage has its own width, so a slow step (rendering evidence, say)
+    does not hold the resources of a fast one (a browser page): as soon as a
+    stage hands an item on, it starts on the next one. When a downstream queue
+    is full, the stage waits, which bounds the items in flight. Per-stage
+    utilization, queue depth and the time spent blocked on a full downstream
+    queue show which width to change.
+    """
+
+    def __init__(self, stages: List[Stage], report_interval: Optional[float] = None):
+        """
+        Args:
+            stages: Stages in processing order
+            report_interval: Seconds between logged statistics (no periodic logging when None)
+        """
+        self.stages = stages
+        self.report_interval = report_interval
+        self._workers: List[asyncio.Task] = []
+        self._started: Optional[float] = None
+
+    def start(self):
+        if self._workers:
+            return
+        self._started = time.monotonic()
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.concurrency):
+                self._workers.append(asyncio.create_task(self._work(index)))
+        if self.report_interval:
+            self._workers.append(asyncio.create_task(self._report()))
+
+    async def put(self, item: Any):
+        """Feeds an item to the first stage; waits while its queue is full"""
+        self.start()
+        await self.stages[0].queue.put(item)
+
+    async def _work(self, index: int):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = await stage.queue.get()
+            stage.active += 1
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+                stage.processed += 1
+            except Exception as e:
+                stage.failed += 1
+                result = None
+                logger.error(f"Pipeline stage {stage.name} failed: {e}", exc_info=True)
+            finally:
+                stage.active -= 1
+                stage.busy_seconds += time.monotonic() - started
+            try:
+                if result is not None and downstream is not None:
+                    blocked = time.monotonic()
+                    await downstream.queue.put(result)
+                    stage.blocked_seconds += time.monotonic() - blocked
+            finally:
+                stage.queue.task_done()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.log_stats()
+
+    async def join(self):
+        """Waits until every item fed so far has left the last stage, then stops the workers"""
+        for stage in self.stages:
+            await stage.queue.join()
+        await self.stop()
+        self.log_stats()
+
+    async def stop(self):
+        """Stops the workers at once; items still queued or in progress are dropped"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns, per stage, its width, queue depth, counts, utilization and time blocked downstream"""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        stats = {}
+        for stage in self.stages:
+            handled = stage.processed + stage.failed
+            stats[stage.name] = {
+                "concurrency": stage.concurrency,
+                "queue_depth": stage.queue.qsize(),
+                "queue_size": stage.queue.maxsize,
+                "active": stage.active,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "utilization": round(stage.busy_seconds / (stage.concurrency * elapsed), 3) if elapsed else 0.0,
+                "avg_seconds": round(stage.busy_seconds / handled, 3) if handled else 0.0,
+                "blocked_seconds": round(stage.blocked_seconds, 3),
+            }
+        return stats
+
+    def log_stats(self):
+        for name, stage in self.stats().items():
+            logger.info(f"Stage {name}: {stage['active']}/{stage['concurrency']} busy, "
+                        f"queue {stage['queue_depth']}/{stage['queue_size']}, "
+                        f"utilization {stage['utilization']:.0%}, processed {stage['processed']}, "
+                        f"failed {stage['failed']}, blocked {stage['blocked_seconds']:.1f}s")
@@ -0,0 +1,137 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Dict, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+DEFAULT_WEIGHTS = {INTERACTIVE: 4, BULK: 1}
+
+# Priority class of the work running in the current task; set once per request or job
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar("current_priority", default=BULK)
+
+@contextmanager
+def priority(priority_class: str):
+    """Runs the enclosed code (and the tasks it creates) under the given priority class"""
+    token = current_priority.set(priority_class)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+class _WaitStats:
+    """Queue wait times of one priority class"""
+
+    def __init__(self, window: int = 1000):
+        self.served = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def record(self, wait: float):
+        self.served += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent.append(wait)
+
+    def summary(self, waiting: int) -> Dict[str, float]:
+        recent = sorted(self.recent)
+        return {
+            "waiting": waiting,
+            "served": self.served,
+            "avg_wait_seconds": self.total_wait / self.served if self.served else 0.0,
+            "p95_wait_seconds": recent[int(0.95 * (len(recent) - 1))] if recent else 0.0,
+            "max_wait_seconds": self.max_wait,
+        }
+
+class PriorityScheduler:
+    """
+    Counting semaphore that hands free slots to waiting work by priority class
+
+    When several classes are waiting, slots are shared by smooth weighted round
+    robin: with the default weights, interactive work receives four slots for
+    every one given to bulk work, so analysts' alerts overtake a running batch
+    while the batch still makes progress.
+    """
+
+    def __init__(self, capacity: int, weights: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            capacity: Number of slots
+            weights: Share of slots each priority class receives under contention
+        """
+        self.capacity = capacity
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.in_use = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in self.weights}
+        self._credit: Dict[str, int] = {name: 0 for name in self.weights}
+        self._stats: Dict[str, _WaitStats] = {name: _WaitStats() for name in self.weights}
+
+    def waiting(self, priority_class: Optional[str] = None) -> int:
+        if priority_class is not None:
+            return len(self._waiters[priority_class])
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, priority_class: Optional[str] = None):
+        """Waits for a slot; the class defaults to the priority of the current task"""
+        priority_class = priority_class or current_priority.get()
+        if priority_class not in self.weights:
+            raise ValueError(f"Unknown priority class: {priority_class}")
+        started = time.monotonic()
+        if self.in_use < self.capacity and not self.waiting():
+            self.in_use += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[priority_class].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before cancellation; pass it on
+                    self.release()
+                elif waiter in self._waiters[priority_class]:
+                    self._waiters[priority_class].remove(waiter)
+                raise
+        self._stats[priority_class].record(time.monotonic() - started)
+
+    def release(self):
+        """Frees a slot, handing it directly to the next waiter chosen by weight"""
+        self.in_use -= 1
+        while self.in_use < self.capacity:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if waiter.done():
+                # Cancelled before its task could remove it from the queue
+                continue
+            self.in_use += 1
+            waiter.set_result(None)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for waiters in self._waiters.values():
+            while waiters and waiters[0].done():
+                waiters.popleft()
+        waiting = [name for name, waiters in self._waiters.items() if waiters]
+        if not waiting:
+            return None
+        total = sum(self.weights[name] for name in waiting)
+        for name in waiting:
+            self._credit[name] += self.weights[name]
+        chosen = max(waiting, key=lambda name: self._credit[name])
+        self._credit[chosen] -= total
+        return self._waiters[chosen].popleft()
+
+    @asynccontextmanager
+    async def slot(self, priority_class: Optional[str] = None):
+        await self.acquire(priority_class)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns queue wait statistics per priority class"""
+        return {name: self._stats[name].summary(self.waiting(name)) for name in self.weights}
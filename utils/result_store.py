@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id TEXT NOT NULL,
+    isin TEXT NOT NULL,
+    country TEXT NOT NULL,
+    security_name TEXT,
+    decision TEXT NOT NULL,
+    justification TEXT,
+    evidence_path TEXT,
+    processed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_alert ON results (alert_id, processed_at);
+CREATE INDEX IF NOT EXISTS results_isin ON results (isin, processed_at);
+CREATE INDEX IF NOT EXISTS results_country ON results (country, decision, processed_at);
+CREATE INDEX IF NOT EXISTS results_decision ON results (decision, processed_at);
+CREATE INDEX IF NOT EXISTS results_processed_at ON results (processed_at);
+"""
+
+TRUE_POSITIVE = "True Positive"
+FALSE_POSITIVE = "False Positive"
+GROUP_BY = {
+    "decision": "decision",
+    "country": "country",
+    "isin": "isin",
+    "day": "date(processed_at, 'unixepoch', 'localtime')",
+}
+
+def normalize_decision(decision: str) -> str:
+    """Accepts e.g. "false_positive" or "FALSE POSITIVE" for "False Positive\""""
+    return decision.replace("_", " ").strip().title()
+
+class ResultStore:
+    """
+    Alert decisions in a local SQLite database, indexed for filtered lookups
+
+    record() only appends to an in-memory buffer, so it costs a request next
+    to nothing; a background task writes the buffer in one transaction once it
+    holds `batch_size` results or `flush_interval` seconds after the first
+    buffered result.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 200, flush_interval: float = 1.0):
+        """
+        Args:
+            db_path: SQLite database file
+            batch_size: Buffered results that trigger a write
+            flush_interval: Longest time a result stays buffered, in seconds
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._buffer: List[Tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+
+    def _transaction(self, statements):
+        """Runs a callable against the connection inside a write transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def start(self):
+        if self._writer is None:
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def record(self, alert_id: str, isin: str, is_true_positive: bool, justification: Optional[str] = None,
+               security_name: Optional[str] = None, evidence_path: Optional[str] = None,
+               processed_at: Optional[float] = None):
+        """Buffers the decision on an alert; it is written by the background task"""
+        row = (alert_id, isin, isin[:2].upper(), security_name,
+               TRUE_POSITIVE if is_true_positive else FALSE_POSITIVE,
+               justification, evidence_path, processed_at or time.time())
+        with self._buffer_lock:
+            self._buffer.append(row)
+            # The first buffered result starts the flush interval, a full batch ends it
+            wake = len(self._buffer) == 1 or len(self._buffer) >= self.batch_size
+        if wake and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _write(self) -> int:
+        """Writes everything buffered as one batch"""
+        with self._write_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            def insert(conn):
+                conn.executemany(
+                    "INSERT INTO results (alert_id, isin, country, security_name, decision, justification, "
+                    "evidence_path, processed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+            try:
+                self._transaction(insert)
+            except Exception:
+                # Kept for the next attempt, ahead of the results buffered meanwhile
+                with self._buffer_lock:
+                    self._buffer = rows + self._buffer
+                raise
+            self.written += len(rows)
+            self.batches += 1
+            return len(rows)
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Waits for a full batch, or at most flush_interval, before writing
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._buffer) < self.batch_size and time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), deadline - time.monotonic())
+                    self._wakeup.clear()
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self._write)
+            except Exception as e:
+                logger.error(f"Error writing results: {e}", exc_info=True)
+                await asyncio.sleep(self.flush_interval)
+                self._wakeup.set()
+
+    async def flush(self):
+        """Writes the buffered results now"""
+        await asyncio.to_thread(self._write)
+
+    async def close(self):
+        """Stops the background task after writing the buffered results"""
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        await self.flush()
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _filters(alert_id: Optional[str] = None, isin: Optional[str] = None, country: Optional[str] = None,
+                 decision: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        for column, value in (("alert_id", alert_id), ("isin", isin),
+                              ("country", country.upper() if country else None),
+                              ("decision", normalize_decision(decision) if decision else None)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("processed_at >= ?")
+            params.append(since.timestamp())
+        if until is not None:
+            clauses.append("processed_at < ?")
+            params.append(until.timestamp())
+        return clauses, params
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["processed_at"] = datetime.fromtimestamp(record["processed_at"]).isoformat()
+        return record
+
+    def query(self, limit: int = 100, before: Optional[int] = None, **filters) -> Dict[str, Any]:
+        """
+        Returns results matching the filters, newest first, a page at a time
+
+        Args:
+            limit: Results per page
+            before: Cursor from the previous page (the "next" value it returned)
+            **filters: alert_id, isin, country (ISIN prefix), decision, since, until
+
+        Returns:
+            {"results": [...], "next": cursor of the following page, or None on the last page}
+        """
+        clauses, params = self._filters(**filters)
+        if before is not None:
+            clauses.append("result_id < ?")
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(f"SELECT * FROM results {where} ORDER BY result_id DESC LIMIT ?", (*params, limit + 1))
+        page = [self._to_dict(row) for row in rows[:limit]]
+        return {"results": page, "next": page[-1]["result_id"] if len(rows) > limit else None}
+
+    def counts(self, group_by: str = "decision", **filters) -> Dict[str, Any]:
+        """
+        Counts the results matching the filters per decision, country, ISIN or day
+
+        Raises:
+            ValueError: For an unknown group_by
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        clauses, params = self._filters(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        key = GROUP_BY[group_by]
+        rows = self._query(f"SELECT {key} AS key, COUNT(*) AS count FROM results {where} "
+                           f"GROUP BY {key} ORDER BY count DESC, key", params)
+        counts = [{group_by: row["key"], "count": row["count"]} for row in rows]
+        return {"group_by": group_by, "counts": counts, "total": sum(item["count"] for item in counts)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"buffered": len(self._buffer), "written": self.written, "batches": self.batches}
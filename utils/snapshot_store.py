@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id TEXT NOT NULL,
+    captured_at TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_alert ON records (alert_id, captured_at);
+"""
+
+class PageSnapshot(BaseModel):
+    """A page as loaded during verification, kept for rendering evidence later"""
+    alert_id: str
+    url: str
+    title: str
+    snapshot_format: str
+    content_hash: str
+    content_path: str
+    captured_at: datetime = Field(default_factory=datetime.now)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+class SnapshotStore:
+    """
+    Stores page snapshots by content hash and records which alert each belongs to
+
+    Snapshot content is gzip-compressed and written once per distinct hash;
+    a record per alert in a SQLite index points to it together with the
+    extraction metadata, so finding an alert's latest snapshot is one indexed
+    lookup. Content and rendered PDFs and PNGs are sharded by hash prefix
+    (ab/cd/...) to keep directories small.
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Directory holding snapshot content, the index and rendered evidence
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _shard(self, content_hash: str) -> Path:
+        shard = self.root / content_hash[:2] / content_hash[2:4]
+        shard.mkdir(parents=True, exist_ok=True)
+        return shard
+
+    def save(self, alert_id: str, url: str, title: str, content: bytes,
+             snapshot_format: str, metadata: Optional[Dict[str, Any]] = None) -> PageSnapshot:
+        """
+        Stores a snapshot for an alert
+
+        Args:
+            alert_id: The alert the snapshot is evidence for
+            url: URL of the page
+            title: Title of the page
+            content: Serialized page (see serialize_page)
+            snapshot_format: DOM or MHTML
+            metadata: What was extracted from the page, e.g. the decision and its justification
+
+        Returns:
+            The stored PageSnapshot
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        content_path = self._shard(content_hash) / f"{content_hash}.{snapshot_format}.gz"
+        if not content_path.exists():
+            # Unique per save: concurrent saves of the same content must not share a temporary file
+            temp_path = content_path.with_name(f".{uuid.uuid4().hex}.tmp")
+            try:
+                with gzip.open(temp_path, "wb", compresslevel=6) as f:
+                    f.write(content)
+                os.replace(temp_path, content_path)
+            finally:
+                if temp_path.exists():
+                    temp_path.unlink()
+
+        snapshot = PageSnapshot(
+            alert_id=alert_id,
+            url=url,
+            title=title,
+            snapshot_format=snapshot_format,
+            content_hash=content_hash,
+            content_path=str(content_path),
+            metadata=metadata or {},
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO records (alert_id, captured_at, record) VALUES (?, ?, ?)",
+                (alert_id, snapshot.captured_at.isoformat(), snapshot.model_dump_json()),
+            )
+        logger.info(f"Stored {snapshot_format} snapshot of {url} for alert {alert_id} ({len(content)} bytes)")
+        return snapshot
+
+    def latest(self, alert_id: str) -> Optional[PageSnapshot]:
+        """Returns the most recent snapshot of an alert, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM records WHERE alert_id = ? ORDER BY captured_at DESC, record_id DESC LIMIT 1",
+                (alert_id,),
+            ).fetchone()
+        return PageSnapshot.model_validate_json(row[0]) if row else None
+
+    def content(self, snapshot: PageSnapshot) -> bytes:
+        with gzip.open(snapshot.content_path, "rb") as f:
+            return f.read()
+
+    def rendered_path(self, snapshot: PageSnapshot, extension: str) -> Path:
+        """Where the rendered evidence of a snapshot is cached"""
+        return self._shard(snapshot.content_hash) / f"{snapshot.alert_id}_{snapshot.content_hash[:16]}.{extension}"
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+MARKET = "market"
+SHARES = "shares"
+
+# One row per change of an outcome; the primary key is the B-tree as-of lookups descend
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    kind TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    valid_from REAL NOT NULL,
+    confirmed_at REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    source_url TEXT,
+    PRIMARY KEY (kind, subject, valid_from)
+) WITHOUT ROWID;
+"""
+
+class Observation(BaseModel):
+    """A verification outcome, as first seen at valid_from and last confirmed at confirmed_at"""
+    kind: str
+    subject: str
+    outcome: Dict[str, Any]
+    source_url: Optional[str] = None
+    valid_from: datetime
+    confirmed_at: datetime
+
+def _timestamp(when: Union[datetime, float, None]) -> float:
+    if when is None:
+        return time.time()
+    return when.timestamp() if isinstance(when, datetime) else when
+
+class VerificationHistory:
+    """
+    Time series of verification outcomes per subject (an ISIN, or a company for register checks)
+
+    Only changes are stored: a check that finds the same outcome as the one in
+    force only moves its confirmed_at forward. as_of() finds the outcome in
+    force at a given time with one descent of the primary-key B-tree, i.e. in
+    O(log n), so historical alerts can be answered without loading any page.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, statements):
+        """Runs a callable against the connection inside a write transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _as_of(conn, kind: str, subject: str, at: float) -> Optional[sqlite3.Row]:
+        return conn.execute(
+            "SELECT * FROM observations WHERE kind = ? AND subject = ? AND valid_from <= ? "
+            "ORDER BY valid_from DESC LIMIT 1",
+            (kind, subject, at),
+        ).fetchone()
+
+    @staticmethod
+    def _observation(row: sqlite3.Row) -> Observation:
+        return Observation(
+            kind=row["kind"],
+            subject=row["subject"],
+            outcome=json.loads(row["outcome"]),
+            source_url=row["source_url"],
+            valid_from=datetime.fromtimestamp(row["valid_from"]),
+            confirmed_at=datetime.fromtimestamp(row["confirmed_at"]),
+        )
+
+    def record(self, kind: str, subject: str, outcome: Dict[str, Any], source_url: Optional[str] = None,
+               at: Union[datetime, float, None] = None) -> bool:
+        """
+        Records the outcome of a check
+
+        Args:
+            kind: MARKET or SHARES
+            subject: What was checked, e.g. the ISIN
+            outcome: JSON-serializable result of the check
+            source_url: Page the outcome was read from
+            at: Time of the check (defaults to now)
+
+        Returns:
+            True if the outcome differs from the one in force at that time and was stored
+            (a check recorded out of order may also move the start of the outcome after it)
+        """
+        at = _timestamp(at)
+        encoded = json.dumps(outcome, sort_keys=True, separators=(",", ":"))
+
+        def store(conn):
+            current = self._as_of(conn, kind, subject, at)
+            if current is not None and current["outcome"] == encoded:
+                conn.execute(
+                    "UPDATE observations SET confirmed_at = MAX(confirmed_at, ?), source_url = ? "
+                    "WHERE kind = ? AND subject = ? AND valid_from = ?",
+                    (at, source_url or current["source_url"], kind, subject, current["valid_from"]),
+                )
+                return False
+            following = conn.execute(
+                "SELECT valid_from, outcome FROM observations WHERE kind = ? AND subject = ? AND valid_from > ? "
+                "ORDER BY valid_from LIMIT 1",
+                (kind, subject, at),
+            ).fetchone()
+            if following is not None and following["outcome"] == encoded:
+                # A check recorded late extends the identical outcome that follows it back in time
+                conn.execute(
+                    "UPDATE observations SET valid_from = ?, source_url = COALESCE(source_url, ?) "
+                    "WHERE kind = ? AND subject = ? AND valid_from = ?",
+                    (at, source_url, kind, subject, following["valid_from"]),
+                )
+                return True
+            conn.execute(
+                "INSERT OR REPLACE INTO observations (kind, subject, valid_from, confirmed_at, outcome, source_url) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, subject, at, at, encoded, source_url),
+            )
+            return True
+
+        changed = self._transaction(store)
+        if changed:
+            logger.info(f"New {kind} outcome for {subject}: {encoded}")
+        return changed
+
+    def as_of(self, kind: str, subject: str, when: Union[datetime, float, None] = None) -> Optional[Observation]:
+        """
+        Returns the outcome in force at a time
+
+        Args:
+            kind: MARKET or SHARES
+            subject: What was checked, e.g. the ISIN
+            when: Point in time (defaults to now)
+
+        Returns:
+            The latest outcome first seen at or before `when`, or None if the subject had
+            not been checked by then
+        """
+        with self._lock:
+            row = self._as_of(self._conn, kind, subject, _timestamp(when))
+        return self._observation(row) if row is not None else None
+
+    def timeline(self, kind: str, subject: str) -> List[Observation]:
+        """Every recorded change of a subject's outcome, oldest first"""
+        rows = self._query("SELECT * FROM observations WHERE kind = ? AND subject = ? ORDER BY valid_from",
+                           (kind, subject))
+        return [self._observation(row) for row in rows]
+
+def default_history() -> VerificationHistory:
+    """History shared by every verifier of a machine, at VERIFICATION_HISTORY_DB"""
+    path = os.getenv("VERIFICATION_HISTORY_DB", os.path.join("results", "verification_history.db"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return VerificationHistory(path)
@@ -0,0 +1,146 @@
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+from market_validators.market_validator import MarketTypeValidator
+from share_validators.outstanding_share_validator import OutstandingShareValidator
+from models.alert_models import Alert, AlertProcessingResult
+from utils.browser_pool import BrowserPool
+from utils.change_detection import ChangeDetector
+from utils.page_capture import CaptureStore
+from utils.pdf_generator import create_webpage_snapshot
+from utils.verification_history import VerificationHistory
+
+logger = logging.getLogger(__name__)
+
+class AlertVerifier:
+    """Verifies an alert directly with the market and share validators, without the LLM agents"""
+
+    def __init__(self, browser_pool: Optional[BrowserPool] = None, evidence_dir: Optional[str] = None,
+                 history: Optional[VerificationHistory] = None, historical_after: float = 86400,
+                 change_detector: Optional[ChangeDetector] = None):
+        """
+        Args:
+            browser_pool: Shared browser pool for the validators and the evidence step
+            evidence_dir: When given, an evidence PDF of the source page is written here for every alert
+            history: Verification history the validators record to and answer historical alerts from
+            historical_after: Age in seconds from which an alert is checked as of the time it was received
+            change_detector: Source fingerprints; unchanged market pages are neither loaded nor captured again
+        """
+        self.browser_pool = browser_pool
+        self.evidence_dir = evidence_dir
+        self.historical_after = historical_after
+        self.capture_store = CaptureStore() if evidence_dir else None
+        self.market_validator = MarketTypeValidator(browser_pool, self.capture_store, history, change_detector)
+        self.share_validator = OutstandingShareValidator(browser_pool, self.capture_store, history)
+
+    def _as_of(self, alert: Alert) -> Optional[datetime]:
+        """Time a historical alert is checked as of, or None for a recent one"""
+        if (datetime.now() - alert.received_timestamp).total_seconds() >= self.historical_after:
+            return alert.received_timestamp
+        return None
+
+    async def verify(self, alert: Alert) -> AlertProcessingResult:
+        """
+        Verifies an alert and, when an evidence directory is set, writes its evidence PDF
+
+        The PDF is built from the screenshot the validator took of the source page,
+        so the page is loaded once per alert. Pipelined callers run the two steps,
+        check and write_evidence, as separate stages.
+
+        Args:
+            alert: The alert to verify
+
+        Returns:
+            AlertProcessingResult with the decision, evidence URL and evidence path
+        """
+        return await self.write_evidence(alert, await self.check(alert))
+
+    async def check(self, alert: Alert) -> AlertProcessingResult:
+        """Navigates to the sources, extracts the data and captures the pages; decides the alert"""
+        return await self._decide(alert)
+
+    async def write_evidence(self, alert: Alert, result: AlertProcessingResult) -> AlertProcessingResult:
+        """
+        Writes the evidence PDF of a checked alert from its captured page, without a browser page
+
+        Args:
+            alert: The alert
+            result: The result of check
+
+        Returns:
+            The result, with evidence_path set when a PDF was written
+        """
+        if self.evidence_dir and result.evidence_url:
+            # The page as it is today is no evidence of a historical alert; only a capture
+            # taken by a live check is used
+            if self._as_of(alert) is not None and self.capture_store.get(result.evidence_url) is None:
+                logger.info(f"No evidence written for historical alert {alert.alert_id}: answered from history")
+                return result
+            pdf_path = os.path.join(
+                self.evidence_dir, f"{alert.alert_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            )
+            try:
+                await create_webpage_snapshot(result.evidence_url, pdf_path, self.browser_pool, self.capture_store)
+                result.evidence_path = pdf_path
+            except Exception as e:
+                logger.error(f"Error creating evidence for alert {alert.alert_id}: {e}")
+        return result
+
+    async def _decide(self, alert: Alert) -> AlertProcessingResult:
+        """
+        Checks the market type and, when the system holds a share count, the outstanding shares
+
+        An alert is a true positive when the security trades on a regulated market
+        and the share count in the system matches the commercial register. Alerts
+        older than historical_after are checked as of the time they were received.
+
+        Args:
+            alert: The alert to verify
+
+        Returns:
+            AlertProcessingResult with the decision and the URL used as evidence
+        """
+        country_code = alert.isin[:2]
+        as_of = self._as_of(alert)
+        is_regulated, market_type, source_url = await self.market_validator.check_market_type(alert.isin, as_of)
+
+        if is_regulated is None:
+            return AlertProcessingResult(
+                alert_id=alert.alert_id,
+                is_true_positive=False,
+                justification=f"Inconclusive: could not determine market type ({market_type})",
+                evidence_url=source_url,
+            )
+        if not is_regulated:
+            return AlertProcessingResult(
+                alert_id=alert.alert_id,
+                is_true_positive=False,
+                justification=f"Security is traded on an unregulated market: {market_type}",
+                evidence_url=source_url,
+            )
+
+        justification = f"Security is traded on a regulated market: {market_type}"
+        if alert.outstanding_shares_system:
+            is_valid, actual_shares, register_url = await self.share_validator.validate_outstanding_shares(
+                country_code, alert.security_name, alert.isin, alert.outstanding_shares_system, as_of
+            )
+            if is_valid is False and actual_shares is not None:
+                return AlertProcessingResult(
+                    alert_id=alert.alert_id,
+                    is_true_positive=False,
+                    justification=(f"Outstanding shares mismatch: system={alert.outstanding_shares_system}, "
+                                   f"register={actual_shares}"),
+                    evidence_url=register_url or source_url,
+                )
+            if is_valid:
+                justification += f"; outstanding shares confirmed by the register ({actual_shares})"
+            else:
+                justification += "; outstanding shares could not be confirmed"
+
+        return AlertProcessingResult(
+            alert_id=alert.alert_id,
+            is_true_positive=True,
+            justification=justification,
+            evidence_url=source_url,
+        )
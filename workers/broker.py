@@ -0,0 +1,98 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+class Broker(ABC):
+    """
+    Transport between a coordinator and the worker nodes of a distributed run
+
+    Implementations must make claim() atomic across nodes, enforce the per-host
+    limits globally, and accept only the first result submitted for a task.
+    """
+
+    @abstractmethod
+    def publish(self, job_id: str, tasks: List[Dict[str, Any]]):
+        """
+        Enqueues the tasks of a job
+
+        Args:
+            job_id: Identifier of the job
+            tasks: Dicts with task_id, host, a JSON-serializable payload and optionally
+                hosts, every host the task navigates to (defaults to [host])
+        """
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str):
+        """Records that a worker node is alive"""
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Assigns the next runnable task to a worker
+
+        A task is runnable when each of its hosts is below its concurrency limit
+        and its minimum interval since the last start on that host has elapsed.
+        Claiming the task takes a slot on every one of its hosts.
+
+        Returns:
+            Dict with job_id, task_id, host, hosts and payload, or None if nothing is runnable
+        """
+
+    @abstractmethod
+    def submit_result(self, task_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """
+        Stores the result of a task
+
+        Returns:
+            False if a result was already stored for the task (the submission is ignored)
+        """
+
+    @abstractmethod
+    def release(self, task_id: str, worker_id: str) -> bool:
+        """
+        Returns a task claimed by the worker to the queue, e.g. when its result cannot be submitted
+
+        Returns:
+            False if the task is no longer claimed by the worker
+        """
+
+    @abstractmethod
+    def reassign_dead_workers(self, heartbeat_timeout: float) -> int:
+        """
+        Returns the tasks of workers silent for longer than heartbeat_timeout to the queue
+
+        A task claimed the maximum number of times fails instead: its result is
+        {"error": ...} and its state "failed".
+
+        Returns:
+            Number of tasks reassigned
+        """
+
+    @abstractmethod
+    def set_host_limit(self, host: str, max_concurrent: int, min_interval: float = 0.0):
+        """Sets the global concurrency limit and minimum seconds between task starts for a host"""
+
+    @abstractmethod
+    def results(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Returns results of a job in submission order, after the given sequence number"""
+
+    @abstractmethod
+    def progress(self, job_id: str) -> Dict[str, int]:
+        """Returns the number of tasks of a job per state"""
+
+def create_broker(url: str) -> Broker:
+    """
+    Creates a broker from a URL
+
+    Args:
+        url: sqlite:///path/to/broker.db (a Redis-compatible broker can be added under redis://)
+
+    Returns:
+        Broker instance
+    """
+    if url.startswith("sqlite:///"):
+        from workers.sqlite_broker import SQLiteBroker
+        db_path = url[len("sqlite:///"):]
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        return SQLiteBroker(db_path)
+    raise ValueError(f"Unsupported broker URL: {url}")
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import AsyncIterator, List, Optional
+
+from models.alert_models import Alert, AlertProcessingResult
+from workers.broker import Broker, create_broker
+from workers.routing import target_hosts
+from utils.pipeline import Pipeline, Stage
+
+logger = logging.getLogger(__name__)
+
+class Coordinator:
+    """Publishes alerts to the broker, reassigns work of dead nodes and collects results"""
+
+    def __init__(self, broker: Broker, per_host_limit: int = 2, host_min_interval: float = 0.0,
+                 heartbeat_timeout: float = 60.0, poll_interval: float = 1.0):
+        """
+        Args:
+            broker: Broker shared with the worker nodes
+            per_host_limit: Maximum alerts in progress on one host across all nodes
+            host_min_interval: Minimum seconds between two alerts starting on the same host
+            heartbeat_timeout: Seconds without a heartbeat after which a node's alerts are reassigned
+            poll_interval: Seconds between checks for new results
+        """
+        self.broker = broker
+        self.per_host_limit = per_host_limit
+        self.host_min_interval = host_min_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.poll_interval = poll_interval
+
+    async def run(self, alerts: List[Alert], job_id: Optional[str] = None) -> AsyncIterator[AlertProcessingResult]:
+        """
+        Distributes alerts to the worker nodes
+
+        Tasks are numbered by their position in `alerts`, so alerts sharing an ID are
+        verified separately, and publishing is idempotent per job_id and position: a
+        restarted coordinator given the same job_id and alerts picks up the results
+        already submitted.
+
+        Args:
+            alerts: Alerts to verify
+            job_id: Identifier of the run; generated when not given
+
+        Yields:
+            AlertProcessingResult objects as nodes submit them
+        """
+        job_id = job_id or uuid.uuid4().hex
+        tasks = []
+        for submission_id, alert in enumerate(alerts):
+            # A slot is taken on every host the verification navigates to, market and register
+            hosts = target_hosts(alert)
+            tasks.append({
+                "task_id": f"{job_id}:{submission_id}",
+                "host": hosts[0] if hosts else "",
+                "hosts": hosts,
+                "payload": json.loads(alert.model_dump_json()),
+            })
+        for host in {host for task in tasks for host in task["hosts"]}:
+            await asyncio.to_thread(self.broker.set_host_limit, host, self.per_host_limit, self.host_min_interval)
+        await asyncio.to_thread(self.broker.publish, job_id, tasks)
+        logger.info(f"Published job {job_id} with {len(tasks)} alerts")
+
+        alerts_by_task = {task["task_id"]: alert for task, alert in zip(tasks, alerts)}
+        total = len(tasks)
+        received = 0
+        position = 0
+        while received < total:
+            await asyncio.to_thread(self.broker.reassign_dead_workers, self.heartbeat_timeout)
+            for record in await asyncio.to_thread(self.broker.results, job_id, position):
+                position = record["seq"]
+                received += 1
+                if "error" in record["result"]:
+                    # Failed by the broker after exhausting its attempts
+                    yield AlertProcessingResult(
+                        alert_id=alerts_by_task[record["task_id"]].alert_id,
+                        is_true_positive=False,
+                        justification=f"Processing error: {record['result']['error']}",
+                    )
+                    continue
+                yield AlertProcessingResult(**record["result"])
+            if received < total:
+                await asyncio.sleep(self.poll_interval)
+
+class NodeWorker:
+    """
+    Claims alerts from the broker and verifies them with a local browser pool
+
+    Each alert passes through three pipeline stages: check (navigation,
+    extraction and capture, one browser page each), evidence (the PDF, built
+    from the capture) and submit (the result, back to the broker). A page is
+    free for the next alert as soon as its check is done. Every claimed alert
+    ends with a submitted result: a failed PDF leaves the result without one,
+    and a result the broker keeps refusing returns the alert to the queue.
+    """
+
+    def __init__(self, broker: Broker, worker_id: Optional[str] = None, concurrency: int = 4,
+                 heartbeat_interval: float = 10.0, poll_interval: float = 1.0,
+                 idle_exit: Optional[float] = None, evidence_dir: Optional[str] = None,
+                 evidence_concurrency: int = 2, submit_concurrency: int = 2,
+                 submit_attempts: int = 3, submit_retry_delay: float = 1.0):
+        """
+        Args:
+            broker: Broker shared with the coordinator
+            worker_id: Unique name of this node (defaults to hostname and pid)
+            concurrency: Alerts checked at the same time on this node (browser pages)
+            heartbeat_interval: Seconds between heartbeats; keep well below the coordinator's timeout.
+                Pipeline statistics are logged at the same interval.
+            poll_interval: Seconds to wait when no alert is runnable
+            idle_exit: Stop after this many seconds without work (run forever when None)
+            evidence_dir: When given, an evidence PDF per alert is written to this directory
+            evidence_concurrency: Evidence PDFs written at the same time
+            submit_concurrency: Results submitted to the broker at the same time
+            submit_attempts: Attempts to submit a result before the alert is released to the queue
+            submit_retry_delay: Seconds before the first retry; doubled for each further one
+        """
+        self.broker = broker
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.idle_exit = idle_exit
+        self.evidence_dir = evidence_dir
+        self.evidence_concurrency = evidence_concurrency
+        self.submit_concurrency = submit_concurrency
+        self.submit_attempts = submit_attempts
+        self.submit_retry_delay = submit_retry_delay
+        self.pipeline: Optional[Pipeline] = None
+        self.change_detector = None
+
+    async def run(self):
+        from utils.browser_pool import BrowserPool
+        from workers.alert_verifier import AlertVerifier
+        from utils.change_detection import default_detector
+        from utils.verification_history import default_history
+
+        await asyncio.to_thread(self.broker.heartbeat, self.worker_id)
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        try:
+            async with BrowserPool(max_pages=self.concurrency, per_host_limit=self.concurrency) as pool:
+                self.change_detector = default_detector()
+                verifier = AlertVerifier(pool, self.evidence_dir, default_history(),
+                                         float(os.getenv("VERIFICATION_HISTORICAL_AFTER_SECONDS", "86400")),
+                                         self.change_detector)
+                self.pipeline = self._build_pipeline(verifier)
+                await self._feed(self.pipeline)
+                await self.pipeline.join()
+        finally:
+            heartbeat.cancel()
+
+    def _build_pipeline(self, verifier) -> Pipeline:
+        async def check(task):
+            alert = Alert(**task["payload"])
+            try:
+                result = await verifier.check(alert)
+            except Exception as e:
+                logger.error(f"Error verifying alert {alert.alert_id}: {e}", exc_info=True)
+                result = AlertProcessingResult(
+                    alert_id=alert.alert_id,
+                    is_true_positive=False,
+                    justification=f"Processing error: {str(e)}",
+                )
+            return task, alert, result
+
+        async def evidence(item):
+            task, alert, result = item
+            try:
+                result = await verifier.write_evidence(alert, result)
+            except Exception as e:
+                # The decision stands without its PDF
+                logger.error(f"Error writing evidence of alert {alert.alert_id}: {e}", exc_info=True)
+            return task, alert, result
+
+        async def submit(item):
+            task, _, result = item
+            payload = json.loads(result.model_dump_json())
+            for attempt in range(1, self.submit_attempts + 1):
+                try:
+                    await asyncio.to_thread(self.broker.submit_result, task["task_id"], self.worker_id, payload)
+                    return
+                except Exception as e:
+                    logger.error(f"Submitting the result of task {task['task_id']} failed "
+                                 f"(attempt {attempt}/{self.submit_attempts}): {e}")
+                if attempt < self.submit_attempts:
+                    await asyncio.sleep(self.submit_retry_delay * 2 ** (attempt - 1))
+            # Another node verifies it again rather than the coordinator waiting for it forever
+            try:
+                await asyncio.to_thread(self.broker.release, task["task_id"], self.worker_id)
+                logger.warning(f"Released task {task['task_id']} to the queue")
+            except Exception as e:
+                logger.error(f"Releasing task {task['task_id']} failed: {e}")
+
+        # Claimed alerts count against the broker's host limits, so at most one waits for a page
+        return Pipeline([
+            Stage("check", check, self.concurrency, queue_size=1),
+            Stage("evidence", evidence, self.evidence_concurrency),
+            Stage("submit", submit, self.submit_concurrency),
+        ])
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await asyncio.to_thread(self.broker.heartbeat, self.worker_id)
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {e}")
+            if self.pipeline is not None:
+                self.pipeline.log_stats()
+            if self.change_detector is not None:
+                logger.info(f"Change detection: {self.change_detector.stats()}")
+
+    async def _feed(self, pipeline: Pipeline):
+        """Claims alerts while the check stage has room, until idle for idle_exit seconds"""
+        idle_since = time.monotonic()
+        while True:
+            task = await asyncio.to_thread(self.broker.claim, self.worker_id)
+            if task is None:
+                if self.idle_exit is not None and time.monotonic() - idle_since > self.idle_exit:
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await pipeline.put(task)
+            idle_since = time.monotonic()
+
+async def _run_coordinator(args):
+    from data_access.alert_reader import load_alerts_from_csv
+
+    alerts = load_alerts_from_csv(args.csv_path)
+    coordinator = Coordinator(create_broker(args.broker), per_host_limit=args.per_host_limit,
+                              host_min_interval=args.host_min_interval,
+                              heartbeat_timeout=args.heartbeat_timeout)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as output:
+        async for result in coordinator.run(alerts, job_id=args.job_id):
+            output.write(result.model_dump_json() + "\n")
+            output.flush()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Distributed alert verification")
+    parser.add_argument("--broker", default=os.getenv("BROKER_URL", "sqlite:///results/broker.db"),
+                        help="Broker URL, e.g. sqlite:///results/broker.db")
+    subparsers = parser.add_subparsers(dest="role", required=True)
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="Publish alerts and collect results")
+    coordinator_parser.add_argument("csv_path", help="CSV file with alert_id, isin, security_name columns")
+    coordinator_parser.add_argument("--job-id", default=None, help="Reuse to resume an earlier run")
+    coordinator_parser.add_argument("--output", default="results/distributed_results.jsonl")
+    coordinator_parser.add_argument("--per-host-limit", type=int, default=2)
+    coordinator_parser.add_argument("--host-min-interval", type=float, default=0.0)
+    coordinator_parser.add_argument("--heartbeat-timeout", type=float, default=60.0)
+
+    worker_parser = subparsers.add_parser("worker", help="Verify alerts claimed from the broker")
+    worker_parser.add_argument("--worker-id", default=None)
+    worker_parser.add_argument("--concurrency", type=int, default=4)
+    worker_parser.add_argument("--idle-exit", type=float, default=None)
+    worker_parser.add_argument("--evidence-dir", default=None, help="Write an evidence PDF per alert to this directory")
+    worker_parser.add_argument("--evidence-concurrency", type=int, default=2, help="Evidence PDFs written at the same time")
+
+    args = parser.parse_args()
+    if args.role == "coordinator":
+        asyncio.run(_run_coordinator(args))
+    else:
+        asyncio.run(NodeWorker(create_broker(args.broker), worker_id=args.worker_id,
+                               concurrency=args.concurrency, idle_exit=args.idle_exit,
+                               evidence_dir=args.evidence_dir,
+                               evidence_concurrency=args.evidence_concurrency).run())
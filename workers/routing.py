@@ -0,0 +1,32 @@
+from typing import List
+
+from models.alert_models import Alert
+
+# Host each country's market check navigates to
+MARKET_HOSTS = {
+    "DE": "www.boerse-frankfurt.de",
+    "FR": "live.euronext.com",
+}
+
+# Host of each country's commercial register, searched when the system holds a share count
+REGISTER_HOSTS = {
+    "DE": "www.unternehmensregister.de",
+    "FR": "www.infogreffe.fr",
+}
+
+def country_hosts(country_code: str) -> List[str]:
+    """Every host the verification of an alert of the country may navigate to"""
+    return [hosts[country_code] for hosts in (MARKET_HOSTS, REGISTER_HOSTS) if country_code in hosts]
+
+def target_hosts(alert: Alert) -> List[str]:
+    """
+    Returns the hosts an alert's verification navigates to
+
+    The register is only searched when the system holds a share count. Alerts of
+    countries without a validator navigate nowhere and get an empty list.
+    """
+    country_code = alert.isin[:2]
+    hosts = [MARKET_HOSTS[country_code]] if country_code in MARKET_HOSTS else []
+    if alert.outstanding_shares_system and country_code in REGISTER_HOSTS:
+        hosts.append(REGISTER_HOSTS[country_code])
+    return hosts
@@ -0,0 +1,254 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from workers.broker import Broker
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    host TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, host);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id, state);
+CREATE INDEX IF NOT EXISTS tasks_worker ON tasks (worker_id, state);
+CREATE TABLE IF NOT EXISTS task_hosts (
+    task_id TEXT NOT NULL,
+    host TEXT NOT NULL,
+    PRIMARY KEY (task_id, host)
+);
+CREATE INDEX IF NOT EXISTS task_hosts_host ON task_hosts (host, task_id);
+CREATE TABLE IF NOT EXISTS results (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL UNIQUE,
+    job_id TEXT NOT NULL,
+    worker_id TEXT NOT NULL,
+    result TEXT NOT NULL,
+    submitted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_job ON results (job_id, seq);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    last_heartbeat REAL NOT NULL,
+    alive INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    max_concurrent INTEGER,
+    min_interval REAL,
+    last_started_at REAL
+);
+"""
+
+def _task_hosts(task: Dict[str, Any]) -> List[str]:
+    """Hosts a task takes slots on: its hosts list, or its single host"""
+    hosts = task["hosts"] if "hosts" in task else [task["host"]]
+    return [host for host in dict.fromkeys(hosts) if host]
+
+class SQLiteBroker(Broker):
+    """
+    Broker backed by a single SQLite file shared by all processes on one machine
+
+    Every process opens its own connection; write transactions are taken with
+    BEGIN IMMEDIATE so claims and host-limit checks are atomic across processes.
+    """
+
+    def __init__(self, db_path: str, default_host_limit: int = 2, busy_timeout: float = 30.0,
+                 max_attempts: int = 3):
+        """
+        Args:
+            db_path: Path of the SQLite database file
+            default_host_limit: Concurrency limit for hosts without an explicit limit
+            busy_timeout: Seconds to wait for another process holding the write lock
+            max_attempts: Claims of a task by workers that then died, after which it fails
+        """
+        self.db_path = db_path
+        self.default_host_limit = default_host_limit
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, statements):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def publish(self, job_id: str, tasks: List[Dict[str, Any]]):
+        def insert(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (task_id, job_id, host, payload, state) VALUES (?, ?, ?, ?, 'pending')",
+                [(task["task_id"], job_id, task["host"], json.dumps(task["payload"])) for task in tasks],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO task_hosts (task_id, host) VALUES (?, ?)",
+                [(task["task_id"], host) for task in tasks for host in _task_hosts(task)],
+            )
+
+        self._transaction(insert)
+
+    def heartbeat(self, worker_id: str):
+        self._transaction(lambda conn: conn.execute(
+            "INSERT INTO workers (worker_id, last_heartbeat, alive) VALUES (?, ?, 1) "
+            "ON CONFLICT (worker_id) DO UPDATE SET last_heartbeat = excluded.last_heartbeat, alive = 1",
+            (worker_id, time.time()),
+        ))
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+
+        def claim_next(conn):
+            # Runnable when none of the task's hosts is at its limit or within its interval
+            row = conn.execute(
+                "SELECT t.task_id, t.job_id, t.host, t.payload FROM tasks t "
+                "WHERE t.state = 'pending' AND NOT EXISTS ("
+                "    SELECT 1 FROM task_hosts th LEFT JOIN hosts h ON h.host = th.host "
+                "    WHERE th.task_id = t.task_id AND ("
+                "        (SELECT COUNT(*) FROM task_hosts rh JOIN tasks r ON r.task_id = rh.task_id "
+                "         WHERE rh.host = th.host AND r.state = 'in_progress') >= COALESCE(h.max_concurrent, ?) "
+                "        OR ? - COALESCE(h.last_started_at, 0) < COALESCE(h.min_interval, 0))) "
+                "ORDER BY t.rowid LIMIT 1",
+                (self.default_host_limit, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET state = 'in_progress', worker_id = ?, attempts = attempts + 1, claimed_at = ? "
+                "WHERE task_id = ?",
+                (worker_id, now, row["task_id"]),
+            )
+            hosts = [host_row["host"] for host_row in conn.execute(
+                "SELECT host FROM task_hosts WHERE task_id = ?", (row["task_id"],)
+            ).fetchall()]
+            conn.executemany(
+                "INSERT INTO hosts (host, last_started_at) VALUES (?, ?) "
+                "ON CONFLICT (host) DO UPDATE SET last_started_at = excluded.last_started_at",
+                [(host, now) for host in hosts],
+            )
+            return {
+                "job_id": row["job_id"],
+                "task_id": row["task_id"],
+                "host": row["host"],
+                "hosts": hosts,
+                "payload": json.loads(row["payload"]),
+            }
+
+        return self._transaction(claim_next)
+
+    def submit_result(self, task_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        def submit(conn):
+            task = conn.execute("SELECT job_id FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if task is None:
+                return False
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO results (task_id, job_id, worker_id, result, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task_id, task["job_id"], worker_id, json.dumps(result), time.time()),
+            ).rowcount
+            if inserted:
+                conn.execute("UPDATE tasks SET state = 'done' WHERE task_id = ?", (task_id,))
+            return bool(inserted)
+
+        accepted = self._transaction(submit)
+        if not accepted:
+            logger.info(f"Ignored duplicate result for task {task_id} from {worker_id}")
+        return accepted
+
+    def release(self, task_id: str, worker_id: str) -> bool:
+        released = self._transaction(lambda conn: conn.execute(
+            "UPDATE tasks SET state = 'pending', worker_id = NULL "
+            "WHERE task_id = ? AND worker_id = ? AND state = 'in_progress'",
+            (task_id, worker_id),
+        ).rowcount)
+        return bool(released)
+
+    def reassign_dead_workers(self, heartbeat_timeout: float) -> int:
+        cutoff = time.time() - heartbeat_timeout
+
+        def reassign(conn):
+            dead = [row["worker_id"] for row in conn.execute(
+                "SELECT worker_id FROM workers WHERE alive = 1 AND last_heartbeat < ?", (cutoff,)
+            ).fetchall()]
+            if not dead:
+                return 0
+            placeholders = ",".join("?" * len(dead))
+            conn.execute(f"UPDATE workers SET alive = 0 WHERE worker_id IN ({placeholders})", dead)
+            # A task that took down every worker that claimed it is not handed out again
+            exhausted = conn.execute(
+                f"SELECT task_id, job_id, worker_id, attempts FROM tasks "
+                f"WHERE state = 'in_progress' AND worker_id IN ({placeholders}) AND attempts >= ?",
+                [*dead, self.max_attempts],
+            ).fetchall()
+            now = time.time()
+            for task in exhausted:
+                error = f"Task failed: its worker died on each of {task['attempts']} attempts"
+                conn.execute(
+                    "INSERT OR IGNORE INTO results (task_id, job_id, worker_id, result, submitted_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (task["task_id"], task["job_id"], task["worker_id"], json.dumps({"error": error}), now),
+                )
+                conn.execute("UPDATE tasks SET state = 'failed' WHERE task_id = ?", (task["task_id"],))
+                logger.error(f"{error}: {task['task_id']}")
+            reassigned = conn.execute(
+                f"UPDATE tasks SET state = 'pending', worker_id = NULL "
+                f"WHERE state = 'in_progress' AND worker_id IN ({placeholders})",
+                dead,
+            ).rowcount
+            logger.warning(f"Workers {', '.join(dead)} missed their heartbeat; reassigned {reassigned} tasks")
+            return reassigned
+
+        return self._transaction(reassign)
+
+    def set_host_limit(self, host: str, max_concurrent: int, min_interval: float = 0.0):
+        self._transaction(lambda conn: conn.execute(
+            "INSERT INTO hosts (host, max_concurrent, min_interval) VALUES (?, ?, ?) "
+            "ON CONFLICT (host) DO UPDATE SET max_concurrent = excluded.max_concurrent, "
+            "min_interval = excluded.min_interval",
+            (host, max_concurrent, min_interval),
+        ))
+
+    def results(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT seq, task_id, worker_id, result FROM results WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after),
+        )
+        return [
+            {"seq": row["seq"], "task_id": row["task_id"], "worker_id": row["worker_id"],
+             "result": json.loads(row["result"])}
+            for row in rows
+        ]
+
+    def progress(self, job_id: str) -> Dict[str, int]:
+        rows = self._query(
+            "SELECT state, COUNT(*) AS n FROM tasks WHERE job_id = ? GROUP BY state", (job_id,)
+        )
+        progress = {"pending": 0, "in_progress": 0, "done": 0}
+        progress.update({row["state"]: row["n"] for row in rows})
+        return progress
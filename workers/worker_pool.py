@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import zlib
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from models.alert_models import Alert, AlertProcessingResult
+from workers.routing import country_hosts
+from utils.pipeline import Pipeline, Stage
+
+logger = logging.getLogger(__name__)
+
+def host_workers(host: str, workers: int, per_host_limit: int) -> List[Tuple[int, int]]:
+    """
+    Assigns a host to a fixed set of worker processes and splits its page limit between them
+
+    The assignment only depends on its arguments, so every process computes the
+    same answer and the per-host limit holds across the whole pool.
+
+    Args:
+        host: Target host
+        workers: Number of worker processes
+        per_host_limit: Maximum number of pages open on the host across all workers
+
+    Returns:
+        List of (worker_index, host_limit) pairs
+    """
+    count = max(1, min(workers, per_host_limit))
+    start = zlib.crc32(host.encode("utf-8")) % workers
+    share, remainder = divmod(max(per_host_limit, count), count)
+    return [((start + n) % workers, share + (1 if n < remainder else 0)) for n in range(count)]
+
+def _worker_main(worker_index: int, tasks, results, max_pages: int, launch_options: Dict,
+                 evidence_dir: Optional[str] = None, evidence_concurrency: int = 2):
+    """Entry point of a worker process: owns a browser pool and verifies the alerts it is sent"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s - worker-{worker_index} - %(name)s - %(levelname)s - %(message)s",
+    )
+    asyncio.run(_worker_loop(worker_index, tasks, results, max_pages, launch_options, evidence_dir,
+                             evidence_concurrency))
+
+async def _worker_loop(worker_index: int, tasks, results, max_pages: int, launch_options: Dict,
+                       evidence_dir: Optional[str] = None, evidence_concurrency: int = 2):
+    from utils.browser_pool import BrowserPool
+    from workers.alert_verifier import AlertVerifier
+    from utils.change_detection import default_detector
+    from utils.verification_history import default_history
+
+    history = default_history()
+    change_detector = default_detector()
+    async with BrowserPool(max_pages=max_pages, launch_options=launch_options) as pool:
+        verifier = AlertVerifier(pool, evidence_dir, history,
+                                 float(os.getenv("VERIFICATION_HISTORICAL_AFTER_SECONDS", "86400")),
+                                 change_detector)
+
+        async def check(item):
+            submission_id, alert = item
+            try:
+                result = await verifier.check(alert)
+            except Exception as e:
+                logger.error(f"Error verifying alert {alert.alert_id}: {e}", exc_info=True)
+                result = AlertProcessingResult(
+                    alert_id=alert.alert_id,
+                    is_true_positive=False,
+                    justification=f"Processing error: {str(e)}",
+                )
+            return submission_id, alert, result
+
+        async def evidence(item):
+            submission_id, alert, result = item
+            try:
+                result = await verifier.write_evidence(alert, result)
+            except Exception as e:
+                # The decision stands without its PDF; the coordinator must still hear of the alert
+                logger.error(f"Error writing evidence of alert {alert.alert_id}: {e}", exc_info=True)
+            results.put((worker_index, submission_id, result))
+
+        # Pages are freed for the next alert while the previous one's evidence PDF is written.
+        # Twice as many checks as pages, so alerts waiting for a busy host do not idle the other pages.
+        pipeline = Pipeline([
+            Stage("check", check, 2 * max_pages),
+            Stage("evidence", evidence, evidence_concurrency),
+        ], report_interval=float(os.getenv("PIPELINE_STATS_INTERVAL", "60")))
+
+        while True:
+            task = await asyncio.to_thread(tasks.get)
+            if task is None:
+                break
+            submission_id, alert, host_limits = task
+            for host, host_limit in host_limits.items():
+                pool.set_host_limit(host, host_limit)
+            await pipeline.put((submission_id, alert))
+
+        await pipeline.join()
+        logger.info(f"Worker {worker_index} change detection: {change_detector.stats()}")
+
+class WorkerPool:
+    """
+    Coordinator sharding alerts across worker processes, each with its own browser pool
+
+    Alerts are routed by the hosts of their country, the market and the
+    register: those hosts are served by a fixed subset of workers whose limits
+    on each of them add up to the global per-host limit. Alerts that navigate
+    nowhere go to any worker. Results are streamed back as soon as any worker
+    finishes an alert.
+    """
+
+    def __init__(self, workers: int = None, pages_per_worker: int = 4, per_host_limit: int = 2,
+                 launch_options: Dict = None, evidence_dir: Optional[str] = None,
+                 evidence_concurrency: int = 2):
+        """
+        Args:
+            workers: Number of worker processes (defaults to the number of CPUs)
+            pages_per_worker: Maximum pages each worker keeps open at the same time
+            per_host_limit: Maximum pages open on one host across all workers
+            launch_options: Keyword arguments for chromium.launch in every worker
+            evidence_dir: When given, workers write an evidence PDF per alert to this directory
+            evidence_concurrency: Evidence PDFs each worker writes at the same time
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_worker = pages_per_worker
+        self.per_host_limit = per_host_limit
+        self.launch_options = launch_options or {}
+        self.evidence_dir = evidence_dir
+        self.evidence_concurrency = evidence_concurrency
+
+    async def process(self, alerts: Iterable[Alert]) -> AsyncIterator[AlertProcessingResult]:
+        """
+        Verifies alerts across the worker processes
+
+        Args:
+            alerts: Alerts to verify
+
+        Yields:
+            AlertProcessingResult objects in completion order
+        """
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        task_queues = [context.Queue() for _ in range(self.workers)]
+        processes = [
+            context.Process(
+                target=_worker_main,
+                args=(n, task_queues[n], results, self.pages_per_worker, self.launch_options, self.evidence_dir,
+                      self.evidence_concurrency),
+                daemon=True,
+            )
+            for n in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        # Keyed by submission number, so alerts sharing an ID are tracked separately
+        in_flight: Dict[int, Dict[int, Alert]] = defaultdict(dict)
+        round_robin: Dict[str, int] = defaultdict(int)
+        try:
+            for submission_id, alert in enumerate(alerts):
+                hosts = country_hosts(alert.isin[:2])
+                if hosts:
+                    # Each host of a country belongs to that country only, so the group
+                    # shares one assignment and every host keeps its global limit
+                    shard = "+".join(hosts)
+                    assignment = host_workers(shard, self.workers, self.per_host_limit)
+                    worker_index, host_limit = assignment[round_robin[shard] % len(assignment)]
+                    host_limits = {host: host_limit for host in hosts}
+                else:
+                    shard = ""
+                    worker_index, host_limits = round_robin[shard] % self.workers, {}
+                round_robin[shard] += 1
+                in_flight[worker_index][submission_id] = alert
+                task_queues[worker_index].put((submission_id, alert, host_limits))
+            for task_queue in task_queues:
+                task_queue.put(None)
+
+            while any(in_flight.values()):
+                try:
+                    worker_index, submission_id, result = await asyncio.to_thread(results.get, True, 1.0)
+                except queue.Empty:
+                    for result in self._reap_dead_workers(processes, in_flight):
+                        yield result
+                    continue
+                in_flight[worker_index].pop(submission_id, None)
+                yield result
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+    def _reap_dead_workers(self, processes, in_flight) -> List[AlertProcessingResult]:
+        """Reports the outstanding alerts of crashed workers as failed"""
+        failed = []
+        for worker_index, process in enumerate(processes):
+            if not process.is_alive() and in_flight[worker_index]:
+                logger.error(f"Worker {worker_index} exited with code {process.exitcode}; "
+                             f"{len(in_flight[worker_index])} alerts lost")
+                for alert in in_flight[worker_index].values():
+                    failed.append(AlertProcessingResult(
+                        alert_id=alert.alert_id,
+                        is_true_positive=False,
+                        justification=f"Processing error: worker {worker_index} exited unexpectedly",
+                    ))
+                in_flight[worker_index].clear()
+        return failed
+
+async def _run_cli(args):
+    from data_access.alert_reader import load_alerts_from_csv
+
+    alerts = load_alerts_from_csv(args.csv_path)
+    pool = WorkerPool(workers=args.workers, pages_per_worker=args.pages_per_worker,
+                      per_host_limit=args.per_host_limit, evidence_dir=args.evidence_dir,
+                      evidence_concurrency=args.evidence_concurrency)
+    processed = 0
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as output:
+        async for result in pool.process(alerts):
+            output.write(result.model_dump_json() + "\n")
+            output.flush()
+            processed += 1
+            logger.info(f"Alert {result.alert_id} done ({processed}/{len(alerts)})")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Verify alerts from a CSV file across worker processes")
+    parser.add_argument("csv_path", help="CSV file with alert_id, isin, security_name columns")
+    parser.add_argument("--output", default="results/worker_results.jsonl", help="JSONL file receiving the results")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--pages-per-worker", type=int, default=4)
+    parser.add_argument("--per-host-limit", type=int, default=2)
+    parser.add_argument("--evidence-dir", default=None, help="Write an evidence PDF per alert to this directory")
+    parser.add_argument("--evidence-concurrency", type=int, default=2, help="Evidence PDFs written at the same time per worker")
+    asyncio.run(_run_cli(parser.parse_args()))